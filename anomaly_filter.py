@@ -0,0 +1,174 @@
+# Streaming Anomaly Pre-Filter
+#
+# Most probes show a pod doing exactly what it did on the previous ticks, and
+# the classifier answers "no action" again. This stage keeps a per-target
+# baseline of the samples the classifier judged healthy and only hands a
+# target to the classifier (DecisionCache -> model) when its sample leaves
+# that baseline:
+#
+#   baseline   EWMA mean and variance of cpu_usage, memory_usage and
+#              error_count, updated only with no-action samples within the
+#              baseline (a sustained healthy shift re-bases it, see
+#              learn_batch)
+#   ceiling    per channel, the highest value the classifier itself has
+#              judged healthy for the target
+#   anomalous  any channel with |x - mean| > z_threshold * max(std, min_std)
+#              or above its ceiling, or the target's last classifier
+#              decision was an action, or it is still warming up (fewer
+#              than `warmup` baseline samples)
+#   refresh    a target is sent to the classifier at least every
+#              `refresh` ticks anyway, so a slow drift that the EWMA absorbs
+#              is still re-checked
+#
+# min_std floors the spread of very steady pods (a flat error_count would
+# otherwise flag every single new error). The ceiling keeps a pod that hovers
+# around one of the model's thresholds (say CPU 79-81%) going to the
+# classifier: its samples are within the z-band, but values it has never
+# been cleared at are not assumed healthy.
+#
+# State is kept as arrays indexed by a per-target slot, so a fleet tick is
+# scored with a handful of vectorized operations.
+
+import numpy as np
+
+CHANNELS = ('cpu_usage', 'memory_usage', 'error_count')
+
+DEFAULT_MIN_STD = (2.0, 2.0, 0.5)
+
+
+class AnomalyFilter:
+    """
+    Per-target baseline filter in front of the healing classifier
+
+    Usage:
+        anomalies = AnomalyFilter()
+        mask = anomalies.filter_batch(targets, metrics)    # True: classify
+        ... classify metrics[mask] ...
+        anomalies.learn_batch(actions)                     # every row
+    """
+
+    def __init__(self, alpha=0.1, z_threshold=3.0, warmup=5, refresh=12,
+                 rebaseline=12, min_std=DEFAULT_MIN_STD):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.refresh = refresh
+        self.rebaseline = rebaseline
+        self.min_std = np.asarray(min_std, dtype=np.float64)
+
+        self._slots = {}
+        self._free = []
+        capacity = 64
+        self._mean = np.zeros((capacity, len(CHANNELS)))
+        self._var = np.zeros((capacity, len(CHANNELS)))
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._since_check = np.zeros(capacity, dtype=np.int64)
+        self._acting = np.zeros(capacity, dtype=bool)
+        self._shifted = np.zeros(capacity, dtype=np.int64)
+        self._ceiling = np.full((capacity, len(CHANNELS)), -np.inf)
+        self._pending = None
+        self.stats = {'normal': 0, 'anomalous': 0, 'warmup': 0, 'refresh': 0}
+
+    def _slot(self, target):
+        slot = self._slots.get(target)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._slots)
+                if slot == len(self._count):
+                    self._grow()
+            self._slots[target] = slot
+            self._mean[slot] = self._var[slot] = 0.0
+            self._count[slot] = self._since_check[slot] = self._shifted[slot] = 0
+            self._acting[slot] = False
+            self._ceiling[slot] = -np.inf
+        return slot
+
+    def _grow(self):
+        capacity = 2 * len(self._count)
+        for name in ('_mean', '_var', '_count', '_since_check', '_acting', '_shifted',
+                     '_ceiling'):
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], -np.inf if name == '_ceiling' else 0,
+                          dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def filter_batch(self, targets, metrics):
+        """
+        Boolean mask over the rows: True = anomalous, send to the classifier
+
+        Must be followed by learn_batch with the decisions for these rows.
+        """
+        slots_get = self._slots.get
+        slots = [slots_get(target) for target in targets]
+        if None in slots:
+            slots = [self._slot(target) if slot is None else slot
+                     for target, slot in zip(targets, slots)]
+        slots = np.array(slots, dtype=np.int64)
+        X = np.array([(m.get('cpu_usage', 0), m.get('memory_usage', 0), m.get('error_count', 0))
+                      for m in metrics], dtype=np.float64).reshape(len(metrics), len(CHANNELS))
+
+        std = np.maximum(np.sqrt(self._var[slots]), self.min_std)
+        deviating = ((np.abs(X - self._mean[slots]) > self.z_threshold * std) |
+                     (X > self._ceiling[slots])).any(axis=1)
+        warming = self._count[slots] < self.warmup
+        refresh = self._since_check[slots] >= self.refresh
+
+        anomalous = deviating | self._acting[slots]
+        mask = anomalous | warming | refresh
+
+        self.stats['anomalous'] += int(anomalous.sum())
+        self.stats['warmup'] += int((warming & ~anomalous).sum())
+        self.stats['refresh'] += int((refresh & ~warming & ~anomalous).sum())
+        self.stats['normal'] += int((~mask).sum())
+        self._pending = (slots, X, deviating & ~warming, mask)
+        return mask
+
+    def learn_batch(self, actions):
+        """
+        Feed back the decision for every row of the last filter_batch call
+
+        actions: healing action per row (None / 'no_action' = healthy).
+        Healthy samples update the baseline, except deviating ones: those
+        only move it after `rebaseline` consecutive healthy verdicts (a
+        level shift such as a new deploy), so a slow leak cannot drag the
+        baseline along with it.
+        """
+        slots, X, deviating, classified = self._pending
+        self._pending = None
+        healthy = np.array([action in (None, 'no_action') for action in actions], dtype=bool)
+
+        self._acting[slots] = ~healthy
+        self._since_check[slots] = np.where(classified, 0, self._since_check[slots] + 1)
+
+        cleared = classified & healthy
+        self._ceiling[slots[cleared]] = np.maximum(self._ceiling[slots[cleared]], X[cleared])
+
+        shifted = np.where(deviating & healthy, self._shifted[slots] + 1, 0)
+        self._shifted[slots] = shifted
+        rebase = shifted >= self.rebaseline
+        self._count[slots[rebase]] = 0
+        self._shifted[slots[rebase]] = 0
+
+        learn = healthy & (~deviating | rebase)
+        slots, X = slots[learn], X[learn]
+        first = self._count[slots] == 0
+        diff = X - self._mean[slots]
+        mean = self._mean[slots] + self.alpha * diff
+        var = (1 - self.alpha) * (self._var[slots] + self.alpha * diff * diff)
+        self._mean[slots] = np.where(first[:, None], X, mean)
+        self._var[slots] = np.where(first[:, None], 0.0, var)
+        self._count[slots] += 1
+
+    def forget(self, target):
+        """Drop a target that is no longer monitored"""
+        slot = self._slots.pop(target, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def pass_rate(self):
+        """Fraction of rows that skipped the classifier"""
+        total = sum(self.stats.values())
+        return self.stats['normal'] / total if total else 0.0
@@ -1,53 +1,46 @@
-from flask import Flask, jsonify, request
-import random
+from flask import Flask, jsonify, request, Response
 import time
 import os
 import logging
+from request_log import setup_request_logging
+from service import PatientService
 
 app = Flask(__name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Endpoint logic and state: request/error metrics, the error count shared by
+# all gunicorn workers, /health snapshots and monitor push (see service.py;
+# asgi_app.py serves the same logic over ASGI). Set METRICS_DIR under
+# gunicorn so a scrape of any worker covers all workers.
+service = PatientService(metrics_dir=os.environ.get('METRICS_DIR'))
 
-# Log all requests
+# Time every request
 @app.before_request
-def log_request():
-    logger.info(f'{request.method} {request.path} - {request.remote_addr}')
+def start_timer():
+    request.environ['metrics.start'] = time.perf_counter()
 
 @app.after_request
-def log_response(response):
-    logger.info(f'{request.method} {request.path} - {response.status_code}')
+def record_metrics(response):
+    # Route template (not the raw path) keeps label cardinality bounded
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    elapsed = time.perf_counter() - request.environ['metrics.start']
+    service.observe_request(route, request.method, response.status_code, elapsed)
     return response
 
-# Simulated health metrics
-health_status = {
-    "status": "healthy",
-    "cpu_usage": 0,
-    "memory_usage": 0,
-    "error_count": 0,
-    "uptime": 0
-}
+# Log all requests: one structured line per request, written by a background
+# thread; LOG_SAMPLE_RATE samples successful requests (see request_log.py)
+access_log = setup_request_logging(app)
+service.access_log = access_log
+logger = logging.getLogger(__name__)
 
-start_time = time.time()
+def json_response(result):
+    """(status_code, payload) from service.py -> Flask response"""
+    status_code, payload = result
+    return jsonify(payload), status_code
 
 @app.route('/')
 def home():
     """Home endpoint"""
-    return jsonify({
-        "message": "Patient App - Self Healing System",
-        "status": "running",
-        "endpoints": [
-            "/healthz - Kubernetes health probe (liveness/readiness)",
-            "/health - Detailed health status for ML monitoring",
-            "/metrics - Get system metrics",
-            "/simulate-error - Trigger an error",
-            "/heal - Trigger self-healing"
-        ]
-    })
+    return json_response(service.home())
 
 @app.route('/healthz')
 def healthz():
@@ -56,7 +49,7 @@ def healthz():
     Lightweight check - returns 200 if app is alive
     Used by Kubernetes to determine pod health and restart if needed
     """
-    return jsonify({"status": "ok"}), 200
+    return json_response(service.healthz())
 
 @app.route('/health')
 def health():
@@ -65,101 +58,41 @@ def health():
     Used by DoctorMonitorML for self-healing decisions
     Note: Kubernetes handles pod scaling via HPA based on CPU/memory
           This endpoint is for ML-driven healing decisions only
+
+    Supports If-None-Match (304), delta responses (A-IM: delta)
+    and msgpack bodies; plain requests get the full JSON payload.
     """
-    health_status["uptime"] = int(time.time() - start_time)
-    health_status["cpu_usage"] = random.randint(10, 90)
-    health_status["memory_usage"] = random.randint(20, 80)
-    
-    # Simulate degraded health if error count is high
-    if health_status["error_count"] > 5:
-        health_status["status"] = "degraded"
-    elif health_status["error_count"] > 10:
-        health_status["status"] = "critical"
-    else:
-        health_status["status"] = "healthy"
-    
-    return jsonify(health_status)
+    status_code, headers, body = service.health(request.headers)
+    return Response(body, status=status_code, headers=headers)
 
 @app.route('/metrics')
 def metrics():
-    """Get detailed metrics"""
-    return jsonify({
-        "cpu_usage": random.randint(10, 90),
-        "memory_usage": random.randint(20, 80),
-        "disk_usage": random.randint(30, 70),
-        "network_latency": random.randint(10, 100),
-        "active_connections": random.randint(1, 50),
-        "error_count": health_status["error_count"],
-        "uptime_seconds": int(time.time() - start_time)
-    })
+    """
+    Prometheus metrics: request counts and latency histograms per
+    route/status, error counters, process RSS and CPU time.
+    Use ?format=json for a compact JSON summary.
+    """
+    if request.args.get('format') == 'json':
+        return json_response(service.metrics('json'))
+    status_code, headers, body = service.metrics()
+    return Response(body, status=status_code, headers=headers)
 
 @app.route('/simulate-error')
 def simulate_error():
     """Simulate an error to test self-healing"""
-    health_status["error_count"] += 1
-    
-    error_types = [
-        "Database connection timeout",
-        "Memory leak detected",
-        "High CPU usage",
-        "Network connectivity issue",
-        "Service dependency failure"
-    ]
-    
-    error = random.choice(error_types)
-    
-    return jsonify({
-        "error": error,
-        "error_count": health_status["error_count"],
-        "status": "error_logged",
-        "message": "Error simulated. Monitor will detect and attempt healing."
-    }), 500
+    return json_response(service.simulate_error())
 
 @app.route('/heal', methods=['POST'])
 def heal():
     """Trigger self-healing mechanism"""
-    healing_action = request.json.get('action', 'reset_errors') if request.json else 'reset_errors'
-    
-    if healing_action == 'reset_errors':
-        old_count = health_status["error_count"]
-        health_status["error_count"] = 0
-        health_status["status"] = "healthy"
-        
-        return jsonify({
-            "message": "Self-healing completed",
-            "action": "Errors reset",
-            "previous_error_count": old_count,
-            "current_status": "healthy"
-        })
-    
-    elif healing_action == 'restart_service':
-        return jsonify({
-            "message": "Service restart initiated",
-            "action": "restart_service",
-            "status": "healing"
-        })
-    
-    else:
-        return jsonify({
-            "message": "Unknown healing action",
-            "action": healing_action
-        }), 400
+    return json_response(service.heal(request.json))
 
 @app.route('/data')
 def get_data():
     """Simulate data retrieval"""
-    # Randomly fail to simulate issues
-    if random.random() < 0.2:  # 20% chance of failure
-        health_status["error_count"] += 1
-        return jsonify({"error": "Data retrieval failed"}), 500
-    
-    return jsonify({
-        "data": [
-            {"id": i, "value": random.randint(1, 100)}
-            for i in range(10)
-        ],
-        "timestamp": time.time()
-    })
+    if service.data_delay:
+        time.sleep(service.data_delay)
+    return json_response(service.data())
 
 if __name__ == '__main__':
     print("🏥 Patient App Starting...")
@@ -0,0 +1,222 @@
+# ASGI Serving Mode for the Patient App
+#
+# The same endpoints as app.py, with the same logic and health_status
+# semantics (both call service.py), as a plain ASGI application:
+#
+#   cd app && gunicorn -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:5000 asgi_app:app
+#   cd app && uvicorn asgi_app:app --host 0.0.0.0 --port 5000     (one worker)
+#
+# For several workers use gunicorn's uvicorn worker class rather than
+# `uvicorn --workers N`: that mode binds its listening socket in a way that
+# leaves TCP_NODELAY off on the connections, and since an ASGI response goes
+# out as two writes (headers, body), every keep-alive response then waits
+# ~40ms for the client's delayed ACK. gunicorn sets TCP_NODELAY on its
+# listener.
+#
+# Under gunicorn's sync workers a request occupies its worker process from
+# accept to the last byte, so concurrent monitor probes and user traffic
+# beyond the worker count wait in the listen backlog. Here each worker runs
+# an event loop and interleaves all of its connections; a /data waiting on
+# its downstream call (DATA_DELAY) is an asyncio sleep that holds no worker.
+#
+# The endpoint logic itself (shared-memory error count, cached /health
+# readings, metrics shards) takes microseconds and never blocks, so it runs
+# on the loop directly. No web framework: routing is a dict lookup, which
+# keeps the per-request cost below Flask's.
+#
+# Responses match the Flask app's: same status codes, headers and JSON
+# bodies (sorted keys, compact, trailing newline like jsonify), the same
+# /health ETag/304/delta/msgpack handling, the same route labels in
+# /metrics, and the same access log (LOG_MODE, LOG_SAMPLE_RATE). Unknown
+# paths get 404 and wrong methods 405, with a JSON body.
+
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+from request_log import LOG_FORMAT, start_access_log
+from service import PatientService
+
+# Endpoint logic and state, shared with app.py (see service.py)
+service = PatientService(metrics_dir=os.environ.get('METRICS_DIR'))
+
+if os.environ.get('LOG_MODE', 'async') == 'legacy':
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    access_log = None
+else:
+    access_log = start_access_log()
+service.access_log = access_log
+logger = logging.getLogger(__name__)
+
+_encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+class Request:
+    """What the handlers need from an ASGI http scope"""
+
+    __slots__ = ('scope', 'receive', 'method', 'path', '_headers', '_query')
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope['method']
+        self.path = scope['path']
+        self._headers = None
+        self._query = None
+
+    @property
+    def headers(self):
+        """Case-insensitive .get() view (what HealthSnapshot.respond reads)"""
+        if self._headers is None:
+            self._headers = _Headers(self.scope['headers'])
+        return self._headers
+
+    @property
+    def query(self):
+        if self._query is None:
+            raw = parse_qs(self.scope['query_string'].decode('latin-1'))
+            self._query = {key: values[-1] for key, values in raw.items()}
+        return self._query
+
+    @property
+    def remote_addr(self):
+        client = self.scope.get('client')
+        return client[0] if client else None
+
+    async def body(self):
+        chunks = []
+        more = True
+        while more:
+            message = await self.receive()
+            chunks.append(message.get('body', b''))
+            more = message.get('more_body', False)
+        return b''.join(chunks)
+
+
+class _Headers:
+    __slots__ = ('_items',)
+
+    def __init__(self, raw):
+        self._items = {name.decode('latin-1').lower(): value.decode('latin-1')
+                       for name, value in raw}
+
+    def get(self, name, default=None):
+        return self._items.get(name.lower(), default)
+
+
+def json_response(result):
+    """(status_code, payload) from service.py -> (status, headers, body)"""
+    status_code, payload = result
+    return status_code, _JSON_HEADERS, (_encoder.encode(payload) + '\n').encode()
+
+
+# Endpoints (see app.py for what each one is for)
+
+async def home(request):
+    return json_response(service.home())
+
+
+async def healthz(request):
+    return json_response(service.healthz())
+
+
+async def health(request):
+    return service.health(request.headers)
+
+
+async def metrics(request):
+    if request.query.get('format') == 'json':
+        return json_response(service.metrics('json'))
+    return service.metrics()
+
+
+async def simulate_error(request):
+    return json_response(service.simulate_error())
+
+
+async def heal(request):
+    # Same contract as Flask's request.json: JSON content type required,
+    # malformed JSON is a 400
+    content_type = request.headers.get('Content-Type', '')
+    if content_type.split(';')[0].strip() != 'application/json':
+        return json_response((415, {"error": "Content-Type must be application/json"}))
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        return json_response((400, {"error": "Malformed JSON body"}))
+    return json_response(service.heal(body))
+
+
+async def get_data(request):
+    if service.data_delay:
+        await asyncio.sleep(service.data_delay)
+    return json_response(service.data())
+
+
+# path -> (methods, handler); HEAD is served wherever GET is
+ROUTES = {
+    '/': (('GET',), home),
+    '/healthz': (('GET',), healthz),
+    '/health': (('GET',), health),
+    '/metrics': (('GET',), metrics),
+    '/simulate-error': (('GET',), simulate_error),
+    '/heal': (('POST',), heal),
+    '/data': (('GET',), get_data),
+}
+
+
+async def _dispatch(request):
+    """(route label, status, headers, body)"""
+    route = ROUTES.get(request.path)
+    if route is None:
+        return '<unmatched>', *json_response((404, {"error": "Not Found"}))
+    methods, handler = route
+    method = 'GET' if request.method == 'HEAD' else request.method
+    if method not in methods:
+        status, headers, body = json_response((405, {"error": "Method Not Allowed"}))
+        return '<unmatched>', status, {**headers, 'Allow': ', '.join(methods)}, body
+    try:
+        return request.path, *(await handler(request))
+    except Exception:
+        logger.exception(f"{request.method} {request.path} failed")
+        return request.path, *json_response((500, {"error": "Internal Server Error"}))
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    request = Request(scope, receive)
+    route, status_code, headers, body = await _dispatch(request)
+
+    raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in headers.items()]
+    raw_headers.append((b'content-length', str(len(body)).encode()))
+    await send({'type': 'http.response.start', 'status': status_code, 'headers': raw_headers})
+    await send({'type': 'http.response.body',
+                'body': b'' if request.method == 'HEAD' else body})
+
+    elapsed = time.perf_counter() - start
+    service.observe_request(route, request.method, status_code, elapsed)
+    if access_log is not None:
+        access_log.log(request.method, request.path, status_code, elapsed, request.remote_addr)
+    else:
+        logger.info(f'{request.method} {request.path} - {status_code}')
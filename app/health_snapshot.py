@@ -0,0 +1,152 @@
+# Conditional /health Responses
+#
+# The monitor probes /health far more often than anything in it changes, so
+# the endpoint supports revalidation instead of re-sending the same payload:
+#
+# - Readings (CPU/memory) are sampled once per HEALTH_SAMPLE_INTERVAL seconds
+#   (default 10), not per request. Each sample period's reading is derived
+#   from (start time, period), so every gunicorn worker reports the same
+#   values for the same period.
+# - ETag = "<start>.<version>.<period>": app start time (ms, base 36), the
+#   shared state version (bumped by every error and reset, see
+#   shared_state.py) and the sample period (hex). Uptime is left out; it
+#   changes every second and clients advance it themselves.
+# - If-None-Match with the current ETag -> 304 Not Modified, no body.
+# - Delta (RFC 3229 style): with "A-IM: delta" and an older ETag of the same
+#   app start, the response is 226 IM Used with only the fields that changed
+#   since that ETag. The base is the If-None-Match ETag and is decoded from
+#   the ETag itself, so the server keeps no per-client state.
+# - Accept: application/msgpack -> msgpack body (if msgpack is installed);
+#   JSON otherwise.
+#
+# Clients that send none of these headers get the same 200 JSON as before.
+# The client side is health_client.py in the monitor.
+
+import json
+import os
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DELTA_IM = 'delta'
+MSGPACK_TYPE = 'application/msgpack'
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _base36(value):
+    digits = []
+    while True:
+        value, digit = divmod(value, 36)
+        digits.append(_DIGITS[digit])
+        if not value:
+            return ''.join(reversed(digits))
+
+
+class HealthSnapshot:
+    """
+    Versioned /health payload with conditional and delta responses
+
+    Usage:
+        snapshot = HealthSnapshot(shared_state)
+        status, headers, body = snapshot.respond(request.headers)
+    """
+
+    def __init__(self, shared_state, sample_interval=None, clock=time.time):
+        self.shared_state = shared_state
+        self.sample_interval = sample_interval or float(os.environ.get('HEALTH_SAMPLE_INTERVAL', 10))
+        self.clock = clock
+        self.start_time = shared_state.start_time
+        start_ms = int(self.start_time * 1000)
+        self._start_token = _base36(start_ms)
+        self._seed = start_ms << 20
+        self._period = None
+        self._reading = None
+
+    def _reading_for(self, period):
+        """(cpu_usage, memory_usage) for a sample period, same in every worker"""
+        if period != self._period:
+            # 64-bit LCG step on (start, period): cheap and deterministic
+            x = ((self._seed + period) * 6364136223846793005 + 1442695040888963407) & (2**64 - 1)
+            self._reading = (10 + (x >> 33) % 81, 20 + (x >> 13) % 61)
+            self._period = period
+        return self._reading
+
+    def _state(self):
+        """(now, version, period, etag) at this moment"""
+        now = self.clock()
+        period = int((now - self.start_time) // self.sample_interval)
+        version = self.shared_state.version
+        return now, version, period, f'"{self._start_token}.{version:x}.{period:x}"'
+
+    def _payload(self, now, period):
+        error_count = self.shared_state.error_count
+        cpu_usage, memory_usage = self._reading_for(period)
+
+        # Simulate degraded health if error count is high
+        if error_count > 5:
+            status = "degraded"
+        elif error_count > 10:
+            status = "critical"
+        else:
+            status = "healthy"
+
+        return {
+            "status": status,
+            "cpu_usage": cpu_usage,
+            "memory_usage": memory_usage,
+            "error_count": error_count,
+            "uptime": int(now - self.start_time),
+        }
+
+    def current(self):
+        """(etag, payload) at this moment"""
+        now, _, period, etag = self._state()
+        return etag, self._payload(now, period)
+
+    def _delta(self, base, version, period, payload):
+        """Fields changed since an ETag of this app start (None if not applicable)"""
+        try:
+            start, base_version, base_period = base.strip().strip('"').split('.')
+            base_version, base_period = int(base_version, 16), int(base_period, 16)
+        except ValueError:
+            return None
+        if start != self._start_token:
+            return None
+
+        delta = {}
+        if base_version != version:
+            delta["status"] = payload["status"]
+            delta["error_count"] = payload["error_count"]
+        if base_period != period:
+            delta["cpu_usage"] = payload["cpu_usage"]
+            delta["memory_usage"] = payload["memory_usage"]
+        return delta
+
+    def respond(self, request_headers):
+        """(status_code, headers, body bytes) for a /health request"""
+        now, version, period, etag = self._state()
+        headers = {'ETag': etag}
+
+        # Nothing changed: answered without building the payload at all
+        base = request_headers.get('If-None-Match')
+        if base == etag:
+            return 304, headers, b''
+
+        status_code = 200
+        payload = self._payload(now, period)
+        if base and DELTA_IM in request_headers.get('A-IM', ''):
+            delta = self._delta(base, version, period, payload)
+            if delta is not None:
+                status_code = 226
+                headers['IM'] = DELTA_IM
+                payload = delta
+
+        if msgpack is not None and MSGPACK_TYPE in request_headers.get('Accept', ''):
+            headers['Content-Type'] = MSGPACK_TYPE
+            return status_code, headers, msgpack.packb(payload)
+        headers['Content-Type'] = 'application/json'
+        return status_code, headers, json.dumps(payload, separators=(',', ':')).encode()
@@ -0,0 +1,409 @@
+# In-Process Metrics for the Patient App
+#
+# Request counters, latency histograms and error counters exposed in the
+# Prometheus text format, plus the process's real RSS and CPU time.
+#
+# Low overhead on the request path:
+# - Each thread records into its own shard (a dict of plain lists), so the
+#   hot path takes no lock; a shard is registered once per thread
+# - When a thread exits, its shard is folded into one retired shard, so a
+#   server that starts a thread per connection keeps a shard per live thread
+#   rather than one per thread it ever ran
+# - A scrape merges all shards; reading while other threads write only ever
+#   sees a slightly older value, never a torn one
+#
+# Gunicorn workers are separate processes with separate memory. When
+# METRICS_DIR is set, each worker periodically writes its merged snapshot to
+# METRICS_DIR/worker-<pid>-<start>.json (atomic rename) and a scrape - whichever
+# worker serves it - merges the snapshots of all workers. Without METRICS_DIR
+# the exposition covers the serving process only.
+#
+# The start time in the name gives a worker with a recycled PID (common in
+# containers) its own file instead of overwriting a dead worker's totals. A
+# scrape folds the snapshots of exited workers into METRICS_DIR/retired.json
+# and deletes them, so counters never go backwards and the directory holds
+# one file per live worker. A worker counts as exited when its PID is gone,
+# or its file has not been rewritten for `stale_after` seconds (the PID was
+# reused by another process).
+
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+
+try:
+    import fcntl  # Unix only; serializes folding between workers
+except ImportError:
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency histogram upper bounds in seconds (+Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def _resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _merge_snapshot(requests, errors, snapshot):
+    """Add a snapshot's counters to {key tuple: series} and {kind: count}"""
+    for key, series in snapshot['requests']:
+        key = tuple(key)
+        merged = requests.get(key)
+        if merged is None:
+            requests[key] = list(series)
+        else:
+            for i, value in enumerate(series):
+                merged[i] += value
+    for kind, count in snapshot['errors'].items():
+        errors[kind] = errors.get(kind, 0) + count
+
+
+def _process_metrics(start_time):
+    times = os.times()
+    return {
+        'resident_memory_bytes': _resident_memory_bytes(),
+        'cpu_seconds_total': times.user + times.system,
+        'start_time_seconds': start_time,
+    }
+
+
+class _Shard:
+    """Metrics recorded by one thread"""
+
+    __slots__ = ('requests', 'errors')
+
+    def __init__(self):
+        # (route, method, status) -> [count, sum_seconds, bucket_0, ..., bucket_inf]
+        self.requests = {}
+        # kind -> count
+        self.errors = {}
+
+    def merge(self, other):
+        for key, series in list(other.requests.items()):
+            merged = self.requests.get(key)
+            if merged is None:
+                self.requests[key] = list(series)
+            else:
+                for i, value in enumerate(series):
+                    merged[i] += value
+        for kind, count in list(other.errors.items()):
+            self.errors[kind] = self.errors.get(kind, 0) + count
+
+
+class _ShardOwner:
+    """Kept in the thread's local storage; collected when the thread exits"""
+
+    __slots__ = ('__weakref__',)
+
+
+class MetricsRegistry:
+    """
+    Per-thread sharded request/error metrics
+
+    Usage:
+        registry = MetricsRegistry()
+        registry.observe_request('/health', 'GET', 200, 0.0012)
+        registry.inc_error('data_retrieval')
+        text = registry.exposition()
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, metrics_dir=None, flush_interval=1.0,
+                 stale_after=60.0):
+        self.buckets = tuple(buckets)
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after
+        self.start_time = time.time()
+        self._snapshot_name = self._worker_file_name()
+
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()
+        self._flusher = None
+
+        # A forked worker (e.g. gunicorn --preload) starts with clean metrics
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()
+        self._flusher = None
+        self.start_time = time.time()
+        self._snapshot_name = self._worker_file_name()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._new_shard()
+        return shard
+
+    def _new_shard(self):
+        shard = _Shard()
+        with self._shards_lock:
+            self._shards.append(shard)
+            start_flusher = self.metrics_dir and self._flusher is None
+            if start_flusher:
+                self._flusher = True
+        self._local.shard = shard
+        self._local.owner = owner = _ShardOwner()
+        weakref.finalize(owner, self._retire_shard, shard)
+        if start_flusher:
+            self._start_flusher()
+        return shard
+
+    def _retire_shard(self, shard):
+        """Fold the shard of an exited thread into the retired totals"""
+        with self._shards_lock:
+            # Shards of the parent process are gone after a fork
+            if shard in self._shards:
+                self._shards.remove(shard)
+                self._retired.merge(shard)
+
+    def observe_request(self, route, method, status, seconds):
+        """Record one finished request (hot path, lock-free)"""
+        requests = self._shard().requests
+        key = (route, method, status)
+        series = requests.get(key)
+        if series is None:
+            series = requests[key] = [0, 0.0] + [0] * (len(self.buckets) + 1)
+        series[0] += 1
+        series[1] += seconds
+        series[2 + bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def inc_error(self, kind):
+        """Count an application error by kind"""
+        errors = self._shard().errors
+        errors[kind] = errors.get(kind, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+
+    def snapshot(self):
+        """Merged metrics of this process as a JSON-serializable dict"""
+        merged = _Shard()
+        # Under the lock, so a shard retiring mid-merge is not counted twice
+        with self._shards_lock:
+            merged.merge(self._retired)
+            for shard in self._shards:
+                merged.merge(shard)
+
+        return {
+            'pid': os.getpid(),
+            'requests': [[list(key), series] for key, series in merged.requests.items()],
+            'errors': merged.errors,
+            'process': _process_metrics(self.start_time),
+        }
+
+    def _worker_file_name(self):
+        return f"worker-{os.getpid()}-{int(self.start_time * 1e6)}.json"
+
+    def _write_json(self, path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def flush(self):
+        """Write this worker's snapshot to METRICS_DIR (atomic rename)"""
+        snapshot = self.snapshot()
+        self._write_json(os.path.join(self.metrics_dir, self._snapshot_name), snapshot)
+        return snapshot
+
+    def _start_flusher(self):
+        os.makedirs(self.metrics_dir, exist_ok=True)
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=run, name='metrics-flusher', daemon=True)
+        self._flusher.start()
+
+    def collect(self):
+        """Snapshots of all workers (just this process without METRICS_DIR)"""
+        if not self.metrics_dir:
+            return [self.snapshot()]
+
+        own = self.flush()
+        snapshots = [own]
+        exited = []
+        now = time.time()
+        for name in os.listdir(self.metrics_dir):
+            if not name.startswith('worker-') or not name.endswith('.json'):
+                continue
+            if name == self._snapshot_name:
+                continue
+            path = os.path.join(self.metrics_dir, name)
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+                stale = now - os.path.getmtime(path) > self.stale_after
+            except (OSError, ValueError):
+                continue
+            if stale or not _pid_alive(snapshot['pid']):
+                exited.append(name)
+            else:
+                snapshots.append(snapshot)
+
+        retired = self._fold_exited(exited) if exited else self._read_retired()
+        if retired['requests'] or retired['errors']:
+            snapshots.append(retired)
+        return snapshots
+
+    def _read_retired(self):
+        """Totals of exited workers ({'pid': None, ...}; empty if none yet)"""
+        try:
+            with open(os.path.join(self.metrics_dir, 'retired.json')) as f:
+                retired = json.load(f)
+        except (OSError, ValueError):
+            retired = {'requests': [], 'errors': {}, 'folded': []}
+        retired['pid'] = None
+        return retired
+
+    def _fold_exited(self, names):
+        """Add exited workers' snapshots to retired.json and delete them"""
+        lock = open(os.path.join(self.metrics_dir, 'retired.lock'), 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = self._read_retired()
+            # Files folded by a scrape that stopped before deleting them
+            folded = {name for name in retired.get('folded', [])
+                      if os.path.exists(os.path.join(self.metrics_dir, name))}
+            requests = {tuple(key): series for key, series in retired['requests']}
+            errors = retired['errors']
+            for name in names:
+                if name in folded:
+                    continue
+                try:
+                    with open(os.path.join(self.metrics_dir, name)) as f:
+                        _merge_snapshot(requests, errors, json.load(f))
+                except (OSError, ValueError):
+                    continue
+                folded.add(name)
+
+            retired = {'requests': [[list(key), series] for key, series in requests.items()],
+                       'errors': errors, 'folded': sorted(folded)}
+            self._write_json(os.path.join(self.metrics_dir, 'retired.json'), retired)
+            for name in folded:
+                try:
+                    os.remove(os.path.join(self.metrics_dir, name))
+                except OSError:
+                    pass
+        finally:
+            lock.close()
+        retired['pid'] = None
+        return retired
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    def totals(self):
+        """Request/error totals across workers (for the JSON view)"""
+        requests = errors = 0
+        for snapshot in self.collect():
+            requests += sum(series[0] for _, series in snapshot['requests'])
+            errors += sum(snapshot['errors'].values())
+        return {'requests_total': requests, 'errors_total': errors}
+
+    def exposition(self, gauges=None):
+        """
+        Prometheus text format for all workers
+
+        gauges: optional {name: (help, value)} of extra app-level gauges
+        """
+        snapshots = self.collect()
+        requests = {}
+        errors = {}
+        for snapshot in snapshots:
+            _merge_snapshot(requests, errors, snapshot)
+
+        lines = [
+            '# HELP patient_app_requests_total Requests handled, by route/method/status.',
+            '# TYPE patient_app_requests_total counter',
+        ]
+        for (route, method, status), series in sorted(requests.items()):
+            lines.append(
+                f'patient_app_requests_total{{route="{route}",method="{method}",status="{status}"}} {series[0]}'
+            )
+
+        lines += [
+            '# HELP patient_app_request_duration_seconds Request latency, by route/method/status.',
+            '# TYPE patient_app_request_duration_seconds histogram',
+        ]
+        bounds = [repr(b) for b in self.buckets] + ['+Inf']
+        for (route, method, status), series in sorted(requests.items()):
+            labels = f'route="{route}",method="{method}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(bounds, series[2:]):
+                cumulative += count
+                lines.append(
+                    f'patient_app_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'patient_app_request_duration_seconds_sum{{{labels}}} {series[1]}')
+            lines.append(f'patient_app_request_duration_seconds_count{{{labels}}} {series[0]}')
+
+        lines += [
+            '# HELP patient_app_errors_total Application errors, by kind.',
+            '# TYPE patient_app_errors_total counter',
+        ]
+        for kind, count in sorted(errors.items()):
+            lines.append(f'patient_app_errors_total{{kind="{kind}"}} {count}')
+
+        process_metrics = (
+            ('resident_memory_bytes', 'gauge', 'Resident memory size in bytes.'),
+            ('cpu_seconds_total', 'counter', 'User and system CPU time spent in seconds.'),
+            ('start_time_seconds', 'gauge', 'Start time of the process since unix epoch in seconds.'),
+        )
+        # Request/error counters of exited workers are kept in retired.json
+        # (counters must not go backwards); their process gauges are not
+        live = [snapshot for snapshot in snapshots if snapshot['pid'] is not None]
+        for name, kind, text in process_metrics:
+            lines.append(f'# HELP process_{name} {text}')
+            lines.append(f'# TYPE process_{name} {kind}')
+            for snapshot in live:
+                lines.append(f'process_{name}{{pid="{snapshot["pid"]}"}} {snapshot["process"][name]}')
+
+        for name, (text, value) in (gauges or {}).items():
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,74 @@
+# Push Notifications to the Monitor
+#
+# When MONITOR_NOTIFY_URL is set (e.g. http://ml-monitor:8081/notify), the app
+# tells the monitor "probe me now" whenever its error count rises, so the
+# monitor can back off probing of healthy pods without detecting incidents
+# late.
+#
+# notify() only sets a flag; a background thread sends at most one POST per
+# min_interval, so an error burst costs one request, and a slow or absent
+# monitor never delays a request thread.
+#
+# The monitor identifies the pod by the sender's address, or by
+# MONITOR_NOTIFY_TARGET (host:port or base URL) when that is set.
+
+import json
+import os
+import threading
+import time
+import urllib.request
+
+
+class MonitorNotifier:
+    """
+    Rate-limited, non-blocking "probe me" notifications
+
+    Usage:
+        notifier = MonitorNotifier('http://ml-monitor:8081/notify')
+        notifier.notify()
+    """
+
+    def __init__(self, url, target=None, min_interval=1.0, timeout=1.0):
+        self.url = url
+        self.target = target
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._pending = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='monitor-notifier', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Ask the monitor for a probe (hot path: sets a flag)"""
+        self._pending.set()
+
+    def _run(self):
+        body = json.dumps({'target': self.target} if self.target else {}).encode()
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            request = urllib.request.Request(
+                self.url, data=body, method='POST',
+                headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+                self.sent += 1
+            except Exception:
+                # 404 (target not monitored yet) or monitor unreachable
+                self.failed += 1
+            time.sleep(self.min_interval)
+
+
+def notifier_from_env():
+    """MonitorNotifier for $MONITOR_NOTIFY_URL, or None when unset"""
+    url = os.environ.get('MONITOR_NOTIFY_URL')
+    if not url:
+        return None
+    return MonitorNotifier(url, target=os.environ.get('MONITOR_NOTIFY_TARGET'))
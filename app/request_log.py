@@ -0,0 +1,186 @@
+# Asynchronous, Sampled Request Logging
+#
+# The request thread only does a sampling check and a non-blocking put of a
+# small tuple onto a bounded queue. A background writer thread drains the
+# queue in batches, formats one JSON line per request and writes each batch
+# with a single write + flush.
+#
+# - Successful requests (status < 400) are logged with probability
+#   LOG_SAMPLE_RATE (default 1.0); errors are always logged
+# - If the writer falls behind and the queue is full, records are dropped
+#   (and counted) instead of blocking requests
+# - Static fields (app, pid) are formatted once per process
+#
+# Regular logging (logger.info/...) goes through the same queue and writer,
+# so it never blocks a request thread either.
+#
+# LOG_MODE=legacy restores the previous behaviour (two synchronous,
+# f-string formatted log lines per request) for before/after comparisons.
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class _QueueingHandler(logging.Handler):
+    """Hands regular log records to the AccessLog queue unformatted; the
+    writer thread formats them"""
+
+    def __init__(self, access_log):
+        super().__init__()
+        self.access_log = access_log
+
+    def emit(self, record):
+        self.access_log.put_record(record)
+
+
+class AccessLog:
+    """
+    Non-blocking structured access log
+
+    Usage:
+        access_log = AccessLog(sample_rate=0.1)
+        access_log.start()
+        access_log.log('GET', '/data', 200, 0.0012, '10.0.0.5')
+    """
+
+    def __init__(self, stream=None, sample_rate=1.0, max_queue=10000,
+                 batch_size=512, flush_interval=0.2):
+        self.stream = stream or sys.stdout
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.sampled_out = 0
+        self._prefix = None
+        self._thread = None
+
+    def start(self):
+        """Start the background writer (restarted automatically in forked children)"""
+        self._prefix = '{"app":"patient-app","pid":%d,' % os.getpid()
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._prefix = '{"app":"patient-app","pid":%d,' % os.getpid()
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, method, path, status, seconds, remote_addr):
+        """Record one request (hot path: sampling check + put_nowait)"""
+        if status < 400 and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        try:
+            self.queue.put_nowait((time.time(), method, path, status, seconds, remote_addr))
+        except queue.Full:
+            self.dropped += 1
+
+    def put_record(self, record):
+        """Enqueue a stdlib LogRecord (used by _QueueingHandler)"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _format(self, item):
+        if isinstance(item, logging.LogRecord):
+            return self._prefix + '"ts":%.3f,"level":%s,"logger":%s,"msg":%s}\n' % (
+                item.created, json.dumps(item.levelname), json.dumps(item.name),
+                json.dumps(item.getMessage()))
+
+        ts, method, path, status, seconds, remote_addr = item
+        return self._prefix + '"ts":%.3f,"method":"%s","path":%s,"status":%d,"ms":%.2f,"remote":%s}\n' % (
+            ts, method, json.dumps(path), status, seconds * 1000.0, json.dumps(remote_addr))
+
+    def _run(self):
+        get = self.queue.get
+        get_nowait = self.queue.get_nowait
+        while True:
+            try:
+                batch = [get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                self.stream.write(''.join(self._format(item) for item in batch))
+                self.stream.flush()
+            except Exception:
+                pass
+
+
+def start_access_log(sample_rate=None):
+    """
+    Start an AccessLog and route regular logging through it
+
+    sample_rate: fraction of successful requests to log; defaults to
+                 $LOG_SAMPLE_RATE or 1.0
+    Used by setup_request_logging() and by asgi_app.py.
+    """
+    if sample_rate is None:
+        sample_rate = float(os.environ.get('LOG_SAMPLE_RATE', '1.0'))
+    access_log = AccessLog(sample_rate=sample_rate)
+    access_log.start()
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers[:] = [_QueueingHandler(access_log)]
+    return access_log
+
+
+def setup_request_logging(app, mode=None, sample_rate=None):
+    """
+    Install request logging on a Flask app
+
+    mode:        'async' (default) or 'legacy'; defaults to $LOG_MODE
+    sample_rate: fraction of successful requests to log; defaults to
+                 $LOG_SAMPLE_RATE or 1.0
+    Returns the AccessLog (None in legacy mode).
+    """
+    from flask import request
+
+    mode = mode or os.environ.get('LOG_MODE', 'async')
+
+    if mode == 'legacy':
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        logger = logging.getLogger(app.import_name)
+
+        @app.before_request
+        def log_request():
+            logger.info(f'{request.method} {request.path} - {request.remote_addr}')
+
+        @app.after_request
+        def log_response(response):
+            logger.info(f'{request.method} {request.path} - {response.status_code}')
+            return response
+
+        return None
+
+    access_log = start_access_log(sample_rate)
+
+    @app.after_request
+    def log_response(response):
+        environ = request.environ
+        start = environ.get('metrics.start')
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        access_log.log(request.method, request.path, response.status_code,
+                       elapsed, request.remote_addr)
+        return response
+
+    return access_log
@@ -0,0 +1,172 @@
+# Patient App Endpoint Logic
+#
+# What every endpoint does and returns, independent of how it is served:
+# app.py serves it through Flask (WSGI: gunicorn, the dev server) and
+# asgi_app.py through a plain ASGI app (uvicorn). Both use the same shared
+# error count (shared_state.py), /health snapshots and ETags
+# (health_snapshot.py), metrics (metrics.py) and monitor push (notifier.py),
+# so the monitor sees the same health_status semantics whichever way the app
+# is served, and both can run side by side on one state file.
+#
+# Methods return (status_code, payload) for JSON endpoints; health() and
+# metrics() return (status_code, headers, body) like HealthSnapshot.respond.
+#
+# DATA_DELAY (seconds, default 0) stands in for the downstream call a real
+# /data would make; the server waits it out (time.sleep under WSGI, an
+# asyncio sleep under ASGI) before data() is called.
+
+import os
+import random
+import time
+
+from health_snapshot import HealthSnapshot
+from metrics import CONTENT_TYPE, MetricsRegistry
+from notifier import notifier_from_env
+from shared_state import SharedHealthState
+
+ENDPOINTS = [
+    "/healthz - Kubernetes health probe (liveness/readiness)",
+    "/health - Detailed health status for ML monitoring",
+    "/metrics - Prometheus metrics (requests, latency, errors, process)",
+    "/simulate-error - Trigger an error",
+    "/heal - Trigger self-healing"
+]
+
+ERROR_TYPES = [
+    "Database connection timeout",
+    "Memory leak detected",
+    "High CPU usage",
+    "Network connectivity issue",
+    "Service dependency failure"
+]
+
+
+class PatientService:
+    """
+    Endpoint logic and state of the patient app
+
+    Usage:
+        service = PatientService(metrics_dir=os.environ.get('METRICS_DIR'))
+        status, payload = service.simulate_error()
+        status, headers, body = service.health(request.headers)
+    """
+
+    def __init__(self, metrics_dir=None, data_delay=None):
+        # In-process request/error metrics (see metrics.py). Set METRICS_DIR
+        # under gunicorn/uvicorn workers so a scrape of any worker covers all
+        self.metrics_registry = MetricsRegistry(metrics_dir=metrics_dir)
+
+        # Error count and start time shared by all worker processes (see
+        # shared_state.py), so every worker reports and resets the same count
+        self.shared_state = SharedHealthState()
+        self.start_time = self.shared_state.start_time
+
+        # /health readings, ETags and 304/delta responses (see health_snapshot.py)
+        self.health_snapshot = HealthSnapshot(self.shared_state)
+
+        # Optional push to the monitor when errors rise (MONITOR_NOTIFY_URL,
+        # see notifier.py), so it does not have to poll healthy pods often
+        self.monitor_notifier = notifier_from_env()
+
+        # Set by the serving module once request logging is set up
+        self.access_log = None
+
+        if data_delay is None:
+            data_delay = float(os.environ.get('DATA_DELAY', 0))
+        self.data_delay = data_delay
+
+    def record_error(self, kind):
+        """Count an application error (shared count, metrics, monitor push)"""
+        error_count = self.shared_state.increment_errors()
+        self.metrics_registry.inc_error(kind)
+        if self.monitor_notifier is not None:
+            self.monitor_notifier.notify()
+        return error_count
+
+    def observe_request(self, route, method, status_code, seconds):
+        self.metrics_registry.observe_request(route, method, status_code, seconds)
+
+    # Endpoints
+
+    def home(self):
+        return 200, {
+            "message": "Patient App - Self Healing System",
+            "status": "running",
+            "endpoints": ENDPOINTS
+        }
+
+    def healthz(self):
+        return 200, {"status": "ok"}
+
+    def health(self, request_headers):
+        return self.health_snapshot.respond(request_headers)
+
+    def metrics(self, fmt=None):
+        """Prometheus text, or the compact JSON summary for fmt='json'"""
+        if fmt == 'json':
+            return 200, {
+                **self.metrics_registry.totals(),
+                "error_count": self.shared_state.error_count,
+                "uptime_seconds": int(time.time() - self.start_time)
+            }
+
+        gauges = {
+            'patient_app_error_count': ("Current error count reported by /health.",
+                                        self.shared_state.error_count),
+            'patient_app_uptime_seconds': ("Seconds since the app started.",
+                                           int(time.time() - self.start_time)),
+        }
+        if self.access_log is not None:
+            gauges['patient_app_log_dropped'] = ("Access log records dropped (queue full).",
+                                                 self.access_log.dropped)
+        body = self.metrics_registry.exposition(gauges=gauges)
+        return 200, {'Content-Type': CONTENT_TYPE}, body.encode()
+
+    def simulate_error(self):
+        error_count = self.record_error('simulated')
+        return 500, {
+            "error": random.choice(ERROR_TYPES),
+            "error_count": error_count,
+            "status": "error_logged",
+            "message": "Error simulated. Monitor will detect and attempt healing."
+        }
+
+    def heal(self, body):
+        """body: the parsed JSON request body (or None)"""
+        healing_action = body.get('action', 'reset_errors') if body else 'reset_errors'
+
+        if healing_action == 'reset_errors':
+            old_count = self.shared_state.reset_errors()
+            return 200, {
+                "message": "Self-healing completed",
+                "action": "Errors reset",
+                "previous_error_count": old_count,
+                "current_status": "healthy"
+            }
+
+        elif healing_action == 'restart_service':
+            return 200, {
+                "message": "Service restart initiated",
+                "action": "restart_service",
+                "status": "healing"
+            }
+
+        else:
+            return 400, {
+                "message": "Unknown healing action",
+                "action": healing_action
+            }
+
+    def data(self):
+        # Randomly fail to simulate issues
+        if random.random() < 0.2:  # 20% chance of failure
+            self.record_error('data_retrieval')
+            return 500, {"error": "Data retrieval failed"}
+
+        return 200, {
+            "data": [
+                {"id": i, "value": random.randint(1, 100)}
+                for i in range(10)
+            ],
+            "timestamp": time.time()
+        }
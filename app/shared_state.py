@@ -0,0 +1,170 @@
+# Shared Health State Across Gunicorn Workers
+#
+# Gunicorn workers are separate processes, so a module-level dict gives every
+# worker its own error_count: /simulate-error, /data failures and /heal each
+# only touch the worker that served them, and the monitor sees whichever
+# worker answered /health.
+#
+# This module keeps the state in one small memory-mapped file that every
+# worker maps MAP_SHARED:
+#
+#   offset  type     field
+#   0       4s       magic (b'PHS1')
+#   8       int64    owner id (start time of the owning process group leader)
+#   16      int64    error_count
+#   24      int64    version (incremented on every change)
+#   32      float64  start_time (first worker to create the file)
+#
+# - Reads are a single aligned 8-byte load from the mapping (no syscall)
+# - Updates are read-modify-write under a thread lock + fcntl file lock, so
+#   increments from concurrent workers/threads are never lost and a /heal
+#   reset is seen by every worker at once
+#
+# The file lives in /dev/shm (RAM) and is named after the process group, which
+# the gunicorn master and its workers share with or without --preload.
+# SHARED_STATE_PATH overrides the location. Without fcntl (e.g. Windows) the
+# state falls back to process-private memory.
+
+import contextlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b'PHS1'
+SIZE = 64
+
+_HEADER = struct.Struct('<4s4xq')
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+
+_ERROR_COUNT_OFFSET = 16
+_VERSION_OFFSET = 24
+_START_TIME_OFFSET = 32
+
+
+def _process_start_ticks(pid):
+    """Start time of a process in clock ticks since boot (0 if unknown)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Field 22; split after the ')' closing the command name
+            return int(f.read().rpartition(')')[2].split()[19])
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def default_path():
+    """State file shared by the current process group"""
+    path = os.environ.get('SHARED_STATE_PATH')
+    if path:
+        return path
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f'patient-app-state-{os.getpgrp()}.bin')
+
+
+class SharedHealthState:
+    """
+    error_count / start_time shared by all worker processes
+
+    Usage:
+        state = SharedHealthState()
+        state.increment_errors()
+        state.error_count            # same value in every worker
+        old = state.reset_errors()
+    """
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._fd = None
+
+        if fcntl is None:
+            self.path = None
+            self._map = mmap.mmap(-1, SIZE)
+            self._initialize(owner=0)
+            return
+
+        self.path = path or default_path()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        # A file left behind by an earlier process group that reused this
+        # pgid is detected by the group leader's start time and reset
+        owner = _process_start_ticks(os.getpgrp()) if path is None else 0
+        with self._file_lock():
+            if os.fstat(self._fd).st_size < SIZE:
+                os.ftruncate(self._fd, SIZE)
+            self._map = mmap.mmap(self._fd, SIZE, mmap.MAP_SHARED,
+                                  mmap.PROT_READ | mmap.PROT_WRITE)
+            magic, stored_owner = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or stored_owner != owner:
+                self._initialize(owner)
+
+    def _initialize(self, owner):
+        _HEADER.pack_into(self._map, 0, MAGIC, owner)
+        _INT64.pack_into(self._map, _ERROR_COUNT_OFFSET, 0)
+        _INT64.pack_into(self._map, _VERSION_OFFSET, 0)
+        _FLOAT64.pack_into(self._map, _START_TIME_OFFSET, time.time())
+
+    def _file_lock(self):
+        if self._fd is None:
+            return contextlib.nullcontext()
+        return _FileLock(self._fd)
+
+    def _update(self, compute):
+        """Atomically replace error_count with compute(old); returns old"""
+        with self._lock, self._file_lock():
+            old = _INT64.unpack_from(self._map, _ERROR_COUNT_OFFSET)[0]
+            version = _INT64.unpack_from(self._map, _VERSION_OFFSET)[0]
+            _INT64.pack_into(self._map, _ERROR_COUNT_OFFSET, compute(old))
+            _INT64.pack_into(self._map, _VERSION_OFFSET, version + 1)
+            return old
+
+    @property
+    def error_count(self):
+        return _INT64.unpack_from(self._map, _ERROR_COUNT_OFFSET)[0]
+
+    @property
+    def version(self):
+        """Change counter, incremented by every update"""
+        return _INT64.unpack_from(self._map, _VERSION_OFFSET)[0]
+
+    @property
+    def start_time(self):
+        return _FLOAT64.unpack_from(self._map, _START_TIME_OFFSET)[0]
+
+    def increment_errors(self, n=1):
+        """Add n errors; returns the new count"""
+        return self._update(lambda count: count + n) + n
+
+    def reset_errors(self):
+        """Set error_count to 0; returns the previous count"""
+        return self._update(lambda count: 0)
+
+    def close(self):
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _FileLock:
+    """Exclusive fcntl lock on the whole state file"""
+
+    __slots__ = ('fd',)
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __enter__(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        return False
@@ -0,0 +1,213 @@
+# Anomaly Filter Benchmark
+#
+# The anomaly pre-filter (anomaly_filter.AnomalyFilter) in front of the
+# classifier (DecisionCache + model), on synthetic streams with injected
+# faults, compared with the classifier alone:
+#
+# - Classifier calls avoided: rows the filter answered itself
+# - Detection lag: ticks from fault start to the first healing decision for
+#   that target, filtered pipeline vs. classifier only
+# - Precision / recall of the filter: rows flagged as deviating that fall
+#   inside a fault or get an action from the classifier alone, and fault
+#   rows that were sent to the classifier
+# - Decisions differing from the classifier alone
+#
+# Each target has a baseline (CPU/memory/errors with noise and a slow load
+# cycle); --hot of them run close to the model's thresholds. --faults of them get one
+# fault of a random kind and length:
+#   errors   error_count climbs 1-3 per tick
+#   cpu      CPU ramps to 95%+ over a few ticks
+#   leak     memory grows 2-4% per tick
+#   spike    CPU and memory jump above 90% for a single tick
+#
+# Usage:
+#   python benchmarks/bench_anomaly_filter.py [--targets 1000] [--ticks 200]
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from anomaly_filter import AnomalyFilter  # noqa: E402
+from decision_cache import DecisionCache  # noqa: E402
+from inference_brain import InferenceBrain  # noqa: E402
+
+FAULT_KINDS = ('errors', 'cpu', 'leak', 'spike')
+
+
+def fault_streams(n_targets, n_ticks, fault_fraction, hot_fraction, rng):
+    """(ticks, faults): per-tick metric dicts, and fault windows per target"""
+    hot = rng.random(n_targets) < hot_fraction
+    cpu = np.where(hot, rng.uniform(60, 78, n_targets), rng.uniform(10, 60, n_targets))
+    memory = np.where(hot, rng.uniform(60, 78, n_targets), rng.uniform(20, 60, n_targets))
+    errors = rng.integers(0, 4, n_targets).astype(float)
+    phase = rng.uniform(0, 2 * math.pi, n_targets)
+
+    faults = {}
+    for target in np.flatnonzero(rng.random(n_targets) < fault_fraction):
+        kind = FAULT_KINDS[rng.integers(len(FAULT_KINDS))]
+        start = int(rng.integers(20, n_ticks - 40))
+        length = 1 if kind == 'spike' else int(rng.integers(10, 30))
+        faults[int(target)] = (kind, start, start + length, rng.uniform(1, 3))
+
+    ticks = []
+    for tick in range(n_ticks):
+        load = 5 * np.sin(2 * math.pi * tick / 120 + phase)
+        tick_cpu = cpu + load + rng.normal(0, 1.5, n_targets)
+        tick_memory = memory + 0.5 * load + rng.normal(0, 1.0, n_targets)
+        tick_errors = errors.copy()
+        for target, (kind, start, end, rate) in faults.items():
+            if not start <= tick < end:
+                continue
+            elapsed = tick - start + 1
+            if kind == 'errors':
+                tick_errors[target] += int(rate * elapsed)
+            elif kind == 'cpu':
+                tick_cpu[target] = min(99, cpu[target] + (96 - cpu[target]) * min(1, elapsed / 4))
+            elif kind == 'leak':
+                tick_memory[target] = min(99, memory[target] + rate * 1.5 * elapsed)
+            else:
+                tick_cpu[target] = tick_memory[target] = 95
+        ticks.append([
+            {
+                'cpu_usage': int(np.clip(tick_cpu[i], 0, 100)),
+                'memory_usage': int(np.clip(tick_memory[i], 0, 100)),
+                'error_count': int(tick_errors[i]),
+                'uptime': 5 * tick,
+            }
+            for i in range(n_targets)
+        ])
+    return ticks, faults
+
+
+def first_action(actions, start, end):
+    """First tick in [start, end + grace) with a healing decision (None if missed)"""
+    for tick in range(start, min(len(actions), end + 5)):
+        if actions[tick] not in (None, 'no_action'):
+            return tick
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomaly filter benchmark")
+    parser.add_argument('--forest', default=os.path.join(ROOT, 'app', 'healing_brain_forest'))
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--faults', type=float, default=0.1,
+                        help="Fraction of targets with an injected fault")
+    parser.add_argument('--hot', type=float, default=0.1,
+                        help="Fraction of targets running close to the model's thresholds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    brain = InferenceBrain()
+    brain.load_model(args.forest)
+    ticks, faults = fault_streams(args.targets, args.ticks, args.faults, args.hot,
+                                  np.random.default_rng(args.seed))
+    names = [f"pod-{i}" for i in range(args.targets)]
+
+    print("="*60)
+    print("🚨 ANOMALY FILTER BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets x {args.ticks} ticks, {len(faults)} injected faults\n")
+
+    baseline = DecisionCache(brain)
+    cache = DecisionCache(brain)
+    anomalies = AnomalyFilter()
+    baseline_actions = [[None] * args.ticks for _ in range(args.targets)]
+    filtered_actions = [[None] * args.ticks for _ in range(args.targets)]
+    baseline_time = filtered_time = 0.0
+    flagged = flagged_in_fault = fault_rows = fault_rows_flagged = 0
+    disagreements = 0
+
+    model_time = 0.0
+    for tick, metrics in enumerate(ticks):
+        start = time.perf_counter()
+        brain.predict_batch(metrics)
+        model_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = baseline.predict_batch(metrics)
+        baseline_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        mask = anomalies.filter_batch(names, metrics)
+        # Rows flagged for deviating from their baseline (not warm-up/refresh)
+        deviating = anomalies._pending[2]
+        classified = iter(cache.predict_batch([m for m, a in zip(metrics, mask) if a]))
+        actions = [next(classified)['recommended_action'] if a else 'no_action' for a in mask]
+        anomalies.learn_batch(actions)
+        filtered_time += time.perf_counter() - start
+
+        for i, (anomalous, action) in enumerate(zip(mask, actions)):
+            expected_action = expected[i]['recommended_action']
+            baseline_actions[i][tick] = expected_action
+            filtered_actions[i][tick] = action
+            disagreements += action != expected_action
+            fault = faults.get(i)
+            in_fault = fault is not None and fault[1] <= tick < fault[2]
+            fault_rows += in_fault
+            fault_rows_flagged += in_fault and anomalous
+            if deviating[i]:
+                flagged += 1
+                flagged_in_fault += in_fault or expected_action != 'no_action'
+
+    lags = {'classifier': [], 'filtered': []}
+    missed = {'classifier': 0, 'filtered': 0}
+    for target, (kind, start, end, _) in faults.items():
+        for name, actions in (('classifier', baseline_actions), ('filtered', filtered_actions)):
+            hit = first_action(actions[target], start, end)
+            if hit is None:
+                missed[name] += 1
+            else:
+                lags[name].append(hit - start)
+
+    total = args.targets * args.ticks
+    results = {
+        'classifier_calls_avoided': anomalies.stats['normal'] / total,
+        'model_rows_classifier_only': baseline.stats['misses'] / total,
+        'model_rows_filtered': cache.stats['misses'] / total,
+        'model_ms_per_tick': model_time / args.ticks * 1000,
+        'classifier_ms_per_tick': baseline_time / args.ticks * 1000,
+        'filtered_ms_per_tick': filtered_time / args.ticks * 1000,
+        'precision': flagged_in_fault / flagged if flagged else 1.0,
+        'recall': fault_rows_flagged / fault_rows if fault_rows else 1.0,
+        'detect_lag_classifier_ticks': statistics.mean(lags['classifier']) if lags['classifier'] else None,
+        'detect_lag_filtered_ticks': statistics.mean(lags['filtered']) if lags['filtered'] else None,
+        'faults_missed_classifier': missed['classifier'],
+        'faults_missed_filtered': missed['filtered'],
+        'disagreement': disagreements / total,
+        'filter_stats': anomalies.stats,
+    }
+
+    print(f"  Classifier calls avoided: {results['classifier_calls_avoided']:.1%} "
+          f"(warm-up {anomalies.stats['warmup']}, refresh {anomalies.stats['refresh']})")
+    print(f"  Model rows: {results['model_rows_classifier_only']:.2%} classifier only, "
+          f"{results['model_rows_filtered']:.2%} with filter")
+    print(f"  {'model, every row':<22}{results['model_ms_per_tick']:>8.2f}ms/tick")
+    print(f"  {'classifier only':<22}{results['classifier_ms_per_tick']:>8.2f}ms/tick")
+    print(f"  {'filter + classifier':<22}{results['filtered_ms_per_tick']:>8.2f}ms/tick")
+    print(f"\n  Filter precision: {results['precision']:.1%}  recall: {results['recall']:.1%}")
+    for name in ('classifier', 'filtered'):
+        lag = results[f'detect_lag_{name}_ticks']
+        print(f"  Detection lag ({name}): "
+              f"{'-' if lag is None else f'{lag:.2f}'} ticks, {missed[name]} faults missed")
+    print(f"  Decisions differing from classifier only: {results['disagreement']:.3%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
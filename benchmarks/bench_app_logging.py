@@ -0,0 +1,109 @@
+# Patient App Logging Benchmark
+#
+# Before/after throughput of /data and /health with the request logging
+# modes of app/request_log.py:
+#
+#   legacy       two synchronous f-string log lines per request (old behaviour)
+#   async        one structured line per request via the background writer
+#   async-10%    async, logging 10% of successful requests
+#
+# Each mode runs in a fresh process that drives the Flask app through its
+# test client (no network, so logging overhead is not hidden behind socket
+# I/O). Log output goes to a real file, like a container log.
+#
+# Usage:
+#   python benchmarks/bench_app_logging.py [--requests 5000] [--json out.json]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+APP_DIR = os.path.join(ROOT, 'app')
+
+MODES = {
+    'legacy': {'LOG_MODE': 'legacy'},
+    'async': {'LOG_MODE': 'async', 'LOG_SAMPLE_RATE': '1.0'},
+    'async-10%': {'LOG_MODE': 'async', 'LOG_SAMPLE_RATE': '0.1'},
+}
+
+DRIVER = """
+import json, sys, time
+import app as patient
+client = patient.app.test_client()
+results = {}
+for path in ('/data', '/health'):
+    for _ in range(200):
+        client.get(path)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(%(requests)d):
+        t = time.perf_counter()
+        client.get(path)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    results[path] = {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+sys.__stderr__.write('RESULT ' + json.dumps(results) + '\\n')
+"""
+
+
+def run_mode(env_overrides, requests, log_path):
+    env = dict(os.environ, **env_overrides)
+    with open(log_path, 'w') as log:
+        result = subprocess.run(
+            [sys.executable, '-c', DRIVER % {'requests': requests}],
+            cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.PIPE, text=True, check=True
+        )
+    lines = [l for l in result.stderr.splitlines() if l.startswith('RESULT ')]
+    if not lines:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(lines[-1][len('RESULT '):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient app logging benchmark")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("📝 PATIENT APP LOGGING BENCHMARK")
+    print("="*60)
+    print(f"  Requests per endpoint: {args.requests}\n")
+    print(f"  {'mode':<12}{'endpoint':<10}{'req/s':>10}{'p50':>10}{'p99':>10}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, env in MODES.items():
+            results[mode] = run_mode(env, args.requests, os.path.join(tmp, f"{mode}.log"))
+            for path, r in results[mode].items():
+                print(f"  {mode:<12}{path:<10}{r['requests_per_second']:>10.0f}"
+                      f"{r['p50_ms']:>8.3f}ms{r['p99_ms']:>8.3f}ms")
+
+    baseline = results['legacy']
+    print("\n  Speedup vs legacy (req/s):")
+    for mode in MODES:
+        if mode == 'legacy':
+            continue
+        ratios = ", ".join(
+            f"{path} x{results[mode][path]['requests_per_second'] / baseline[path]['requests_per_second']:.2f}"
+            for path in baseline
+        )
+        print(f"    {mode:<12}{ratios}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
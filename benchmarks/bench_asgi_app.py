@@ -0,0 +1,140 @@
+# Patient App Serving Modes Benchmark
+#
+# Requests/s and latency of the patient app at high concurrency, served as:
+#
+#   gunicorn-sync     app.py, gunicorn sync workers (the Dockerfile's CMD)
+#   gunicorn-gthread  app.py, gunicorn threaded workers (--threads), for
+#                     reference
+#   uvicorn           asgi_app.py (ASGI mode), uvicorn workers under gunicorn
+#
+# Same worker count for all (--workers). Closed loop: `concurrency` clients
+# each send their next request as soon as the previous one is answered, over
+# a mix of /data, /health and /healthz (user traffic plus monitor probes).
+# Each level runs with DATA_DELAY=0 (pure CPU) and with a simulated
+# downstream call in /data (--delay, default 20ms): the case where a sync
+# worker sits idle for the whole call and an event loop does not.
+#
+# The load generator runs on the same machine; on few cores it competes
+# with the servers, so compare modes with each other rather than with
+# numbers from elsewhere.
+#
+# Usage:
+#   python benchmarks/bench_asgi_app.py [--workers 2] [--concurrency 16,64,256]
+#       [--delay 0.02] [--duration 10] [--json out.json]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from load_suite import PatientServer  # noqa: E402
+
+MODES = {
+    'gunicorn-sync': {'kind': 'gunicorn'},
+    'gunicorn-gthread': {'kind': 'gunicorn', 'threads': 8},
+    'uvicorn': {'kind': 'uvicorn'},
+}
+
+TRAFFIC = {'/data': 0.6, '/health': 0.3, '/healthz': 0.1}
+
+
+async def client(session, url, deadline, rng, latencies, counts):
+    paths, weights = list(TRAFFIC), list(TRAFFIC.values())
+    while time.perf_counter() < deadline:
+        path = rng.choices(paths, weights)[0]
+        start = time.perf_counter()
+        try:
+            async with session.get(url + path) as response:
+                await response.read()
+            # /data fails 20% of the time by design: answered, not failed
+            latencies.append(time.perf_counter() - start)
+            counts['ok'] += 1
+        except Exception:
+            counts['failed'] += 1
+
+
+async def drive(url, concurrency, duration, seed):
+    import aiohttp
+
+    latencies = []
+    counts = {'ok': 0, 'failed': 0}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=30)) as session:
+        # Warm up connections and workers
+        await asyncio.gather(*(client(session, url, time.perf_counter() + 1.0,
+                                      random.Random(seed + i), [], dict(counts))
+                               for i in range(concurrency)))
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session, url, start + duration, random.Random(seed + i),
+                                      latencies, counts)
+                               for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {
+        'rps': counts['ok'] / elapsed,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'failed': counts['failed'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient app serving modes benchmark")
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"Comma-separated: {', '.join(MODES)}")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', default='16,64,256', help="Comma-separated client counts")
+    parser.add_argument('--delay', type=float, default=0.02,
+                        help="Simulated downstream call in /data, seconds (DATA_DELAY)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per measurement")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    modes = args.modes.split(',')
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    print("="*60)
+    print("⚡ PATIENT APP SERVING MODES BENCHMARK")
+    print("="*60)
+    print(f"  {args.workers} workers each, {args.duration:.0f}s per measurement, "
+          f"{os.cpu_count()} CPUs\n")
+
+    results = {}
+    for delay in sorted({0.0, args.delay}):
+        print(f"  /data downstream delay: {delay * 1000:.0f}ms")
+        print(f"  {'mode':<18}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}")
+        for mode in modes:
+            server = PatientServer(workers=args.workers, env={'DATA_DELAY': str(delay)},
+                                   **MODES[mode])
+            try:
+                server.start()
+                for level in levels:
+                    result = asyncio.run(drive(server.url, level, args.duration, args.seed))
+                    results[f"{mode} delay={delay * 1000:.0f}ms c={level}"] = result
+                    print(f"  {mode:<18}{level:>8}{result['rps']:>10.0f}"
+                          f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['failed']:>8}")
+            finally:
+                server.close()
+        print()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
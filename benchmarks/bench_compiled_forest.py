@@ -0,0 +1,137 @@
+# Compiled Forest Benchmark
+#
+# 1. Parity: CompiledForest.predict_proba must match sklearn's
+#    RandomForestClassifier.predict_proba on random inputs and on inputs that
+#    sit exactly on split thresholds. Exits with status 1 on mismatch.
+# 2. Latency: single-sample and batch inference, sklearn vs compiled.
+#
+# Usage:
+#   python benchmarks/bench_compiled_forest.py [--model app/healing_brain.pkl]
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compiled_forest import CompiledForest  # noqa: E402
+
+
+def random_inputs(n, rng):
+    """Samples covering the ranges used by the synthetic training data"""
+    return np.column_stack([
+        rng.integers(0, 100, n),
+        rng.integers(0, 100, n),
+        rng.integers(0, 20, n),
+        rng.integers(0, 86400, n),
+        rng.integers(0, 24, n),
+    ]).astype(np.float64)
+
+
+def threshold_inputs(forest, n, rng):
+    """Samples whose features sit exactly on split thresholds"""
+    X = random_inputs(n, rng)
+    internal = np.flatnonzero(np.isfinite(forest.threshold))
+    picks = rng.choice(internal, size=n)
+    X[np.arange(n), forest.feature[picks]] = forest.threshold[picks]
+    return X
+
+
+def check_parity(model, forest, rng):
+    X = np.vstack([random_inputs(20000, rng), threshold_inputs(forest, 20000, rng)])
+    expected = model.predict_proba(X)
+
+    batch = forest.predict_proba(X)
+    single = np.array([forest.predict_proba_one(x) for x in X[:2000]])
+
+    batch_err = np.abs(batch - expected).max()
+    single_err = np.abs(single - expected[:2000]).max()
+    labels_match = np.array_equal(
+        model.classes_[expected.argmax(axis=1)], forest.predict(X)
+    )
+
+    print("🔬 Parity vs sklearn predict_proba")
+    print(f"  Samples checked: {len(X)}")
+    print(f"  Max |Δp| batch:  {batch_err:.2e}")
+    print(f"  Max |Δp| single: {single_err:.2e}")
+    print(f"  Labels match:    {labels_match}")
+
+    return batch_err < 1e-9 and single_err < 1e-9 and labels_match
+
+
+def timeit(fn, repeat):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_latency(model, forest, rng):
+    X = random_inputs(4096, rng)
+    x = X[0]
+    frame = pd.DataFrame([x], columns=model.feature_names_in_)
+
+    rows = [
+        ("sklearn predict+predict_proba (DataFrame)", 1,
+         timeit(lambda: (model.predict(frame), model.predict_proba(frame)), 50)),
+        ("sklearn predict_proba (ndarray)", 1,
+         timeit(lambda: model.predict_proba(X[:1]), 50)),
+        ("compiled predict_proba_one", 1,
+         timeit(lambda: forest.predict_proba_one(x), 5000)),
+        ("compiled predict_proba", 1,
+         timeit(lambda: forest.predict_proba(X[:1]), 5000)),
+    ]
+    for n in (64, 1024, 4096):
+        rows.append(("sklearn predict_proba", n,
+                     timeit(lambda: model.predict_proba(X[:n]), 10)))
+        rows.append(("compiled predict_proba", n,
+                     timeit(lambda: forest.predict_proba(X[:n]), 10)))
+
+    print("\n⏱️  Latency")
+    print(f"  {'method':<44}{'batch':>6}{'per call':>14}{'per sample':>14}")
+    for name, n, seconds in rows:
+        print(f"  {name:<44}{n:>6}{seconds * 1e6:>12.1f}µs{seconds / n * 1e6:>12.2f}µs")
+
+    single = rows[2][2] * 1e6
+    print(f"\n  Single-sample target <10µs: {'met' if single < 10 else 'not met'} ({single:.1f}µs)")
+    slower = [n for (_, n, sk), (_, _, compiled) in zip(rows[4::2], rows[5::2]) if compiled > sk]
+    if slower:
+        print(f"  Compiled slower than sklearn at batch {', '.join(map(str, slower))} "
+              f"(HealingBrain uses sklearn above compiled_max_batch)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled forest parity check and latency benchmark")
+    parser.add_argument('--model', default='app/healing_brain.pkl')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    model = joblib.load(args.model)
+    forest = CompiledForest.from_sklearn(model)
+    rng = np.random.default_rng(args.seed)
+
+    print("="*60)
+    print("🌲 COMPILED FOREST BENCHMARK")
+    print("="*60)
+    print(f"  Trees: {forest.n_trees}, nodes: {forest.n_nodes}, depth: {forest.depth}")
+    print(f"  Arrays: {sum(getattr(forest, n).nbytes for n in ('feature', 'threshold', 'children', 'value', 'roots')) / 1024:.0f} KiB\n")
+
+    ok = check_parity(model, forest, rng)
+    bench_latency(model, forest, rng)
+
+    if not ok:
+        print("\n❌ Parity check FAILED")
+        sys.exit(1)
+    print("\n✅ Parity check passed")
+
+
+if __name__ == '__main__':
+    main()
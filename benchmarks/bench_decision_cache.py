@@ -0,0 +1,114 @@
+# Decision Cache Benchmark
+#
+# Per-tick decision cost for a simulated fleet, model-only vs. the
+# DecisionCache front end (fast path + quantized LRU), and how often the two
+# disagree.
+#
+# Each target has a baseline (most are nominal, --unhealthy of them run hot
+# or accumulate errors) and each tick reports the baseline plus small noise,
+# like a pod whose load changes slowly. Uptime advances 5s per tick.
+#
+# Usage:
+#   python benchmarks/bench_decision_cache.py [--targets 1000] [--ticks 50]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from decision_cache import DecisionCache  # noqa: E402
+from inference_brain import InferenceBrain  # noqa: E402
+
+
+def fleet_ticks(n_targets, n_ticks, unhealthy, rng):
+    """List of ticks, each a list of metric dicts (one per target)"""
+    hot = rng.random(n_targets) < unhealthy
+    cpu = np.where(hot, rng.integers(70, 98, n_targets), rng.integers(10, 65, n_targets))
+    memory = np.where(hot, rng.integers(70, 98, n_targets), rng.integers(20, 65, n_targets))
+    errors = np.where(hot, rng.integers(3, 15, n_targets), rng.integers(0, 3, n_targets))
+    uptime = rng.integers(0, 86400, n_targets)
+
+    ticks = []
+    for tick in range(n_ticks):
+        noise_cpu = rng.integers(-2, 3, n_targets)
+        noise_mem = rng.integers(-2, 3, n_targets)
+        ticks.append([
+            {
+                'cpu_usage': int(np.clip(cpu[i] + noise_cpu[i], 0, 100)),
+                'memory_usage': int(np.clip(memory[i] + noise_mem[i], 0, 100)),
+                'error_count': int(errors[i]),
+                'uptime': int(uptime[i] + 5 * tick),
+            }
+            for i in range(n_targets)
+        ])
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision cache benchmark")
+    parser.add_argument('--forest', default=os.path.join(ROOT, 'app', 'healing_brain_forest'))
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--unhealthy', type=float, default=0.1,
+                        help="Fraction of targets running hot")
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    brain = InferenceBrain()
+    brain.load_model(args.forest)
+    decisions = DecisionCache(brain)
+    ticks = fleet_ticks(args.targets, args.ticks, args.unhealthy, np.random.default_rng(0))
+
+    print("="*60)
+    print("🗂️  DECISION CACHE BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets x {args.ticks} ticks, {args.unhealthy:.0%} running hot\n")
+
+    model_time = cached_time = 0.0
+    disagreements = 0
+    for metrics in ticks:
+        start = time.perf_counter()
+        expected = brain.predict_batch(metrics)
+        model_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = decisions.predict_batch(metrics)
+        cached_time += time.perf_counter() - start
+
+        disagreements += sum(
+            a['recommended_action'] != e['recommended_action'] for a, e in zip(actual, expected)
+        )
+
+    total = args.targets * args.ticks
+    stats = decisions.stats
+    results = {
+        'model_ms_per_tick': model_time / args.ticks * 1000,
+        'cached_ms_per_tick': cached_time / args.ticks * 1000,
+        'speedup': model_time / cached_time,
+        'fast_path': stats['rule'] / total,
+        'cache_hits': stats['hits'] / total,
+        'model_rows': stats['misses'] / total,
+        'disagreement': disagreements / total,
+    }
+
+    print(f"  {'model only':<22}{results['model_ms_per_tick']:>8.2f}ms/tick")
+    print(f"  {'fast path + cache':<22}{results['cached_ms_per_tick']:>8.2f}ms/tick "
+          f"(x{results['speedup']:.1f})")
+    print(f"\n  Fast path: {results['fast_path']:.1%}  cache hits: {results['cache_hits']:.1%}  "
+          f"model: {results['model_rows']:.1%}")
+    print(f"  Actions differing from model-only: {results['disagreement']:.2%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
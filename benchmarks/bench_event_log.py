@@ -0,0 +1,185 @@
+# Monitor Output Benchmark
+#
+# Cost of the monitor's per-target output, per fleet tick:
+#
+#   legacy       two print()s per target to a line-buffered stdout plus a
+#                flush (the old behaviour: one write syscall per line)
+#   events/text  one record per target through EventLog (event_log.py),
+#                rendered as text lines, written in batches
+#   events/json  same, as JSON lines
+#
+# The sink counts write syscalls and can add a delay per syscall to stand in
+# for a slow log consumer (container runtime, log shipper). Reported: time
+# the monitoring loop spends on output per tick, total CPU (writer thread
+# included), syscalls per tick, and records dropped by the bounded queue.
+# The last run uses a stalled sink to show the queue bound and drop
+# accounting.
+#
+# Usage:
+#   python benchmarks/bench_event_log.py [--targets 1000] [--ticks 20] [--sink-delay 0.0002]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from event_log import EventLog  # noqa: E402
+
+
+class CountingSink(io.RawIOBase):
+    """Raw output to /dev/null that counts write syscalls (optionally slow)"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = 0
+        self.bytes = 0
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.writes += 1
+        self.bytes += len(data)
+        if self.delay:
+            time.sleep(self.delay)
+        return os.write(self.fd, data)
+
+    def close(self):
+        if not self.closed:
+            os.close(self.fd)
+        super().close()
+
+
+def line_buffered(sink):
+    """Same buffering as the monitor's stdout (os.fdopen(fd, 'w', buffering=1))"""
+    return io.TextIOWrapper(io.BufferedWriter(sink), encoding='utf-8', line_buffering=True)
+
+
+def make_tick(rng, n_targets, tick):
+    rows = []
+    for i in range(n_targets):
+        errors = rng.choice((0, 0, 0, 1, 2, 7))
+        action = 'reset_errors' if errors > 5 else None
+        reason = ("ML PREDICTION: Reset recommended (confidence: 85.30%)" if action else
+                  "FAST PATH: Clearly healthy, no action needed")
+        rows.append((f"10.0.{i >> 8}.{i & 255}:5000",
+                     {'status': 'healthy', 'cpu_usage': rng.randint(10, 70),
+                      'memory_usage': rng.randint(20, 70), 'error_count': errors,
+                      'uptime': 5 * tick}, action, reason))
+    return rows
+
+
+def legacy_tick(stream, rows, n_targets):
+    """The old _probe_fleet / _decision_from_prediction output"""
+    with contextlib.redirect_stdout(stream):
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        print(f"\n[{timestamp}] Fleet Health Check: {len(rows)}/{n_targets} targets in 12ms")
+        for name, health, _, _ in rows:
+            print(f"  {name}: {health['status']} cpu={health['cpu_usage']}% "
+                  f"mem={health['memory_usage']}% errors={health['error_count']} "
+                  f"uptime={health['uptime']}s")
+        for _, _, action, reason in rows:
+            print(reason if action else f"✅ {reason}")
+            sys.stdout.flush()
+        sys.stdout.flush()
+
+
+def events_tick(events, rows, n_targets):
+    """The new _probe_fleet output"""
+    events.emit('tick', due=len(rows), targets=n_targets, poll_ms=12)
+    for name, health, action, reason in rows:
+        events.emit('health', target=name, status=health['status'],
+                    cpu_usage=health['cpu_usage'], memory_usage=health['memory_usage'],
+                    error_count=health['error_count'], uptime=health['uptime'],
+                    action=action, confidence=0.853 if action else 1.0, reason=reason,
+                    dispatched=bool(action))
+
+
+def run(mode, n_targets, ticks, delay, seed, max_pending=100_000):
+    from doctor_monitor_ml import TEXT_FORMATS
+
+    rng = random.Random(seed)
+    sink = CountingSink(delay)
+    stream = line_buffered(sink)
+    events = None
+    if mode != 'legacy':
+        events = EventLog(stream, fmt=mode.split('/')[1], text_formats=TEXT_FORMATS,
+                          max_pending=max_pending)
+
+    loop = 0.0
+    cpu_start = time.process_time()
+    for tick in range(ticks):
+        rows = make_tick(rng, n_targets, tick)
+        start = time.perf_counter()
+        if events is None:
+            legacy_tick(stream, rows, n_targets)
+        else:
+            events_tick(events, rows, n_targets)
+        loop += time.perf_counter() - start
+    if events is not None:
+        events.close()
+    stream.flush()
+    sink.close()
+    return {
+        'loop_ms_per_tick': loop / ticks * 1000,
+        'cpu_ms_per_tick': (time.process_time() - cpu_start) / ticks * 1000,
+        'syscalls_per_tick': sink.writes / ticks,
+        'bytes_per_tick': sink.bytes / ticks,
+        'dropped': events.stats['dropped'] if events else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor output benchmark")
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--sink-delay', type=float, default=0.0002,
+                        help="Seconds per write syscall for the slow-consumer runs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    # Imported before any redirect: the module rebinds sys.stdout
+    import doctor_monitor_ml  # noqa: F401
+
+    print("="*60)
+    print("🪵 MONITOR OUTPUT BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets, {args.ticks} ticks\n")
+
+    results = {}
+    print(f"  {'mode':<13}{'sink':<7}{'loop ms/tick':>13}{'cpu ms/tick':>12}"
+          f"{'syscalls':>10}{'KB/tick':>9}{'dropped':>9}")
+    for delay, sink in ((0.0, 'fast'), (args.sink_delay, 'slow')):
+        for mode in ('legacy', 'events/text', 'events/json'):
+            result = run(mode, args.targets, args.ticks, delay, args.seed)
+            results[f"{mode} {sink}"] = result
+            print(f"  {mode:<13}{sink:<7}{result['loop_ms_per_tick']:>13.2f}"
+                  f"{result['cpu_ms_per_tick']:>12.2f}{result['syscalls_per_tick']:>10.1f}"
+                  f"{result['bytes_per_tick'] / 1024:>9.1f}{result['dropped']:>9}")
+
+    # Consumer stalled for a second per write: the loop keeps going, the
+    # queue stays bounded and the overflow is counted
+    stalled = run('events/json', args.targets, args.ticks, 1.0, args.seed,
+                  max_pending=2 * args.targets)
+    results['events/json stalled'] = stalled
+    print(f"  {'events/json':<13}{'stall':<7}{stalled['loop_ms_per_tick']:>13.2f}"
+          f"{stalled['cpu_ms_per_tick']:>12.2f}{stalled['syscalls_per_tick']:>10.1f}"
+          f"{stalled['bytes_per_tick'] / 1024:>9.1f}{stalled['dropped']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
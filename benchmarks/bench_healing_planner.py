@@ -0,0 +1,173 @@
+# Healing Planner Benchmark
+#
+# Planning cost and plan quality for one tick on simulated fleets
+# (healing_planner.py), against dispatching every decision on its own:
+#
+#   independent  scattered faults: --faulty of the fleet wants a heal, 1 in
+#                4 of those a restart
+#   correlated   a bad deploy: --incident of the fleet wants a restart in the
+#                same tick, some replicas already fail their probe
+#   mixed        an incident on top of scattered faults, with soft heals
+#                capped (--max-resets)
+#
+# Each candidate gets model-like class probabilities (Dirichlet, weighted
+# toward the decided action). For every scenario:
+#   plan time    planner.plan over the whole tick (median of --repeats)
+#   restarts     started this tick: planned vs. naive (every restart
+#                decision submitted, the executor's restart budget taking
+#                them first come, first served)
+#   up after     replicas still up once this tick's restarts begin, and
+#                the --min-healthy floor
+#   P(restart)   mean model probability of the restarts that run: the
+#                planner gives the slots to the surest ones
+#
+# Usage:
+#   python benchmarks/bench_healing_planner.py [--targets 10000]
+#       [--max-concurrent-restarts 50] [--min-healthy 0.9] [--json out.json]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from healing_executor import HealingExecutor  # noqa: E402
+from healing_planner import RESET, RESTART, HealingPlanner  # noqa: E402
+
+CLASSES = ('no_action', 'reset_errors', 'restart_service')
+
+
+def make_tick(n_targets, restart_share, reset_share, down_share, rng):
+    """(candidates, names of down targets) for one simulated tick"""
+    kinds = rng.random(n_targets)
+    down = kinds < down_share
+    restart = ~down & (kinds < down_share + restart_share)
+    reset = ~down & ~restart & (kinds < down_share + restart_share + reset_share)
+
+    candidates = []
+    for i in np.flatnonzero(restart | reset):
+        decided = 2 if restart[i] else 1
+        alpha = np.ones(3)
+        alpha[decided] = rng.uniform(2.0, 12.0)
+        p = rng.dirichlet(alpha)
+        # The decided class is the argmax, as it is for the model
+        top = p.argmax()
+        p[[decided, top]] = p[[top, decided]]
+        candidates.append((f"pod-{i}", RESTART if restart[i] else RESET,
+                           {name: float(v) for name, v in zip(CLASSES, p)}))
+    return candidates, {f"pod-{i}" for i in np.flatnonzero(down)}
+
+
+SCENARIOS = {
+    # name: (restart share, reset share, down share, cap resets)
+    'independent': lambda a: (a.faulty / 4, a.faulty * 3 / 4, 0.001, False),
+    'correlated': lambda a: (a.incident, 0.0, 0.02, False),
+    'mixed': lambda a: (a.incident, a.faulty, 0.02, True),
+}
+
+
+def naive(candidates, executor):
+    """Every decision submitted in arrival order; the restart budget decides"""
+    budget = executor.restarts_left()
+    restarts = [c for c in candidates if c[1] == RESTART][:budget]
+    resets = sum(1 for c in candidates if c[1] == RESET)
+    return restarts, resets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Healing planner benchmark")
+    parser.add_argument('--targets', type=int, default=10000)
+    parser.add_argument('--faulty', type=float, default=0.01,
+                        help="Fraction of the fleet with a scattered fault")
+    parser.add_argument('--incident', type=float, default=0.3,
+                        help="Fraction of the fleet hit by the correlated incident")
+    parser.add_argument('--max-concurrent-restarts', type=int, default=50)
+    parser.add_argument('--min-healthy', type=float, default=0.9)
+    parser.add_argument('--max-resets', type=int, default=200)
+    parser.add_argument('--restart-budget', type=int,
+                        help="Executor restarts per window (default: targets / 20)")
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    restart_budget = args.restart_budget or max(3, args.targets // 20)
+    rng = np.random.default_rng(args.seed)
+
+    print("="*60)
+    print("🗂️  HEALING PLANNER BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets, max {args.max_concurrent_restarts} concurrent restarts, "
+          f"min healthy {args.min_healthy}, restart budget {restart_budget}\n")
+    print(f"  {'scenario':<13}{'heals':>7}{'plan ms':>9}{'restarts':>10}{'naive':>7}"
+          f"{'resets':>8}{'deferred':>10}{'up after':>10}{'naive':>8}{'P(restart)':>12}{'naive':>7}")
+
+    results = {}
+    for scenario, shares in SCENARIOS.items():
+        restart_share, reset_share, down_share, cap_resets = shares(args)
+        candidates, down = make_tick(args.targets, restart_share, reset_share, down_share, rng)
+        max_resets = args.max_resets if cap_resets else None
+
+        timings = []
+        for _ in range(args.repeats):
+            executor = HealingExecutor(restart_budget=restart_budget)
+            planner = HealingPlanner(max_concurrent_restarts=args.max_concurrent_restarts,
+                                     min_healthy=args.min_healthy, max_resets=max_resets)
+            start = time.perf_counter()
+            plan = planner.plan(candidates, args.targets, down, executor)
+            timings.append(time.perf_counter() - start)
+            executor.shutdown()
+
+        planned_restarts = [c for c in candidates if c[1] == RESTART and c[0] not in plan]
+        naive_restarts, naive_resets = naive(candidates, HealingExecutor(restart_budget=restart_budget))
+        floor = planner.required_healthy(args.targets)
+        up_planned = args.targets - len(down) - len(planned_restarts)
+        up_naive = args.targets - len(down) - len(naive_restarts)
+
+        def mean_p(restarts):
+            return statistics.mean(c[2]['restart_service'] for c in restarts) if restarts else 0.0
+
+        result = {
+            'candidates': len(candidates),
+            'restart_decisions': sum(1 for c in candidates if c[1] == RESTART),
+            'down': len(down),
+            'plan_ms': statistics.median(timings) * 1000,
+            'restarts': len(planned_restarts),
+            'naive_restarts': len(naive_restarts),
+            'resets': planner.stats['resets'],
+            'naive_resets': naive_resets,
+            'downgraded': planner.stats['downgraded'],
+            'deferred': planner.stats['deferred'],
+            'up_after': up_planned,
+            'naive_up_after': up_naive,
+            'min_healthy': floor,
+            'within_budget': (len(planned_restarts) <= args.max_concurrent_restarts
+                              and up_planned >= floor),
+            'mean_p_restart': mean_p(planned_restarts),
+            'naive_mean_p_restart': mean_p(naive_restarts),
+        }
+        results[scenario] = result
+        print(f"  {scenario:<13}{result['candidates']:>7}{result['plan_ms']:>9.2f}"
+              f"{result['restarts']:>10}{result['naive_restarts']:>7}{result['resets']:>8}"
+              f"{result['deferred']:>10}{up_planned:>10}{up_naive:>8}"
+              f"{result['mean_p_restart']:>12.2f}{result['naive_mean_p_restart']:>7.2f}")
+
+    print(f"\n  up after = replicas up once this tick's restarts start "
+          f"(floor: {planner.required_healthy(args.targets)})")
+    violations = [name for name, result in results.items() if not result['within_budget']]
+    print(f"  Budgets held in every scenario: {'yes' if not violations else 'NO: ' + ', '.join(violations)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# Conditional /health Benchmark
+#
+# Bytes on the wire and per-probe cost of the patient's /health
+# (app/health_snapshot.py) as seen by the monitor (health_client.py), for:
+#
+#   legacy         fresh JSON body every probe (old behaviour)
+#   etag           If-None-Match: 304 with no body while nothing changed
+#   etag+delta     ... and 226 with only the changed fields when something did
+#   +msgpack       ... with msgpack instead of JSON bodies
+#
+# One target is probed every --interval seconds of simulated time (fake
+# clock, no network); between probes an error arrives with probability
+# --error-rate. Server time is building the response, client time is
+# turning it back into the health dict. Bytes are the whole HTTP/1.1 exchange
+# (request and response lines, headers, body) with the headers gunicorn and
+# the poller send anyway.
+#
+# Usage:
+#   python benchmarks/bench_health_endpoint.py [--probes 20000] [--interval 2]
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+from health_client import HealthCache  # noqa: E402
+from health_snapshot import HealthSnapshot, msgpack  # noqa: E402
+from shared_state import SharedHealthState  # noqa: E402
+
+MODES = ('legacy', 'etag', 'etag+delta', '+msgpack')
+
+# Sent on every exchange regardless of mode
+REQUEST_HEAD = len(b'GET /health HTTP/1.1\r\nHost: 10.0.0.1:5000\r\nUser-Agent: Python/3.11 '
+                   b'aiohttp/3.9.1\r\nAccept: */*\r\nAccept-Encoding: gzip, deflate\r\n\r\n')
+RESPONSE_HEAD = len(b'HTTP/1.1 200 OK\r\nServer: gunicorn\r\nDate: Sat, 17 Oct 2026 '
+                    b'12:00:00 GMT\r\nConnection: keep-alive\r\n\r\n')
+
+
+def header_bytes(headers):
+    size = sum(len(k) + len(v) + 4 for k, v in headers.items())
+    # An explicit Accept replaces the client's default one
+    return size - len(b'Accept: */*\r\n') if 'Accept' in headers else size
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def legacy_response(state, clock):
+    """What /health returned before: new random readings, full JSON"""
+    error_count = state.error_count
+    body = json.dumps({
+        "status": "degraded" if error_count > 5 else "healthy",
+        "cpu_usage": random.randint(10, 90),
+        "memory_usage": random.randint(20, 80),
+        "error_count": error_count,
+        "uptime": int(clock() - state.start_time),
+    }, separators=(',', ':')).encode()
+    return 200, {'Content-Type': 'application/json'}, body
+
+
+def run_mode(mode, probes, interval, error_rate, seed):
+    rng = random.Random(seed)
+    state = SharedHealthState(os.path.join(tempfile.mkdtemp(), 'state.bin'))
+    clock = FakeClock(state.start_time)
+    snapshot = HealthSnapshot(state, sample_interval=10, clock=clock)
+    cache = HealthCache(clock=clock)
+    if mode != '+msgpack':
+        cache._accept = {}
+
+    server_time = client_time = 0.0
+    wire_bytes = body_bytes = 0
+    url = 'http://patient/health'
+    for _ in range(probes):
+        clock.now += interval
+        if rng.random() < error_rate:
+            state.increment_errors()
+        if state.error_count > 10 and rng.random() < 0.2:
+            state.reset_errors()
+
+        headers = cache.headers(url)
+        if mode == 'etag':
+            headers.pop('A-IM', None)
+
+        start = time.perf_counter()
+        if mode == 'legacy':
+            status, response_headers, body = legacy_response(state, clock)
+        else:
+            status, response_headers, body = snapshot.respond(headers)
+        server_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if mode == 'legacy':
+            json.loads(body)
+        else:
+            cache.update(url, status, response_headers, body)
+        client_time += time.perf_counter() - start
+
+        if mode == 'legacy':
+            headers = {}
+        if body:
+            response_headers = dict(response_headers, **{'Content-Length': str(len(body))})
+        body_bytes += len(body)
+        wire_bytes += (REQUEST_HEAD + header_bytes(headers) + RESPONSE_HEAD +
+                       header_bytes(response_headers) + len(body))
+
+    return {
+        'bytes_per_probe': wire_bytes / probes,
+        'body_bytes_per_probe': body_bytes / probes,
+        'server_us': server_time / probes * 1e6,
+        'client_us': client_time / probes * 1e6,
+        'responses': None if mode == 'legacy' else dict(
+            (k, v) for k, v in cache.stats.items() if k != 'bytes'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conditional /health benchmark")
+    parser.add_argument('--probes', type=int, default=20000)
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="Simulated seconds between probes of the target")
+    parser.add_argument('--error-rate', type=float, default=0.05,
+                        help="Chance that an error arrives between two probes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🩺 CONDITIONAL /health BENCHMARK")
+    print("="*60)
+    print(f"  {args.probes} probes, every {args.interval:g}s, "
+          f"error rate {args.error_rate:.0%}\n")
+
+    results = {}
+    print(f"  {'mode':<12}{'bytes/probe':>12}{'server µs':>11}{'client µs':>11}  responses")
+    for mode in MODES:
+        if mode == '+msgpack' and msgpack is None:
+            print(f"  {mode:<12}  skipped (msgpack not installed)")
+            continue
+        result = run_mode(mode, args.probes, args.interval, args.error_rate, args.seed)
+        results[mode] = result
+        responses = result['responses']
+        summary = ('200 every probe' if responses is None else
+                   f"200 x{responses['full']}, 304 x{responses['not_modified']}, "
+                   f"226 x{responses['delta']}")
+        print(f"  {mode:<12}{result['bytes_per_probe']:>12.1f}{result['server_us']:>11.2f}"
+              f"{result['client_us']:>11.2f}  {summary}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
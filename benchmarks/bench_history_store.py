@@ -0,0 +1,138 @@
+# History Store Benchmark
+#
+# Cost of persisting monitor observations with history_store.HistoryStore
+# versus appending JSON lines, and of reading a time range back:
+#
+#   append   one append_batch per tick (whole fleet) / one append per record
+#   scan     zero-copy views of a time range (column sums touch every row)
+#   read     the same range copied into one array
+#   json     json.dumps + write per record, and json.loads of the same range
+#
+# Usage:
+#   python benchmarks/bench_history_store.py [--targets 1000] [--ticks 1000]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from history_store import RECORD_DTYPE, HistoryStore  # noqa: E402
+
+
+def fleet_tick(n_targets, tick):
+    return [
+        (f"pod-{i}",
+         {'status': 'healthy', 'cpu_usage': (i + tick) % 70, 'memory_usage': 40 + i % 30,
+          'error_count': (i * tick) % 7, 'uptime': 5 * tick},
+         'reset_errors' if (i + tick) % 50 == 0 else None, 0.86, False)
+        for i in range(n_targets)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History store benchmark")
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    n_records = args.targets * args.ticks
+    ticks = [fleet_tick(args.targets, tick) for tick in range(10)]
+    directory = tempfile.mkdtemp(prefix='history-bench-')
+
+    print("="*60)
+    print("🗄️  HISTORY STORE BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets x {args.ticks} ticks = {n_records} records\n")
+
+    try:
+        store = HistoryStore(os.path.join(directory, 'store'), segment_records=1 << 20)
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            store.append_batch(tick * 5.0, ticks[tick % 10])
+        store.flush()
+        batch_time = time.perf_counter() - start
+
+        # Known targets (a new target rewrites targets.json once)
+        single = HistoryStore(os.path.join(directory, 'single'))
+        rows = ticks[0]
+        single.append_batch(0.0, rows)
+        start = time.perf_counter()
+        for row in rows:
+            single.append(0.0, *row)
+        single_time = (time.perf_counter() - start) / len(rows)
+
+        json_path = os.path.join(directory, 'history.jsonl')
+        start = time.perf_counter()
+        with open(json_path, 'w') as f:
+            for tick in range(args.ticks):
+                for target, health, action, confidence, dispatched in ticks[tick % 10]:
+                    f.write(json.dumps({'timestamp': tick * 5.0, 'target': target, **health,
+                                        'action': action, 'confidence': confidence,
+                                        'dispatched': dispatched}) + '\n')
+        json_time = time.perf_counter() - start
+
+        # Middle half of the history
+        lo, hi = args.ticks * 5.0 / 4, args.ticks * 5.0 * 3 / 4
+        reader = HistoryStore(os.path.join(directory, 'store'), readonly=True)
+        start = time.perf_counter()
+        total = 0.0
+        scanned = 0
+        for chunk in reader.scan(lo, hi):
+            total += float(chunk['cpu_usage'].sum())
+            scanned += len(chunk)
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        records = reader.read(lo, hi)
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(json_path) as f:
+            parsed = [row for row in map(json.loads, f) if lo <= row['timestamp'] < hi]
+        json_read_time = time.perf_counter() - start
+
+        store_bytes = sum(os.path.getsize(os.path.join(directory, 'store', name))
+                          for name in os.listdir(os.path.join(directory, 'store')))
+        results = {
+            'batch_append_ms_per_tick': batch_time / args.ticks * 1000,
+            'batch_append_ns_per_record': batch_time / n_records * 1e9,
+            'single_append_us': single_time * 1e6,
+            'json_append_ns_per_record': json_time / n_records * 1e9,
+            'scan_ms': scan_time * 1000,
+            'scan_records': scanned,
+            'read_ms': read_time * 1000,
+            'json_read_ms': json_read_time * 1000,
+            'bytes_per_record': RECORD_DTYPE.itemsize,
+            'json_bytes_per_record': os.path.getsize(json_path) / n_records,
+            'store_bytes_on_disk': store_bytes,
+        }
+        assert len(records) == len(parsed) == scanned
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"  {'append_batch':<22}{results['batch_append_ms_per_tick']:>9.2f}ms/tick "
+          f"({results['batch_append_ns_per_record']:.0f}ns/record)")
+    print(f"  {'append (one record)':<22}{results['single_append_us']:>9.1f}us")
+    print(f"  {'JSON lines':<22}{results['json_append_ns_per_record']:>9.0f}ns/record")
+    print(f"\n  Range of {scanned} records:")
+    print(f"  {'scan (zero-copy)':<22}{results['scan_ms']:>9.2f}ms")
+    print(f"  {'read (copy)':<22}{results['read_ms']:>9.2f}ms")
+    print(f"  {'JSON lines parse':<22}{results['json_read_ms']:>9.2f}ms")
+    print(f"\n  {results['bytes_per_record']} bytes/record "
+          f"(JSON: {results['json_bytes_per_record']:.0f})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Monitor Replay Benchmark
+#
+# Drives DoctorMonitorML's fleet pipeline (probe -> history -> decide ->
+# heal) through replay.py against a stub fleet of virtual patient apps, and
+# reports throughput, per-tick latency, memory per target and healing quality.
+#
+# Default suite: 100 / 1000 / 5000 targets, fixed and adaptive probing.
+#
+# Usage:
+#   python benchmarks/bench_monitor_replay.py
+#   python benchmarks/bench_monitor_replay.py --targets 1000 --ticks 60 [--adaptive]
+#   python benchmarks/bench_monitor_replay.py --targets 1000 --record stream.jsonl
+#   python benchmarks/bench_monitor_replay.py --targets 1000 --replay stream.jsonl
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from monitor_metrics import format_summary  # noqa: E402
+from replay import run_replay  # noqa: E402
+
+STAGE_ORDER = ('tick', 'probe', 'parse', 'record', 'decide', 'dispatch', 'history')
+
+SUITE = [(100, False), (1000, False), (1000, True), (5000, False), (5000, True)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor replay benchmark")
+    parser.add_argument('--targets', type=int, help="Run a single configuration")
+    parser.add_argument('--ticks', type=int, default=60)
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Adaptive probe scheduling (single configuration)")
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', help="Write the served synthetic stream here")
+    parser.add_argument('--replay', help="Replay a recorded stream instead")
+    parser.add_argument('--verbose', action='store_true', help="Show monitor output")
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.targets:
+        suite = [(args.targets, args.adaptive)]
+    else:
+        suite = SUITE
+
+    print("="*60)
+    print("🔁 MONITOR REPLAY BENCHMARK")
+    print("="*60)
+    print(f"  {args.ticks} ticks per run{', replaying ' + args.replay if args.replay else ''}\n")
+    print(f"  {'targets':>8} {'mode':<9}{'decisions/s':>12}{'tick p50':>10}{'tick p99':>10}"
+          f"{'B/target':>10}{'restarts':>10}{'false':>8}{'ttr':>6}")
+
+    results = []
+    for n_targets, adaptive in suite:
+        result = run_replay(n_targets, args.ticks, seed=args.seed, adaptive=adaptive,
+                            max_concurrency=args.concurrency, records_path=args.replay,
+                            record_path=args.record, quiet=not args.verbose)
+        result['mode'] = 'adaptive' if adaptive else 'fixed'
+        results.append(result)
+
+        ttr = result['time_to_restart_ticks']
+        print(f"  {n_targets:>8} {result['mode']:<9}{result['decisions_per_second']:>12.0f}"
+              f"{result['tick_p50_ms']:>8.1f}ms{result['tick_p99_ms']:>8.1f}ms"
+              f"{result['memory_per_target_bytes']:>10.0f}{result['restarts']:>10}"
+              f"{result['false_restart_rate']:>8.1%}{ttr if ttr is not None else '-':>6}")
+
+    print("\n  ttr = median ticks from fault start to restart")
+    last = results[-1]
+    print(f"  Last run: {last['faults']} faults, {last['faults_restarted']} restarted, "
+          f"{last['soft_heals']} soft heals, {last['probes']} probes, "
+          f"decisions {last['decision_sources']}")
+    print(f"  Last run stages: {format_summary(last['stages'], STAGE_ORDER)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# Orchestrator Restart Benchmark
+#
+# Restart latency and correctness of the orchestrator backends, offline.
+# A stub Kubernetes API server (HTTP/1.1 keep-alive) serves the pod list of an
+# orchestrator.FakeBackend deployment, so KubernetesBackend runs its real
+# request path:
+#
+#   session   one KubernetesBackend reused for every restart (what the
+#             monitor does: persistent keep-alive connection)
+#   fresh     a new KubernetesBackend per restart (new connection each time)
+#   fork      a new Python process per restart that builds a backend and
+#             restarts one pod - the per-action process/client/connection
+#             setup that forking kubectl pays (kubectl's own kubeconfig
+#             parsing and TLS handshake come on top)
+#
+# Correctness, checked for every restart: exactly the pod with the target's
+# IP is deleted and the replica count stays constant. A restart storm through
+# HealingExecutor checks that the restart budget holds.
+#
+# Usage:
+#   python benchmarks/bench_orchestrator.py [--restarts 200] [--json out.json]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from healing_executor import HealingExecutor  # noqa: E402
+from orchestrator import FakeBackend, KubernetesBackend  # noqa: E402
+
+FORK_DRIVER = """
+import sys
+sys.path.insert(0, {root!r})
+from orchestrator import KubernetesBackend
+KubernetesBackend(namespace='default', api_url={api_url!r}, token='bench').restart({ip!r})
+"""
+
+
+def make_handler(deployment):
+    class StubKubernetesAPI(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; without this, Nagle +
+        # delayed ACK add ~40ms per response on a kept-alive connection
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            field = query.get('fieldSelector', [''])[0]
+            ip = field.split('=', 1)[1] if field.startswith('status.podIP=') else None
+            pods = [
+                {'metadata': {'name': name}, 'status': {'podIP': pod_ip, 'phase': 'Running'}}
+                for name, pod_ip in list(deployment.pods.items())
+                if ip is None or pod_ip == ip
+            ][:1]
+            self._reply(200, {'kind': 'PodList', 'items': pods})
+
+        def do_DELETE(self):
+            name = urlsplit(self.path).path.rsplit('/', 1)[1]
+            try:
+                deployment.delete_pod(name)
+            except Exception:
+                self._reply(404, {'kind': 'Status', 'code': 404})
+                return
+            self._reply(200, {'kind': 'Pod', 'metadata': {'name': name}})
+
+    return StubKubernetesAPI
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_scenario(name, deployment, api_url, restarts):
+    """Restart replicas round-robin `restarts` times; returns (latencies, wrong restarts)"""
+    backend = KubernetesBackend(namespace='default', api_url=api_url, token='bench')
+    latencies = []
+    errors = 0
+
+    for i in range(restarts):
+        ip = list(deployment.pods.values())[i % len(deployment.pods)]
+        expected = next(pod for pod, pod_ip in deployment.pods.items() if pod_ip == ip)
+        before = len(deployment.restarts)
+
+        start = time.perf_counter()
+        if name == 'session':
+            restarted = backend.restart(ip)
+        elif name == 'fresh':
+            fresh = KubernetesBackend(namespace='default', api_url=api_url, token='bench')
+            restarted = fresh.restart(ip)
+            fresh.close()
+        else:
+            code = FORK_DRIVER.format(root=ROOT, api_url=api_url, ip=ip)
+            subprocess.run([sys.executable, '-c', code], check=True)
+            restarted = deployment.restarts[-1][1]
+        latencies.append(time.perf_counter() - start)
+
+        deleted = deployment.restarts[before:]
+        if (restarted != expected or len(deleted) != 1 or deleted[0][1] != expected
+                or expected in deployment.pods):
+            errors += 1
+
+    backend.close()
+    return latencies, errors
+
+
+def restart_storm(replicas, budget):
+    """Every replica asks for a restart at once; the budget must hold"""
+    deployment = FakeBackend(replicas=replicas, restart_latency=0.01)
+    executor = HealingExecutor(restart_budget=budget, budget_window=300)
+    accepted = sum(
+        executor.submit(name, 'restart_container', deployment.restart, ip)[0]
+        for name, ip in list(deployment.pods.items())
+    )
+    executor.shutdown(wait=True)
+    return accepted, len(deployment.restarts), len(deployment.pods)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orchestrator restart benchmark")
+    parser.add_argument('--restarts', type=int, default=200)
+    parser.add_argument('--fork-restarts', type=int, default=20,
+                        help="Restarts for the (slow) fork scenario")
+    parser.add_argument('--replicas', type=int, default=10)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    deployment = FakeBackend(replicas=args.replicas)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(deployment))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("="*60)
+    print("🔁 ORCHESTRATOR RESTART BENCHMARK")
+    print("="*60)
+    print(f"  Stub Kubernetes API at {api_url}, {args.replicas} replicas\n")
+    print(f"  {'scenario':<10}{'restarts':>10}{'p50':>10}{'p99':>10}{'mean':>10}{'wrong':>8}")
+
+    results = {}
+    for name in ('session', 'fresh', 'fork'):
+        restarts = args.fork_restarts if name == 'fork' else args.restarts
+        latencies, errors = run_scenario(name, deployment, api_url, restarts)
+        results[name] = {
+            'restarts': restarts,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.mean(latencies) * 1000,
+            'wrong_pod': errors,
+        }
+        r = results[name]
+        print(f"  {name:<10}{restarts:>10}{r['p50_ms']:>8.2f}ms{r['p99_ms']:>8.2f}ms"
+              f"{r['mean_ms']:>8.2f}ms{errors:>8}")
+
+    server.shutdown()
+
+    accepted, executed, replicas = restart_storm(args.replicas, budget=3)
+    results['storm'] = {'accepted': accepted, 'executed': executed, 'replicas_after': replicas}
+    print(f"\n  Restart storm ({args.replicas} replicas, budget 3): "
+          f"{accepted} accepted, {executed} executed, {replicas} replicas after")
+
+    ok = (all(results[name]['wrong_pod'] == 0 for name in ('session', 'fresh', 'fork'))
+          and executed == 3 and replicas == args.replicas
+          and len(deployment.pods) == args.replicas)
+    print(f"\n{'✅' if ok else '❌'} Correctness checks {'passed' if ok else 'FAILED'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# Probe Scheduler Simulation
+#
+# Probe traffic and incident detection latency of the monitor's probe
+# scheduling policies on a simulated fleet (simulated clock, no network):
+#
+#   fixed          every target every 5s (old behaviour)
+#   adaptive       probe_scheduler.ProbeScheduler, polling only
+#   adaptive+push  adaptive, plus the patient app's /notify push when its
+#                  error count rises (push_delay after the incident starts);
+#                  healthy targets back off to 300s since pushes catch incidents
+#
+# Each target is healthy except for incidents, which start at random times
+# (Poisson, --incidents per target per hour) and last --incident-duration
+# seconds. A probe during an incident sees a degraded /health payload with a
+# rising error count; a healthy probe gets "no action" at the confidence the
+# shipped model typically gives healthy pods (~0.86).
+# Detection latency = first probe that sees the incident - incident start.
+#
+# Usage:
+#   python benchmarks/bench_probe_scheduler.py [--targets 1000] [--hours 1]
+
+import argparse
+import heapq
+import json
+import os
+import random
+import statistics
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from probe_scheduler import ProbeScheduler  # noqa: E402
+
+HEALTHY = {'status': 'healthy', 'error_count': 0}
+
+# Same as DoctorMonitorML with a notify port
+PUSH_MAX_INTERVAL = 300.0
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_incidents(n_targets, duration, rate_per_hour, length, rng):
+    """Sorted (start, end, target) incidents"""
+    incidents = []
+    for target in range(n_targets):
+        t = rng.expovariate(rate_per_hour / 3600.0)
+        while t < duration:
+            incidents.append((t, t + length, target))
+            t += length + rng.expovariate(rate_per_hour / 3600.0)
+    incidents.sort()
+    return incidents
+
+
+def simulate(policy, n_targets, duration, incidents, push_delay, seed):
+    rng = random.Random(seed)
+    clock = SimClock()
+    if policy == 'fixed':
+        scheduler = ProbeScheduler(base_interval=5.0, min_interval=5.0,
+                                   max_interval=5.0, backoff=1.0, clock=clock)
+    elif policy == 'adaptive+push':
+        # Pushes catch incidents, so polling is only a safety net
+        scheduler = ProbeScheduler(max_interval=PUSH_MAX_INTERVAL, clock=clock)
+    else:
+        scheduler = ProbeScheduler(clock=clock)
+
+    # Stagger first probes like a real start (discovery spreads over a tick)
+    for target in range(n_targets):
+        scheduler.add(target, delay=rng.uniform(0, 5.0))
+
+    # Event queue: incident starts/ends and pushes
+    events = []
+    for start, end, target in incidents:
+        events.append((start, 1, target, end))
+        if policy == 'adaptive+push':
+            events.append((start + push_delay, 2, target, end))
+    heapq.heapify(events)
+
+    active = {}          # target -> [start, end, errors, detected]
+    latencies = []
+    probes = 0
+
+    while True:
+        next_probe = scheduler.delay()
+        next_probe = clock.now + next_probe if next_probe is not None else float('inf')
+        next_event = events[0][0] if events else float('inf')
+        now = min(next_probe, next_event)
+        if now >= duration:
+            break
+        clock.now = now
+
+        while events and events[0][0] <= now:
+            _, kind, target, end = heapq.heappop(events)
+            if kind == 1:
+                active[target] = [now, end, 0, False]
+            elif target in active:
+                scheduler.notify(target)
+
+        for target in scheduler.pop_due(now):
+            probes += 1
+            incident = active.get(target)
+            if incident and now >= incident[1]:
+                if not incident[3]:
+                    latencies.append(incident[1] - incident[0])
+                del active[target]
+                incident = None
+
+            if incident:
+                incident[2] += 1
+                if not incident[3]:
+                    incident[3] = True
+                    latencies.append(now - incident[0])
+                health = {'status': 'degraded', 'error_count': incident[2] * 3}
+                scheduler.report(target, health, 'reset_errors', 0.85)
+            else:
+                scheduler.report(target, HEALTHY, None, 0.86)
+
+    return probes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe scheduler simulation")
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--hours', type=float, default=1.0)
+    parser.add_argument('--incidents', type=float, default=0.5,
+                        help="Incidents per target per hour")
+    parser.add_argument('--incident-duration', type=float, default=120.0)
+    parser.add_argument('--push-delay', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    duration = args.hours * 3600
+    incidents = make_incidents(args.targets, duration, args.incidents,
+                               args.incident_duration, random.Random(args.seed))
+
+    print("="*60)
+    print("📡 PROBE SCHEDULER SIMULATION")
+    print("="*60)
+    print(f"  {args.targets} targets, {args.hours:g}h simulated, {len(incidents)} incidents\n")
+    print(f"  {'policy':<15}{'probes':>10}{'probes/s':>10}{'reduction':>11}"
+          f"{'detect p50':>12}{'detect p99':>12}")
+
+    results = {}
+    baseline = None
+    for policy in ('fixed', 'adaptive', 'adaptive+push'):
+        probes, latencies = simulate(policy, args.targets, duration, incidents,
+                                     args.push_delay, args.seed)
+        baseline = baseline or probes
+        latencies.sort()
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else 0.0
+        results[policy] = {
+            'probes': probes,
+            'probes_per_second': probes / duration,
+            'reduction': baseline / probes,
+            'detect_p50_seconds': p50,
+            'detect_p99_seconds': p99,
+        }
+        print(f"  {policy:<15}{probes:>10}{probes / duration:>10.1f}{baseline / probes:>10.1f}x"
+              f"{p50:>11.2f}s{p99:>11.2f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
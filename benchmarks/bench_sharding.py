@@ -0,0 +1,202 @@
+# Sharded Monitor Benchmark
+#
+# Target assignment and throughput of the sharded monitor (sharding.py):
+#
+# - Balance: targets per worker on the consistent-hash ring (max / mean)
+# - Rebalance: share of targets that change owner when a worker joins,
+#   against the 1/(N+1) minimum
+# - Handoff: a worker joins at t=0 and the others notice at a random point
+#   within their refresh interval (simulated clock). Counts pod-seconds in
+#   which two workers would both be allowed to heal the same pod, with the
+#   default settle time and with none
+# - Throughput: N worker processes, each running the monitor's decision
+#   pipeline (record history -> anomaly filter/cache/model -> decision) on
+#   the targets it owns, synthetic /health data, no network. Reported both
+#   as measured wall-clock throughput (bounded by the cores of this machine)
+#   and as throughput with one core per worker (decisions / slowest worker's
+#   CPU time)
+#
+# Usage:
+#   python benchmarks/bench_sharding.py [--targets 10000] [--workers 1,2,4,8]
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from fleet_poller import Target  # noqa: E402
+from sharding import HashRing, Shard, StaticMembership  # noqa: E402
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def target_names(n_targets):
+    return [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:5000" for i in range(n_targets)]
+
+
+def ring_quality(names, n_workers):
+    members = [f"shard-{i}" for i in range(n_workers)]
+    ring = HashRing(members)
+    counts = {member: 0 for member in members}
+    for name in names:
+        counts[ring.owner(name)] += 1
+    joined = HashRing(members + [f"shard-{n_workers}"])
+    moved = sum(ring.owner(name) != joined.owner(name) for name in names)
+    return max(counts.values()) / (len(names) / n_workers), moved / len(names)
+
+
+def handoff(names, n_workers, settle, seed, duration=60.0, step=0.25):
+    """Pod-seconds with two workers allowed to heal the same pod during a join"""
+    rng = random.Random(seed)
+    clock = SimClock()
+    targets = [Target(name, '') for name in names]
+    old = [f"shard-{i}" for i in range(n_workers)]
+    new = f"shard-{n_workers}"
+
+    async def start():
+        workers = []
+        for member in old:
+            shard = Shard(StaticMembership(old), member, settle=settle, clock=clock)
+            await shard.refresh()
+            workers.append(shard)
+        clock.now = -3600.0
+        for shard in workers:
+            shard.assign(targets)
+        clock.now = 0.0
+        joiner = Shard(StaticMembership(old + [new]), new, settle=settle, clock=clock)
+        await joiner.refresh()
+        joiner.assign(targets)
+        return workers, joiner
+
+    workers, joiner = asyncio.run(start())
+    notice = [rng.uniform(0, joiner.refresh_interval) for _ in workers]
+    moved = [name for name in names if joiner.owns(name)]
+
+    overlap = 0.0
+    while clock.now < duration:
+        for shard, at in zip(workers, notice):
+            if at is not None and clock.now >= at:
+                shard.membership = StaticMembership(old + [new])
+                asyncio.run(shard.refresh())
+                shard.assign(targets)
+        notice = [None if at is not None and clock.now >= at else at for at in notice]
+        for name in moved:
+            healers = joiner.may_heal(name) + sum(shard.may_heal(name) for shard in workers)
+            overlap += step * (healers > 1)
+        clock.now += step
+    return overlap, len(moved)
+
+
+def worker_pipeline(member, members, names, ticks, seed, queue):
+    """One shard worker: decision pipeline over its own targets"""
+    # Imported before redirecting: the module rebinds sys.stdout
+    from doctor_monitor_ml import DoctorMonitorML
+    with contextlib.redirect_stdout(io.StringIO()):
+        monitor = DoctorMonitorML(model_path=os.path.join(ROOT, 'app', 'healing_brain_forest'),
+                                  fallback_model_path=os.path.join(ROOT, 'app', 'healing_brain.pkl'),
+                                  orchestrator='fake')
+    shard = Shard(StaticMembership(members), member)
+    asyncio.run(shard.refresh())
+    owned = shard.assign([Target(name, f"http://{name}") for name in names])
+
+    rng = random.Random(f"{seed}:{member}")
+    errors = {target: rng.randint(0, 3) for target in owned}
+    decisions = 0
+    start_cpu, start_wall = time.process_time(), time.time()
+    for tick in range(ticks):
+        health_by_target = {}
+        for target in owned:
+            if rng.random() < 0.02:
+                errors[target] += rng.randint(1, 4)
+            health = {'status': 'healthy', 'cpu_usage': rng.randint(10, 70),
+                      'memory_usage': rng.randint(20, 70), 'error_count': errors[target],
+                      'uptime': 5 * tick}
+            monitor.record_health(target.name, health)
+            health_by_target[target] = health
+        with contextlib.redirect_stdout(io.StringIO()):
+            decisions += len(monitor.analyze_fleet(health_by_target))
+    queue.put((decisions, time.process_time() - start_cpu, start_wall, time.time()))
+
+
+def throughput(names, n_workers, ticks, seed):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    members = [f"shard-{i}" for i in range(n_workers)]
+    workers = [context.Process(target=worker_pipeline,
+                               args=(member, members, names, ticks, seed, queue))
+               for member in members]
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=600) for _ in workers]
+    for worker in workers:
+        worker.join()
+    decisions = sum(r[0] for r in results)
+    wall = max(r[3] for r in results) - min(r[2] for r in results)
+    return decisions / wall, decisions / max(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded monitor benchmark")
+    parser.add_argument('--targets', type=int, default=10000)
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help="Comma-separated worker counts")
+    parser.add_argument('--ticks', type=int, default=10,
+                        help="Decision ticks per worker in the throughput test")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    names = target_names(args.targets)
+    counts = [int(n) for n in args.workers.split(',')]
+
+    print("="*60)
+    print("🧩 SHARDED MONITOR BENCHMARK")
+    print("="*60)
+    print(f"  {args.targets} targets, {os.cpu_count()} cores on this machine\n")
+
+    results = {}
+    print(f"  {'workers':>7}{'max/mean':>10}{'moved on join':>15}{'ideal':>8}"
+          f"{'overlap (settle)':>18}{'overlap (none)':>16}")
+    for n in counts:
+        imbalance, moved = ring_quality(names, n)
+        overlap, handed = handoff(names, n, None, args.seed)
+        overlap_unsettled, _ = handoff(names, n, 0.0, args.seed)
+        results[n] = {'imbalance': imbalance, 'moved_on_join': moved, 'ideal_moved': 1 / (n + 1),
+                      'handed_off': handed, 'double_heal_pod_seconds': overlap,
+                      'double_heal_pod_seconds_no_settle': overlap_unsettled}
+        print(f"  {n:>7}{imbalance:>10.2f}{moved:>15.1%}{1 / (n + 1):>8.1%}"
+              f"{overlap:>16.0f}s{overlap_unsettled:>15.0f}s")
+
+    print(f"\n  {'workers':>7}{'decisions/s':>14}{'speedup':>9}{'1 core/worker':>16}{'speedup':>9}")
+    base = None
+    for n in counts:
+        measured, per_core = throughput(names, n, args.ticks, args.seed)
+        base = base or (measured, per_core)
+        results[n].update({'decisions_per_second': measured,
+                           'decisions_per_second_core_per_worker': per_core})
+        print(f"  {n:>7}{measured:>14.0f}{measured / base[0]:>8.2f}x"
+              f"{per_core:>16.0f}{per_core / base[1]:>8.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Monitor Startup Benchmark
+#
+# Measures cold-start time of the monitor's model loading in fresh Python
+# processes (so import costs are included), and which heavy modules get
+# imported along the way:
+#
+#   pickle   - import train_brain + HealingBrain.load_model(healing_brain.pkl)
+#   compiled - import inference_brain + InferenceBrain.load_model(forest dir)
+#   monitor  - import doctor_monitor_ml + DoctorMonitorML() (what the
+#              container actually does at startup)
+#
+# Usage:
+#   python benchmarks/bench_startup.py [--runs 5] [--json results.json]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+PROBE = """
+import sys, time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in ('pandas', 'sklearn', 'scipy', 'joblib') if m in sys.modules)
+sys.__stderr__.write('RESULT %f %s\\n' % (elapsed, ','.join(heavy)))
+"""
+
+SCENARIOS = {
+    'pickle': """
+from train_brain import HealingBrain
+HealingBrain().load_model({pkl!r})
+""",
+    'compiled': """
+from inference_brain import InferenceBrain
+InferenceBrain().load_model({forest!r})
+""",
+    'monitor': """
+from doctor_monitor_ml import DoctorMonitorML
+DoctorMonitorML(model_path={forest!r}, fallback_model_path={pkl!r})
+""",
+}
+
+
+def run_once(body, cwd):
+    code = PROBE.format(body=body)
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    process_start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - process_start
+
+    line = [l for l in result.stderr.splitlines() if l.startswith('RESULT ')][-1]
+    _, elapsed, heavy = (line.split(' ') + [''])[:3]
+    return float(elapsed), wall, heavy.split(',') if heavy else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor cold-start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--pkl', default=os.path.join(ROOT, 'app', 'healing_brain.pkl'))
+    parser.add_argument('--forest', default=os.path.join(ROOT, 'app', 'healing_brain_forest'))
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🚀 MONITOR STARTUP BENCHMARK")
+    print("="*60)
+    print(f"  Runs per scenario: {args.runs} (fresh process each)\n")
+    print(f"  {'scenario':<10}{'load (median)':>16}{'process (median)':>20}  heavy imports")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, template in SCENARIOS.items():
+            body = template.format(pkl=args.pkl, forest=args.forest)
+            runs = [run_once(body, cwd) for _ in range(args.runs)]
+            load = statistics.median(r[0] for r in runs)
+            wall = statistics.median(r[1] for r in runs)
+            heavy = runs[-1][2]
+            results[name] = {'load_seconds': load, 'process_seconds': wall,
+                             'heavy_imports': heavy}
+            print(f"  {name:<10}{load * 1000:>14.1f}ms{wall * 1000:>18.1f}ms  "
+                  f"{', '.join(heavy) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
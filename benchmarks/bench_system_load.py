@@ -0,0 +1,224 @@
+# System Load and Fault-Injection Benchmark
+#
+# The patient app under load, with faults injected and the monitor healing
+# it (load_suite.py), for every combination of:
+#
+#   --servers      flask (dev server), gunicorn (--workers sync workers),
+#                  uvicorn (ASGI mode, --workers workers)
+#   --rates        offered requests/s (open loop)
+#   --fault-mixes  none  clean traffic, no faults (false heals, overhead)
+#                  soft  bursts of 7 errors every 20s (error reset due)
+#                  hard  bursts of 15 errors every 75s (restart due)
+#                  data  70% /data traffic, whose 20% failure rate the
+#                        monitor keeps healing
+#
+# Reported per run: app throughput and latency percentiles (from the
+# scheduled send time), failed requests, time-to-detect and time-to-heal
+# per incident, heals/restarts/skipped decisions, requests failed during
+# restarts, and the monitor's CPU share. --baseline adds a run without the
+# monitor per combination and prints the monitor's latency/throughput
+# overhead. Everything runs on this machine: app, load generator and
+# monitor share its cores, so compare results from the same machine.
+#
+# Results (--json) carry the git commit; --compare prints the change of the
+# headline metrics against an earlier results file (--input compares two
+# files without running).
+#
+# Usage:
+#   python benchmarks/bench_system_load.py [--servers flask,gunicorn] [--rates 50]
+#       [--fault-mixes soft,hard] [--duration 90] [--baseline] [--json out.json]
+#       [--compare base.json]
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+from load_suite import FAULT_MIXES, SERVERS, run_load  # noqa: E402
+
+# (label, path into a run's results, higher is better)
+HEADLINE = (
+    ('throughput rps', ('throughput_rps',), True),
+    ('latency p50 ms', ('latency_ms', 'p50'), False),
+    ('latency p99 ms', ('latency_ms', 'p99'), False),
+    ('failed', ('failed',), False),
+    ('detect p50 s', ('faults', 'time_to_detect_s', 'p50'), False),
+    ('heal p50 s', ('faults', 'time_to_heal_s', 'p50'), False),
+    ('monitor cpu', ('healing', 'monitor_cpu_share'), False),
+)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def run_key(run):
+    return (run['server'], run['workers'], run['fault_mix'], run['offered_rps'], run['monitor'])
+
+
+def describe(key):
+    server, workers, mix, rate, monitor = key
+    name = f"{server}x{workers}" if workers else server
+    return f"{name} {mix} {rate:g}rps" + ('' if monitor else ' (no monitor)')
+
+
+def lookup(run, path):
+    value = run
+    for part in path:
+        if value is None:
+            return None
+        value = value.get(part)
+    return value
+
+
+def fmt(value, precision=2):
+    return '-' if value is None else f"{value:.{precision}f}"
+
+
+def print_run(run):
+    faults, healing = run['faults'], run['healing']
+    latency = run['latency_ms'] or {}
+    detect = lookup(run, ('faults', 'time_to_detect_s', 'p50'))
+    heal = lookup(run, ('faults', 'time_to_heal_s', 'p50'))
+    print(f"  {describe(run_key(run)):<34}{run['throughput_rps']:>7.1f}"
+          f"{fmt(latency.get('p50')):>9}{fmt(latency.get('p99')):>9}{run['failed']:>7}"
+          f"{faults['detected']:>4}/{faults['injected']:<3}{fmt(detect, 1):>7}{fmt(heal, 1):>7}"
+          f"{healing['soft_heals']:>6}{healing['restarts']:>5}{healing['skipped_heals']:>6}"
+          f"{healing['monitor_cpu_share']:>8.2%}")
+
+
+def print_overhead(runs):
+    """Monitor on vs off for the same server/mix/rate"""
+    by_key = {run_key(run): run for run in runs}
+    rows = [(key, run, by_key.get(key[:4] + (False,)))
+            for key, run in by_key.items() if key[4]]
+    rows = [row for row in rows if row[2] is not None]
+    if not rows:
+        return
+    print("\n  Monitor overhead (vs the same run without the monitor):")
+    for key, on, off in rows:
+        change = on['throughput_rps'] / off['throughput_rps'] - 1
+        print(f"    {describe(key):<34} throughput {change:>+7.2%}"
+              f"  p50 {on['latency_ms']['p50'] - off['latency_ms']['p50']:>+7.2f}ms"
+              f"  p99 {on['latency_ms']['p99'] - off['latency_ms']['p99']:>+7.2f}ms")
+
+
+def compare(base, new):
+    print(f"\n  Compared with {base.get('commit') or '?'} "
+          f"({base.get('created', '?')}) -> {new.get('commit') or '?'}:")
+    base_runs = {run_key(run): run for run in base['runs']}
+    for run in new['runs']:
+        old = base_runs.get(run_key(run))
+        if old is None:
+            print(f"    {describe(run_key(run))}: not in the base results")
+            continue
+        print(f"    {describe(run_key(run))}")
+        for label, path, higher_is_better in HEADLINE:
+            before, after = lookup(old, path), lookup(run, path)
+            if before is None or after is None:
+                continue
+            if before:
+                change = after / before - 1
+            else:
+                change = 0.0 if after == before else float('inf')
+            better = change > 0 if higher_is_better else change < 0
+            mark = '' if abs(change) < 0.05 else ('better' if better else 'worse')
+            shown = f"{change:>+8.1%}" if change != float('inf') else f"{'new':>8}"
+            print(f"      {label:<16}{before:>10.3f} -> {after:<10.3f}{shown}  {mark}")
+
+
+def run_suite(args):
+    servers = args.servers.split(',')
+    rates = [float(rate) for rate in args.rates.split(',')]
+    mixes = args.fault_mixes.split(',')
+    for mix in mixes:
+        if mix not in FAULT_MIXES:
+            sys.exit(f"Unknown fault mix: {mix}")
+
+    print("="*60)
+    print("🚦 SYSTEM LOAD AND FAULT-INJECTION BENCHMARK")
+    print("="*60)
+    print(f"  {len(servers) * len(rates) * len(mixes) * (2 if args.baseline else 1)} runs of "
+          f"{args.duration:.0f}s, {os.cpu_count()} CPUs\n")
+    print(f"  {'run':<34}{'rps':>7}{'p50 ms':>9}{'p99 ms':>9}{'failed':>7}{'det':>8}"
+          f"{'ttd s':>7}{'tth s':>7}{'heals':>6}{'rst':>5}{'skip':>6}{'mon cpu':>8}")
+
+    runs = []
+    for server in servers:
+        for rate in rates:
+            for mix in mixes:
+                for with_monitor in ((True, False) if args.baseline else (True,)):
+                    run = run_load(server, rate=rate, duration=args.duration, fault_mix=mix,
+                                   workers=args.workers, burst=args.burst,
+                                   burst_interval=args.burst_interval, seed=args.seed,
+                                   with_monitor=with_monitor, check_interval=args.check_interval,
+                                   adaptive=not args.fixed_interval)
+                    runs.append(run)
+                    print_run(run)
+    print_overhead(runs)
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {'cpus': os.cpu_count(), 'python': platform.python_version(),
+                    'platform': platform.platform()},
+        'config': {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'input')},
+        'runs': runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="System load and fault-injection benchmark")
+    parser.add_argument('--servers', default='flask,gunicorn',
+                        help=f"Comma-separated: {', '.join(SERVERS)}")
+    parser.add_argument('--rates', default='50', help="Comma-separated requests/s")
+    parser.add_argument('--fault-mixes', default='soft,hard',
+                        help=f"Comma-separated: {', '.join(FAULT_MIXES)}")
+    parser.add_argument('--duration', type=float, default=90.0, help="Seconds of load per run")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn/uvicorn workers")
+    parser.add_argument('--burst', type=int, help="Override the mixes' burst size")
+    parser.add_argument('--burst-interval', type=float, help="Override the mixes' burst interval")
+    parser.add_argument('--check-interval', type=float,
+                        help="Monitor base probe interval (default: the monitor's)")
+    parser.add_argument('--fixed-interval', action='store_true',
+                        help="Monitor probes at a fixed interval (no adaptive scheduling)")
+    parser.add_argument('--baseline', action='store_true',
+                        help="Also run every combination without the monitor")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--input', help="Compare this results file instead of running")
+    args = parser.parse_args()
+
+    if args.input:
+        if not args.compare:
+            parser.error("--input needs --compare")
+        with open(args.input) as f:
+            results = json.load(f)
+    else:
+        results = run_suite(args)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to: {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+# Compiled Tree-Ensemble Evaluator
+#
+# A fitted RandomForestClassifier flattened into a handful of NumPy arrays,
+# plus a pure-NumPy evaluator that walks all trees at once.
+#
+# For a single sample, sklearn's predict_proba spends most of its time on
+# input validation and per-tree dispatch, not on the ~10 comparisons each tree
+# actually needs. Here every tree advances one level per step with a few
+# vectorized gathers, so a depth-10 forest costs ~10 small array operations
+# regardless of the number of trees.
+#
+# Array layout (all trees concatenated, node ids are global):
+#   feature   int32   (n_nodes,)          feature tested at each node
+#   threshold float64 (n_nodes,)          go left if x[feature] <= threshold
+#   children  int32   (2 * n_nodes,)      [left, right] per node; leaves
+#                                         point to themselves
+#   value     float64 (n_nodes, n_classes) class probabilities (leaves)
+#   roots     int32   (n_trees,)          root node id of each tree
+#
+# This module only depends on NumPy so it can be used for inference without
+# importing sklearn. Saved forests can be loaded memory-mapped.
+#
+# Where it stops paying off (shipped forest: 100 trees, depth 10, 4526
+# nodes, 1-CPU VM): a single sample takes ~20µs against sklearn's ~8ms, but
+# not the <10µs first aimed for, since the fast path is ~15 NumPy calls of
+# ~1µs each. Batches up to ~1024 rows beat sklearn; at 4096 rows sklearn's
+# per-tree Cython loop is faster (~7µs vs ~9µs per row), so HealingBrain
+# hands batches above compiled_max_batch (1024) to sklearn.
+
+import json
+import os
+
+import numpy as np
+
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class CompiledForest:
+    """
+    Array-backed random forest evaluator
+
+    predict_proba(X) returns the same probabilities as the source
+    RandomForestClassifier.predict_proba (up to float rounding).
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, depth,
+                 classes, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes = np.asarray(classes)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+        # take() converts int32 indices to intp on every call; the
+        # evaluators use intp copies (the saved arrays stay int32)
+        self._feature = feature.astype(np.intp)
+        self._children = children.astype(np.intp)
+        self._roots = roots.astype(np.intp)
+        self._tree_weights = np.full(len(roots), 1.0 / max(len(roots), 1))
+
+        # Single-sample path: nodes renumbered so those testing the same
+        # feature are contiguous; x.repeat(counts) then lines each node up
+        # with its feature value without a gather
+        order = np.argsort(feature, kind='stable')
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        pairs = self._children.reshape(-1, 2)[order]
+        self._counts = np.bincount(feature, minlength=len(self.feature_names or ()))
+        self._threshold_by_feature = threshold[order]
+        self._left_by_feature = rank[pairs[:, 0]]
+        self._step_by_feature = rank[pairs[:, 1]] - self._left_by_feature
+        self._roots_by_feature = rank[self._roots]
+        self._value_by_feature = value[order]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier (or a single tree)"""
+        estimators = getattr(model, 'estimators_', [model])
+
+        features, thresholds, childrens, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(n)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, ids, tree.children_left) + offset
+            right = np.where(is_leaf, ids, tree.children_right) + offset
+
+            # Per-node class distribution -> probabilities (same as
+            # DecisionTreeClassifier.predict_proba normalization)
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            childrens.append(np.column_stack([left, right]).ravel())
+            values.append(value / totals)
+            roots.append(offset)
+
+            offset += n
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(childrens).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+            classes=model.classes_,
+            feature_names=getattr(model, 'feature_names_in_', None),
+        )
+
+    def leaves(self, X):
+        """Leaf node id reached in every tree, shape (n_samples, n_trees)"""
+        # sklearn evaluates trees on float32 inputs; match it so samples that
+        # sit exactly on a threshold go the same way
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_samples, n_features = X.shape
+        flat_x = X.ravel()
+        row_offset = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+
+        feature = self._feature
+        threshold = self.threshold
+        children = self._children
+        node = np.repeat(self._roots[None, :], n_samples, axis=0)
+
+        # One level of every tree per step; take() + in-place ops keep the
+        # temporaries to a minimum
+        for _ in range(self.depth):
+            index = feature.take(node)
+            index += row_offset
+            go_right = flat_x.take(index) > threshold.take(node)
+            node <<= 1
+            node |= go_right
+            node = children.take(node)
+
+        return node
+
+    def predict_proba(self, X):
+        """Class probabilities, shape (n_samples, n_classes)"""
+        # Mean over trees as a matmul: much faster than .sum(axis=1) / n_trees
+        return self._tree_weights @ self.value.take(self.leaves(X), axis=0)
+
+    def predict_proba_one(self, x):
+        """
+        Fast path for a single sample (1-D feature vector)
+
+        Evaluates the split condition of every node once, turning the forest
+        into a successor table, then follows it depth times from the roots.
+        Returns a 1-D array of class probabilities.
+        """
+        x = np.asarray(x, dtype=np.float32).astype(np.float64)
+        counts = self._counts
+        if len(counts) != len(x):
+            counts = np.bincount(self.feature, minlength=len(x))
+        # Leaves test feature 0 against +inf: never go right, stay put
+        successor = (x.repeat(counts) > self._threshold_by_feature) * self._step_by_feature
+        successor += self._left_by_feature
+
+        node = self._roots_by_feature
+        for _ in range(self.depth):
+            node = successor.take(node)
+
+        return self._tree_weights @ self._value_by_feature.take(node, axis=0)
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, path):
+        """Write the arrays (one .npy per array) and metadata to a directory"""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+        meta = {
+            'depth': self.depth,
+            'classes': self.classes.tolist(),
+            'feature_names': self.feature_names,
+            'n_trees': self.n_trees,
+            'n_nodes': self.n_nodes,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load a forest written by save()
+
+        mmap_mode='r' maps the arrays read-only instead of reading them, so
+        processes loading the same directory share the pages.
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        # np.asarray drops the np.memmap subclass (and its per-operation
+        # overhead) but keeps the mapped buffer
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+            for name in ARRAY_NAMES
+        }
+        return cls(
+            depth=meta['depth'],
+            classes=meta['classes'],
+            feature_names=meta.get('feature_names'),
+            **arrays,
+        )
@@ -0,0 +1,119 @@
+# Decision Cache and Fast Path
+#
+# Sits in front of the healing model so the forest only runs for inputs whose
+# answer is not already known:
+#
+# 1. Fast path: a clearly healthy snapshot (error_count below the soft-healing
+#    threshold, CPU and memory well below the levels the model reacts to) is
+#    "no action" without touching the model. The limits are inside the region
+#    where the shipped model predicts no_action for every input.
+# 2. LRU cache keyed on the quantized feature vector. Features the decision
+#    does not depend on at fine resolution (uptime) are bucketed, so a stable
+#    pod maps to the same key tick after tick.
+# 3. Everything else goes to the model, in one batch per call.
+#
+# Predictions keep the format of InferenceBrain.predict_batch, plus a
+# 'source' field: 'rule', 'cache' or 'model'.
+
+from collections import OrderedDict
+from datetime import datetime
+
+# Bucket sizes per feature; other base features are used as-is and history
+# features are rounded to `default_step`
+DEFAULT_QUANTA = {
+    'uptime': 600,
+}
+
+
+class DecisionCache:
+    """
+    Rules-first, cached front end for a healing brain
+
+    Usage:
+        decisions = DecisionCache(brain)
+        predictions = decisions.predict_batch(metrics_list)
+        decisions.stats   # {'rule': ..., 'hits': ..., 'misses': ...}
+    """
+
+    def __init__(self, brain, maxsize=4096, quanta=None, default_step=0.1,
+                 healthy_errors=5, healthy_cpu=75, healthy_memory=75):
+        self.brain = brain
+        self.maxsize = maxsize
+        self.quanta = {**DEFAULT_QUANTA, **(quanta or {})}
+        self.default_step = default_step
+        self.healthy_errors = healthy_errors
+        self.healthy_cpu = healthy_cpu
+        self.healthy_memory = healthy_memory
+
+        self._cache = OrderedDict()
+        self.stats = {'rule': 0, 'hits': 0, 'misses': 0}
+
+        actions = brain.action_names
+        self._healthy = {
+            'recommended_action': 'no_action',
+            'confidence': 1.0,
+            'probabilities': {action: float(action == 'no_action') for action in actions},
+            'source': 'rule',
+        }
+
+    def _is_clearly_healthy(self, metrics):
+        return (metrics.get('error_count', 0) < self.healthy_errors
+                and metrics.get('cpu_usage', 0) <= self.healthy_cpu
+                and metrics.get('memory_usage', 0) <= self.healthy_memory)
+
+    def key(self, metrics, hour):
+        """Quantized feature vector used as the cache key"""
+        key = []
+        for name in self.brain.feature_names:
+            value = hour if name == 'hour_of_day' else metrics.get(name, 0)
+            step = self.quanta.get(name)
+            if step is None:
+                step = 1 if name in ('cpu_usage', 'memory_usage', 'error_count') else self.default_step
+            key.append(int(value // step))
+        return tuple(key)
+
+    def predict_batch(self, metrics):
+        """Predictions for a list of metric dicts (rules, then cache, then model)"""
+        hour = datetime.now().hour
+        predictions = [None] * len(metrics)
+        pending = {}
+
+        for i, row in enumerate(metrics):
+            if self._is_clearly_healthy(row):
+                self.stats['rule'] += 1
+                predictions[i] = self._healthy
+                continue
+
+            key = self.key(row, hour)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                predictions[i] = cached
+            else:
+                self.stats['misses'] += 1
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            rows = [metrics[indices[0]] for indices in pending.values()]
+            for (key, indices), prediction in zip(pending.items(), self.brain.predict_batch(rows)):
+                prediction['source'] = 'model'
+                for i in indices:
+                    predictions[i] = prediction
+                self._cache[key] = {**prediction, 'source': 'cache'}
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return predictions
+
+    def predict_action(self, metrics):
+        return self.predict_batch([metrics])[0]
+
+    def clear(self):
+        """Drop cached decisions (e.g. after loading a new model)"""
+        self._cache.clear()
+
+    def hit_rate(self):
+        """Fraction of decisions answered without the model"""
+        total = self.stats['rule'] + self.stats['hits'] + self.stats['misses']
+        return (self.stats['rule'] + self.stats['hits']) / total if total else 0.0
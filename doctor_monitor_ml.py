@@ -14,12 +14,69 @@
 
 import requests
 import time
+import asyncio
 import json
-import subprocess
 import sys
 import os
-from datetime import datetime
-from train_brain import HealingBrain  # Import the ML model
+import threading
+from urllib.parse import urlsplit
+from inference_brain import InferenceBrain  # NumPy-only ML inference
+from metrics_history import MetricsHistory
+from healing_executor import HealingExecutor
+from healing_planner import HealingPlanner
+from orchestrator import create_backend
+from probe_scheduler import ProbeScheduler
+from anomaly_filter import AnomalyFilter
+from decision_cache import DecisionCache
+from history_store import HistoryStore
+from health_client import HealthCache
+from monitor_metrics import SamplingProfiler, StageMetrics, format_summary
+from event_log import EventLog
+
+# Order of the stages in the periodic summary (see monitor_metrics.py)
+STAGE_ORDER = ('tick', 'probe', 'parse', 'record', 'decide', 'features', 'filter',
+               'classify', 'matrix', 'forest', 'plan', 'dispatch', 'history', 'output')
+
+def _verdict(f):
+    return f['reason'] if f['action'] else f"✅ {f['reason']}"
+
+
+# Text rendering of the monitor's records (see event_log.py); JSON output
+# has the same fields
+TEXT_FORMATS = {
+    # Single-target mode: one block per check
+    'check': lambda when, f: (
+        f"\n[{when}] Health Check:\n"
+        f"  Status: {f['status']}\n"
+        f"  CPU: {f['cpu_usage']}%\n"
+        f"  Memory: {f['memory_usage']}%\n"
+        f"  Errors: {f['error_count']}\n"
+        f"  Uptime: {f['uptime']}s\n"
+        f"{_verdict(f)}"),
+    # Fleet mode: a header per tick, one line per target
+    'tick': lambda when, f: (
+        f"\n[{when}] Fleet Health Check: {f['due']}/{f['targets']} targets in {f['poll_ms']}ms"),
+    'health': lambda when, f: (
+        f"  {f['target']}: {f['status']} cpu={f['cpu_usage']}% mem={f['memory_usage']}% "
+        f"errors={f['error_count']} uptime={f['uptime']}s -> {_verdict(f)}"),
+    'probe_failed': lambda when, f: f"  {f['target']}: ❌ Health check failed: {f['error']}",
+    'heal_skipped': lambda when, f: f"   ⏳ Skipping {f['action']} for {f['target']}: {f['reason']}",
+    # Healing actions, written from the executor's worker threads
+    'heal': lambda when, f: (
+        f"\n🔧 SOFT HEALING TRIGGERED: {f['reason']}" if f['action'] == 'reset_errors' else
+        f"\n🔴 CRITICAL HEALING: RESTARTING CONTAINER/POD\n   Reason: {f['reason']}"),
+    'healed': lambda when, f: (
+        f"✅ Healing successful:\n  Previous errors: {f['previous_errors']}"
+        if f['action'] == 'reset_errors' else
+        f"   ✅ Container {f['restarted']} restarted successfully ({f['ms']}ms)"
+        if f['backend'] == 'docker' else
+        f"   ✅ Patient app pod {f['restarted']} deleted - Deployment will recreate it "
+        f"({f['ms']}ms)"),
+    'heal_failed': lambda when, f: f"   ❌ {f['action']} for {f['target']} failed: {f['error']}",
+    'stages': lambda when, f: (
+        f"⏱️  Stages (last {f['window_s']}s, {f['ticks']} ticks): "
+        f"{format_summary(f['stages'], STAGE_ORDER)}"),
+}
 
 # Force unbuffered output for real-time logging in Kubernetes
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', buffering=1)
@@ -39,44 +96,181 @@ class DoctorMonitorML:
     - Infrastructure-level autoscaling
     """
     
-    def __init__(self, patient_url="http://localhost:5000", container_name="patient-app"):
+    def __init__(self, patient_url="http://localhost:5000", container_name="patient-app",
+                 max_concurrency=64, probe_timeout=5.0,
+                 model_path='healing_brain_forest', fallback_model_path='healing_brain.pkl',
+                 restart_budget=3, restart_budget_window=300.0, orchestrator='auto',
+                 adaptive=True, notify_port=None, history_dir=None, anomaly_filter='auto',
+                 shard=None, metrics_port=None, metrics_host='127.0.0.1', events=None,
+                 planner=True):
         self.patient_url = patient_url
         self.container_name = container_name
         self.check_interval = 5
         
-        # Load the trained ML model
-        self.brain = HealingBrain()
+        # Adaptive probing (see probe_scheduler.py): degrading targets are
+        # probed every min_probe_interval. adaptive=False keeps the fixed
+        # check_interval. Only with push notifications, which catch
+        # incidents, do stable healthy targets back off (up to
+        # max_probe_interval; polling is then a safety net for pods that
+        # cannot push). Without a push channel, polling is the only way to see
+        # a new incident, so no target is probed less often than
+        # check_interval (single-target mode never has one).
+        self.adaptive = adaptive
+        self.min_probe_interval = 2.0
+        self.max_probe_interval = 300.0 if notify_port else self.check_interval
+        
+        # Fleet mode settings (see monitor_fleet)
+        self.max_concurrency = max_concurrency
+        self.probe_timeout = probe_timeout
+        self.discovery_interval = 30
+        self.notify_port = notify_port
+        
+        # Sharded deployment (see sharding.py): this worker probes and heals
+        # only the targets it owns on the consistent-hash ring
+        self.shard = shard
+        
+        # Per-stage latency histograms, a periodic summary line and a
+        # sampling profiler toggled over HTTP (see monitor_metrics.py).
+        # Exposed on metrics_host:metrics_port; localhost by default, since
+        # anyone who reaches the port can start the profiler.
+        self.stages = StageMetrics()
+        self.profiler = SamplingProfiler()
+        self.stage_summary_interval = 60
+        self._last_stage_summary = time.monotonic()
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        
+        # Per-target records and tick summaries go through a batched,
+        # bounded event log instead of flushed prints (see event_log.py)
+        self.events = events or EventLog(sys.stdout, text_formats=TEXT_FORMATS)
+        
+        # Rule thresholds (rule-based fallback; error_threshold also bounds
+        # the ML fast path)
+        self.error_threshold = 5
+        self.critical_threshold = 10
+        
+        # Load the trained ML model (model_path: the one actually loaded)
+        self.model_path = None
         try:
-            self.brain.load_model('healing_brain.pkl')
+            self.brain = self._load_brain(model_path, fallback_model_path)
             print("✅ ML model loaded successfully!")
             self.use_ml = True
         except:
             print("⚠️  ML model not found, using rule-based decisions")
             self.use_ml = False
-            self.error_threshold = 5
-            self.critical_threshold = 10
         
-        self.health_history = []
+        # Clearly healthy snapshots skip the model; other decisions are cached
+        # on quantized features (see decision_cache.py)
+        if self.use_ml:
+            self.brain.stages = self.stages
+            self.decisions = DecisionCache(self.brain, healthy_errors=self.error_threshold)
+        
+        # Targets whose sample matches their own healthy baseline skip the
+        # classifier altogether (see anomaly_filter.py). 'auto' enables it for
+        # models with history features: their inputs change every tick, so
+        # the decision cache rarely hits and most rows would reach the model.
+        if anomaly_filter == 'auto':
+            anomaly_filter = self.use_ml and bool(self.brain.history_windows)
+        self.anomalies = AnomalyFilter() if anomaly_filter and self.use_ml else None
+        self._baseline_prediction = {
+            'recommended_action': 'no_action', 'confidence': 1.0, 'source': 'filter',
+        }
+        
+        # Rolling per-target history over time windows (see metrics_history.py),
+        # recorded only when the model was trained with history features
+        self.use_history = self.use_ml and bool(self.brain.history_windows)
+        self.health_history = MetricsHistory(windows=self.brain.history_windows
+                                             if self.use_history else (60, 600))
+        
+        # Sample timestamps for the history (replaceable for offline replay)
+        self.clock = time.time
+        
+        # Observations and decisions persisted for retraining (see
+        # history_store.py); off unless a directory is given
+        self.history_store = HistoryStore(history_dir) if history_dir else None
+        
+        # ML confidence of the latest decision per target (probe scheduling)
+        self.last_confidence = {}
+        
+        # Last /health payload and ETag for conditional probes in single
+        # mode (see health_client.py); fleet mode uses the poller's own
+        self.health_cache = HealthCache()
+        
+        # Healing actions run on a worker pool (see healing_executor.py) so
+        # polling continues while a heal is in progress; in-flight actions are
+        # deduplicated per target, with cooldowns, backoff and a fleet-wide
+        # restart budget
+        self.executor = HealingExecutor(restart_budget=restart_budget,
+                                        budget_window=restart_budget_window,
+                                        on_error=self._heal_raised)
+        
+        # Fleet mode plans each tick's heals together (see healing_planner.py):
+        # at most a few restarts at once and never below the minimum of
+        # healthy replicas; restarts over budget become resets or wait.
+        # True for the defaults, False to dispatch every decision on its own.
+        if planner is True:
+            planner = HealingPlanner()
+        self.planner = planner or None
+        # Targets whose last probe failed (down, for the planner's min_healthy)
+        self._down = set()
+        
+        # Kubernetes/Docker API client, reused across restarts (orchestrator.py);
+        # a backend name ('auto', 'kubernetes', 'docker', 'fake') or an instance
+        if isinstance(orchestrator, str):
+            self.orchestrator_kind, self.orchestrator = orchestrator, None
+        else:
+            self.orchestrator_kind, self.orchestrator = orchestrator.name, orchestrator
+        self._orchestrator_lock = threading.Lock()
+    
+    def _load_brain(self, model_path, fallback_model_path):
+        """
+        Load the healing model
+        
+        Prefers the exported forest directory: NumPy only, memory-mapped,
+        near-instant. Falls back to the pickle, which needs the training
+        stack (pandas, sklearn) and is only imported in that case.
+        """
+        if os.path.isdir(model_path):
+            brain = InferenceBrain()
+            brain.load_model(model_path)
+            self.model_path = model_path
+            return brain
+        
+        from train_brain import HealingBrain
+        brain = HealingBrain()
+        brain.load_model(fallback_model_path)
+        self.model_path = fallback_model_path
+        return brain
+    
+    def swap_brain(self, brain):
+        """
+        Install a new model without pausing inference (see model_updater.py)
+        
+        The model and its (fresh) decision cache are swapped by reference:
+        a tick in progress finishes on the old model, the next one uses the
+        new one. The new model must take the same features.
+        """
+        if not self.use_ml:
+            raise ValueError("No model loaded; nothing to swap")
+        if list(brain.feature_names) != list(self.brain.feature_names):
+            raise ValueError("New model takes different features")
+        brain.stages = self.stages
+        self.decisions = DecisionCache(brain, healthy_errors=self.error_threshold)
+        self.brain = brain
     
     def check_health(self):
         """Same as before - check patient health"""
         try:
-            response = requests.get(f"{self.patient_url}/health", timeout=5)
-            health_data = response.json()
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"\n[{timestamp}] Health Check:")
-            print(f"  Status: {health_data['status']}")
-            print(f"  CPU: {health_data['cpu_usage']}%")
-            print(f"  Memory: {health_data['memory_usage']}%")
-            print(f"  Errors: {health_data['error_count']}")
-            print(f"  Uptime: {health_data['uptime']}s")
-            sys.stdout.flush()  # Force flush after each health check
+            url = f"{self.patient_url}/health"
+            with self.stages.time('probe'):
+                response = requests.get(url, headers=self.health_cache.headers(url), timeout=5)
+            with self.stages.time('parse'):
+                health_data = self.health_cache.update(url, response.status_code,
+                                                       response.headers, response.content)
             
             return health_data
         except Exception as e:
-            print(f"   ❌ Health check failed: {str(e)}")
-            sys.stdout.flush()
+            self.events.emit('probe_failed', target=self.patient_url, error=str(e))
             return None
     
     def analyze_health_ml(self, health_data):
@@ -90,32 +284,88 @@ class DoctorMonitorML:
             return None, "No health data available"
         
         # Get ML prediction
-        prediction = self.brain.predict_action({
+        with self.stages.time('features'):
+            metrics = [self._ml_metrics(health_data, self.patient_url)]
+        prediction = self.predict([self.patient_url], metrics)[0]
+        self.last_confidence[self.patient_url] = prediction['confidence']
+        return self._decision_from_prediction(prediction)
+    
+    def predict(self, names, metrics):
+        """
+        Predictions for one tick: anomaly filter, then rules/cache/model
+        
+        Targets within their healthy baseline get a 'filter' prediction
+        (no action) without reaching the classifier.
+        """
+        # One cache (and model) for the whole tick, even if a swap lands
+        decisions = self.decisions
+        if self.anomalies is None:
+            with self.stages.time('classify'):
+                return decisions.predict_batch(metrics)
+        
+        with self.stages.time('filter'):
+            mask = self.anomalies.filter_batch(names, metrics)
+        anomalous_rows = [m for m, anomalous in zip(metrics, mask) if anomalous]
+        with self.stages.time('classify'):
+            classified = iter(decisions.predict_batch(anomalous_rows))
+        predictions = [next(classified) if anomalous else self._baseline_prediction
+                       for anomalous in mask]
+        self.anomalies.learn_batch([p['recommended_action'] for p in predictions])
+        return predictions
+    
+    def _ml_metrics(self, health_data, target=None, history=None):
+        """
+        Extract the model inputs from a /health payload (+ rolling history)
+        
+        history: the target's rolling features when already computed for the
+        whole tick (analyze_fleet), else looked up for target
+        """
+        metrics = {
             'cpu_usage': health_data.get('cpu_usage', 0),
             'memory_usage': health_data.get('memory_usage', 0),
             'error_count': health_data.get('error_count', 0),
             'uptime': health_data.get('uptime', 0)
-        })
-        
+        }
+        if history is not None:
+            metrics.update(history)
+        elif self.use_history and target is not None:
+            metrics.update(self.health_history.features(target))
+        return metrics
+    
+    def record_health(self, target, health_data):
+        """Append a successful probe to the target's rolling history"""
+        if health_data and self.use_history:
+            self.health_history.add(target, self.clock(), health_data)
+    
+    def record_health_batch(self, targets, samples):
+        """Append a tick's successful probes (one per target) in one batch"""
+        if targets and self.use_history:
+            self.health_history.add_batch(targets, self.clock(), samples)
+    
+    def log_decisions(self, rows):
+        """Persist one tick of (target, health_data, action, confidence, dispatched)"""
+        if self.history_store is not None:
+            self.history_store.append_batch(self.clock(), rows)
+    
+    def _decision_from_prediction(self, prediction):
+        """Map an ML prediction to (healing_action, reason); logged with the check"""
         action = prediction['recommended_action']
         confidence = prediction['confidence']
+        source = prediction.get('source')
+        
+        if source == 'rule':
+            return None, "FAST PATH: Clearly healthy, no action needed"
+        if source == 'filter':
+            return None, "FILTER: Within healthy baseline, no action needed"
+        label = "ML PREDICTION (cached)" if source == 'cache' else "ML PREDICTION"
         
         # Map ML actions to our actions
         if action == 'restart_service':
-            msg = f"ML PREDICTION: Restart recommended (confidence: {confidence:.2%})"
-            print(msg)
-            sys.stdout.flush()
-            return 'restart_container', msg
+            return 'restart_container', f"{label}: Restart recommended (confidence: {confidence:.2%})"
         elif action == 'reset_errors':
-            msg = f"ML PREDICTION: Reset recommended (confidence: {confidence:.2%})"
-            print(msg)
-            sys.stdout.flush()
-            return 'reset_errors', msg
+            return 'reset_errors', f"{label}: Reset recommended (confidence: {confidence:.2%})"
         else:
-            msg = f"ML PREDICTION: No action needed (confidence: {confidence:.2%})"
-            print(f"✅ {msg}")
-            sys.stdout.flush()
-            return None, msg
+            return None, f"{label}: No action needed (confidence: {confidence:.2%})"
     
     def analyze_health_rules(self, health_data):
         """
@@ -142,106 +392,157 @@ class DoctorMonitorML:
         else:
             return self.analyze_health_rules(health_data)
     
+    def analyze_fleet(self, health_by_target, predictions=None):
+        """
+        Decide healing actions for a whole fleet in one tick
+        
+        health_by_target: dict mapping target -> health_data (None if the
+        probe failed). With ML enabled, all healthy probes are scored with a
+        single predict_batch call instead of one forest pass per target
+        (clearly healthy and cached inputs skip the model entirely).
+        Returns a dict mapping target -> (healing_action, reason); if a
+        predictions dict is given, it receives target -> ML prediction.
+        """
+        decisions = {}
+        scored = []
+        
+        for target, health_data in health_by_target.items():
+            if not health_data:
+                decisions[target] = (None, "No health data available")
+            elif self.use_ml:
+                scored.append((target, health_data))
+            else:
+                decisions[target] = self.analyze_health_rules(health_data)
+        
+        if scored:
+            with self.stages.time('features'):
+                if self.use_history:
+                    history = self.health_history.features_batch([target.name for target, _ in scored])
+                else:
+                    history = [None] * len(scored)
+                metrics = [self._ml_metrics(health_data, history=row)
+                           for (_, health_data), row in zip(scored, history)]
+            tick_predictions = self.predict([target.name for target, _ in scored], metrics)
+            for (target, _), prediction in zip(scored, tick_predictions):
+                self.last_confidence[target.name] = prediction['confidence']
+                decisions[target] = self._decision_from_prediction(prediction)
+                if predictions is not None:
+                    predictions[target] = prediction
+        
+        return decisions
+    
+    def plan_healing(self, decisions, predictions, fleet_size):
+        """
+        Fit a fleet tick's decisions into the healing budgets
+        
+        Returns decisions with the planner's changes applied (restarts
+        downgraded to resets or deferred; the reason says why).
+        """
+        candidates = []
+        for target, (healing_action, _) in decisions.items():
+            # Targets this shard may not heal yet are skipped at dispatch
+            if healing_action and (self.shard is None or self.shard.may_heal(target.name)):
+                prediction = predictions.get(target)
+                candidates.append((target.name, healing_action,
+                                   prediction.get('probabilities') if prediction else None))
+        if not candidates:
+            return decisions
+        
+        plan = self.planner.plan(candidates, fleet_size, self._down, self.executor)
+        if not plan:
+            return decisions
+        planned = dict(decisions)
+        for target, (healing_action, reason) in decisions.items():
+            change = plan.get(target.name)
+            if change is not None:
+                planned[target] = (change[0], f"{reason} | PLANNER: {change[1]}")
+        return planned
+    
+    def dispatch_healing(self, target, healing_action, reason, patient_url=None):
+        """
+        Hand a healing decision to the executor (returns immediately)
+        
+        target: key used for dedup/cooldown (target name or patient URL)
+        """
+        if healing_action == 'restart_container':
+            accepted, why = self.executor.submit(
+                target, healing_action, self.stages.timed('heal_restart', self.restart_container),
+                reason, patient_url)
+        elif healing_action == 'reset_errors':
+            accepted, why = self.executor.submit(
+                target, healing_action, self.stages.timed('heal_reset', self.trigger_healing),
+                reason, patient_url)
+        else:
+            return False
+        
+        if not accepted:
+            self.events.emit('heal_skipped', target=target, action=healing_action, reason=why)
+        return accepted
+    
     # Rest of the methods (trigger_healing, restart_container, monitor)
     # are the same as the original doctor_monitor.py
     
-    def trigger_healing(self, reason):
+    def _heal_raised(self, target, action, error):
+        """Executor callback: a healing action raised instead of returning"""
+        self.events.emit('heal_failed', target=target, action=action, error=str(error))
+    
+    def trigger_healing(self, reason, patient_url=None):
         """Soft healing via API"""
-        print(f"\n🔧 SOFT HEALING TRIGGERED: {reason}")
-        sys.stdout.flush()
+        target = patient_url or self.patient_url
+        self.events.emit('heal', target=target, action='reset_errors', reason=reason)
         
         try:
             response = requests.post(
-                f"{self.patient_url}/heal",
+                f"{target}/heal",
                 json={"action": "reset_errors"},
                 timeout=5
             )
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"✅ Healing successful:")
-                print(f"  Previous errors: {result['previous_error_count']}")
-                sys.stdout.flush()
+                self.events.emit('healed', target=target, action='reset_errors',
+                                 previous_errors=result['previous_error_count'])
                 return True
             else:
-                print(f"   ⚠️ Healing failed with status: {response.status_code}")
-                sys.stdout.flush()
+                self.events.emit('heal_failed', target=target, action='reset_errors',
+                                 error=f"status {response.status_code}")
                 return False
         except Exception as e:
-            print(f"   ❌ Healing request failed: {str(e)}")
-            sys.stdout.flush()
+            self.events.emit('heal_failed', target=target, action='reset_errors',
+                             error=f"request failed: {e}")
             return False
     
-    def restart_container(self, reason):
+    def restart_container(self, reason, patient_url=None):
         """
         Hard healing - restart container/pod
         
-        Detects environment and uses appropriate restart method:
-        - Kubernetes: Deletes pod (deployment recreates it)
-        - Docker: Restarts container
+        Uses the orchestrator backend (see orchestrator.py), created on first use:
+        - Kubernetes: Deletes one pod through the API (deployment recreates
+          it) - the pod serving patient_url when it is a pod IP, else one
+          running pod
+        - Docker: Restarts container through the Docker API
         """
-        print(f"\n🔴 CRITICAL HEALING: RESTARTING CONTAINER/POD")
-        print(f"   Reason: {reason}")
-        sys.stdout.flush()  # Force flush
-        
-        # Check if running in Kubernetes
-        if os.path.exists('/var/run/secrets/kubernetes.io/serviceaccount'):
-            print(f"   📦 Detected Kubernetes environment")
-            sys.stdout.flush()
+        target = patient_url or self.patient_url
+        self.events.emit('heal', target=target, action='restart_container', reason=reason)
+        
+        try:
+            with self._orchestrator_lock:
+                if self.orchestrator is None:
+                    self.orchestrator = create_backend(self.orchestrator_kind, self.container_name)
             
-            try:
-                # Get current pod name from hostname
-                pod_name = os.environ.get('HOSTNAME', 'unknown')
-                namespace = os.environ.get('NAMESPACE', 'default')
-                
-                # Use kubectl to delete a patient-app pod (deployment will recreate it)
-                result = subprocess.run(
-                    ['kubectl', 'delete', 'pod', '-l', 'app=patient-app', '--field-selector=status.phase=Running', '--timeout=10s', '-n', namespace],
-                    capture_output=True,
-                    text=True,
-                    timeout=15
-                )
-                
-                if result.returncode == 0:
-                    print(f"   ✅ Patient app pod deleted - Deployment will recreate it")
-                    sys.stdout.flush()
-                    time.sleep(3)
-                    return True
-                else:
-                    print(f"   ⚠️ kubectl failed: {result.stderr}")
-                    sys.stdout.flush()
-                    return False
-                    
-            except Exception as e:
-                print(f"   ❌ Kubernetes restart failed: {str(e)}")
-                sys.stdout.flush()
-                return False
-        else:
-            # Running in Docker (non-Kubernetes)
-            print(f"   🐳 Detected Docker environment")
-            sys.stdout.flush()
+            backend = self.orchestrator
+            start = time.perf_counter()
+            restarted = backend.restart(urlsplit(target).hostname)
+            elapsed = time.perf_counter() - start
             
-            try:
-                result = subprocess.run(
-                    ['docker', 'restart', self.container_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0:
-                    print(f"   ✅ Container restarted successfully")
-                    sys.stdout.flush()
-                    time.sleep(3)
-                    return True
-                else:
-                    print(f"   ⚠️ Docker restart failed: {result.stderr}")
-                    sys.stdout.flush()
-                    return False
-            except Exception as e:
-                print(f"   ❌ Docker restart failed: {str(e)}")
-                sys.stdout.flush()
-                return False
+            self.events.emit('healed', target=target, action='restart_container',
+                             backend=backend.name, restarted=restarted,
+                             ms=round(elapsed * 1000))
+            return True
+        except Exception as e:
+            self.events.emit('heal_failed', target=target, action='restart_container',
+                             error=f"restart failed: {e}")
+            return False
     
     def monitor(self):
         """Main monitoring loop"""
@@ -258,29 +559,437 @@ class DoctorMonitorML:
         
         print("\n" + "="*50)
         
+        scheduler = self._new_scheduler()
+        scheduler.add(self.patient_url)
+        
+        if self.metrics_port:
+            from monitor_server import serve_in_thread
+            serve_in_thread(host=self.metrics_host, port=self.metrics_port,
+                            metrics=self.stages, profiler=self.profiler)
+            print(f"⏱️  Stage metrics on {self.metrics_host}:{self.metrics_port}/metrics")
+        
         while True:
             try:
+                scheduler.pop_due()
+                tick_start = time.perf_counter()
                 health_data = self.check_health()
-                healing_action, reason = self.analyze_health(health_data)
+                self.record_health(self.patient_url, health_data)
+                with self.stages.time('decide'):
+                    healing_action, reason = self.analyze_health(health_data)
                 
-                if healing_action == 'restart_container':
-                    self.restart_container(reason)
-                elif healing_action == 'reset_errors':
-                    self.trigger_healing(reason)
-                else:
-                    print(f"✅ {reason}")
+                dispatched = False
+                if healing_action:
+                    with self.stages.time('dispatch'):
+                        dispatched = self.dispatch_healing(self.patient_url, healing_action, reason)
+                if health_data:
+                    with self.stages.time('output'):
+                        self._emit_health('check', self.patient_url, health_data, healing_action,
+                                          reason, dispatched)
+                with self.stages.time('history'):
+                    self.log_decisions([(self.patient_url, health_data, healing_action,
+                                         self.last_confidence.get(self.patient_url), dispatched)])
+                self._end_tick(tick_start)
                 
-                time.sleep(self.check_interval)
+                interval = scheduler.report(self.patient_url, health_data, healing_action,
+                                            self.last_confidence.get(self.patient_url))
+                time.sleep(interval)
                 
             except KeyboardInterrupt:
                 print("\n\n👋 Doctor Monitor shutting down...")
+                self.executor.shutdown(wait=False)
+                if self.history_store is not None:
+                    self.history_store.close()
                 break
+    
+    def _end_tick(self, tick_start):
+        """Record the tick; log the stage summary when due"""
+        self.stages.observe('tick', time.perf_counter() - tick_start)
+        
+        now = time.monotonic()
+        if now - self._last_stage_summary >= self.stage_summary_interval:
+            self._last_stage_summary = now
+            summary = self.stages.summary(window=True)
+            if summary:
+                self.events.emit('stages', window_s=self.stage_summary_interval,
+                                 ticks=summary['tick']['count'], stages=summary)
+    
+    def _emit_health(self, event, target, health_data, healing_action, reason, dispatched):
+        """One record per target per tick: health, decision, whether it was dispatched"""
+        self.events.emit(event, target=target,
+                         status=health_data.get('status'),
+                         cpu_usage=health_data.get('cpu_usage'),
+                         memory_usage=health_data.get('memory_usage'),
+                         error_count=health_data.get('error_count'),
+                         uptime=health_data.get('uptime'),
+                         action=healing_action,
+                         confidence=self.last_confidence.get(target),
+                         reason=reason,
+                         dispatched=dispatched)
+    
+    def _new_scheduler(self):
+        if not self.adaptive:
+            interval = self.check_interval
+            return ProbeScheduler(base_interval=interval, min_interval=interval,
+                                  max_interval=interval, backoff=1.0)
+        return ProbeScheduler(base_interval=self.check_interval,
+                              min_interval=self.min_probe_interval,
+                              max_interval=self.max_probe_interval)
+    
+    def monitor_fleet(self, targets=None):
+        """
+        Fleet monitoring loop - polls every patient-app replica concurrently
+        
+        targets: optional list of base URLs. If omitted, replicas are
+        discovered by resolving the host of patient_url (headless service).
+        """
+        print("🩺 Doctor Monitor Starting (fleet mode)...")
+        print(f"👀 Discovering patient apps via: {targets or self.patient_url}")
+        print(f"⚡ Max concurrent probes: {self.max_concurrency}, "
+              f"probe timeout: {self.probe_timeout}s")
+        print("\n" + "="*50)
+        sys.stdout.flush()
+        
+        try:
+            asyncio.run(self._monitor_fleet(targets))
+        except KeyboardInterrupt:
+            print("\n\n👋 Doctor Monitor shutting down...")
+            self.executor.shutdown(wait=False)
+            if self.history_store is not None:
+                self.history_store.close()
+    
+    async def _monitor_fleet(self, static_targets):
+        from fleet_poller import FleetPoller, discover_targets
+        
+        discovered = targets = []
+        last_discovery = None
+        scheduler = self._new_scheduler()
+        wake = asyncio.Event()
+        
+        def on_notify(name, remote_addr):
+            """Push from a patient app: probe the matching target right away"""
+            for target in targets:
+                if name in (target.name, target.url) or (
+                        name is None and urlsplit(target.url).hostname == remote_addr):
+                    scheduler.notify(target)
+                    wake.set()
+                    return True
+            return False
+        
+        runners = []
+        if self.notify_port or self.metrics_port:
+            from monitor_server import start_monitor_server
+        if self.notify_port:
+            # Pods push from anywhere in the cluster; only /notify is served here
+            runners.append(await start_monitor_server(on_notify, host='0.0.0.0',
+                                                      port=self.notify_port))
+            print(f"📨 Accepting push notifications on :{self.notify_port}/notify")
+        if self.metrics_port:
+            runners.append(await start_monitor_server(host=self.metrics_host, port=self.metrics_port,
+                                                      metrics=self.stages, profiler=self.profiler))
+            print(f"⏱️  Stage metrics on {self.metrics_host}:{self.metrics_port}/metrics")
+        
+        try:
+            async with FleetPoller(self.max_concurrency, self.probe_timeout) as poller:
+                while True:
+                    tick_start = time.monotonic()
+                    
+                    reassign = False
+                    if last_discovery is None or tick_start - last_discovery >= self.discovery_interval:
+                        discovered = await discover_targets(self.patient_url, static_targets)
+                        last_discovery = tick_start
+                        reassign = True
+                    if self.shard is not None and self.shard.refresh_due() and await self.shard.refresh():
+                        print(f"🧩 Shard {self.shard.member_id}: {self.shard.stats['members']} workers")
+                        reassign = True
+                    
+                    if reassign:
+                        targets = discovered if self.shard is None else self.shard.assign(discovered)
+                        for target in scheduler.sync(targets):
+                            self.health_history.forget(target.name)
+                            if self.anomalies is not None:
+                                self.anomalies.forget(target.name)
+                            self.executor.forget(target.name)
+                            poller.health_cache.forget(f"{target.url}/health")
+                            self.last_confidence.pop(target.name, None)
+                            self._down.discard(target.name)
+                    
+                    due = scheduler.pop_due()
+                    if due:
+                        await self._probe_fleet(poller, scheduler, due, len(targets), tick_start)
+                    
+                    # Sleep until the next probe or discovery is due, or a
+                    # push notification arrives
+                    delay = scheduler.delay()
+                    until_discovery = last_discovery + self.discovery_interval - time.monotonic()
+                    if self.shard is not None:
+                        until_discovery = min(until_discovery, self.shard.last_refresh +
+                                              self.shard.refresh_interval - time.monotonic())
+                    timeout = max(0, min(until_discovery, delay if delay is not None else until_discovery))
+                    wake.clear()
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+            if self.shard is not None:
+                self.shard.leave()
+    
+    async def _probe_fleet(self, poller, scheduler, due, n_targets, tick_start):
+        """Probe the due targets, decide, dispatch healing, reschedule"""
+        stages = self.stages
+        start = time.perf_counter()
+        parse_before = poller.parse_seconds
+        results = await poller.poll_once(due)
+        # Parsing happens inside the probes; reported on its own
+        probe_time = time.perf_counter() - start
+        parse_time = poller.parse_seconds - parse_before
+        stages.observe('probe', probe_time - parse_time)
+        stages.observe('parse', parse_time)
+        poll_time = time.monotonic() - tick_start
+        
+        self.events.emit('tick', due=len(due), targets=n_targets, poll_ms=round(poll_time * 1000))
+        
+        health_by_target = {}
+        with stages.time('record'):
+            recorded, samples = [], []
+            for target, (health_data, _) in results.items():
+                health_by_target[target] = health_data
+                if health_data is None:
+                    self._down.add(target.name)
+                else:
+                    self._down.discard(target.name)
+                    recorded.append(target.name)
+                    samples.append(health_data)
+                    if health_data.get('status', 'healthy') == 'healthy':
+                        # A restarted pod that is back frees its restart slot
+                        self.executor.recovered(target.name, tick_start)
+            self.record_health_batch(recorded, samples)
+        
+        predictions = {}
+        with stages.time('decide'):
+            decisions = self.analyze_fleet(health_by_target, predictions)
+        planned = decisions
+        if self.planner is not None:
+            with stages.time('plan'):
+                planned = self.plan_healing(decisions, predictions, n_targets)
+        dispatch_start = time.perf_counter()
+        log, dispatched_actions = [], []
+        for target, (healing_action, reason) in planned.items():
+            dispatched = False
+            if healing_action and self.shard is not None and not self.shard.may_heal(target.name):
+                self.events.emit('heal_skipped', target=target.name, action=healing_action,
+                                 reason="shard ownership settling")
+            elif healing_action:
+                dispatched = self.dispatch_healing(target.name, healing_action,
+                                                   f"[{target.name}] {reason}", target.url)
+            confidence = self.last_confidence.get(target.name)
+            decided = decisions[target][0]
+            # A deferred heal still marks the target as degrading (probed often)
+            scheduler.report(target, health_by_target[target], decided, confidence)
+            # History keeps the classifier's decision as the training label;
+            # the planner's change shows as not dispatched
+            log.append((target.name, health_by_target[target], decided, confidence,
+                        dispatched and healing_action == decided))
+            dispatched_actions.append(dispatched)
+        stages.observe('dispatch', time.perf_counter() - dispatch_start)
+        
+        with stages.time('output'):
+            for (target, (healing_action, reason)), dispatched in zip(planned.items(),
+                                                                      dispatched_actions):
+                health_data = health_by_target[target]
+                if health_data is None:
+                    self.events.emit('probe_failed', target=target.name, error=results[target][1])
+                else:
+                    self._emit_health('health', target.name, health_data, healing_action,
+                                      reason, dispatched)
+        with stages.time('history'):
+            self.log_decisions(log)
+        self._end_tick(start)
+
+def run_monitor(args, shard=None):
+    """Build the monitor from parsed CLI arguments and run it"""
+    # Everything printed from here on is queued and written in batches too
+    events = EventLog(sys.stdout, fmt=args.log_format, text_formats=TEXT_FORMATS)
+    sys.stdout = events
+    try:
+        monitor = DoctorMonitorML(args.patient_url, args.container_name,
+                                  max_concurrency=args.max_concurrency,
+                                  probe_timeout=args.probe_timeout,
+                                  model_path=args.model,
+                                  restart_budget=args.restart_budget,
+                                  restart_budget_window=args.restart_window,
+                                  orchestrator=args.orchestrator,
+                                  adaptive=not args.fixed_interval,
+                                  notify_port=args.notify_port,
+                                  history_dir=args.history_dir,
+                                  anomaly_filter={'on': True, 'off': False}.get(args.anomaly_filter, 'auto'),
+                                  shard=shard,
+                                  metrics_port=args.metrics_port,
+                                  metrics_host=args.metrics_host,
+                                  events=events,
+                                  planner=None if args.no_planner else HealingPlanner(
+                                      max_concurrent_restarts=args.max_concurrent_restarts,
+                                      min_healthy=args.min_healthy,
+                                      max_resets=args.max_resets))
+        if args.retrain_interval:
+            from model_updater import ModelUpdater
+            ModelUpdater(monitor, args.history_dir, args.model_dir,
+                         interval=args.retrain_interval).start()
+        if args.fleet or args.targets or shard is not None:
+            targets = args.targets.split(',') if args.targets else None
+            monitor.monitor_fleet(targets)
+        else:
+            monitor.monitor()
+    finally:
+        events.close()
+
+
+def run_shard_worker(args, index, shard_dir):
+    """One local shard worker process (--shards)"""
+    from sharding import FileMembership, Shard
+    
+    member_id = f"shard-{index}"
+    # The restart budget and concurrent restarts are fleet-wide: each worker
+    # gets an equal share, the first `total % shards` workers one more, so
+    # the shares add up to the total (min_healthy applies to each worker's
+    # share of the targets)
+    def share(total):
+        return total // args.shards + (index < total % args.shards)
+    args.restart_budget = share(args.restart_budget)
+    args.max_concurrent_restarts = share(args.max_concurrent_restarts)
+    # One metrics endpoint per worker: --metrics-port, +1, +2, ...
+    if args.metrics_port:
+        args.metrics_port += index
+    if args.history_dir:
+        args.history_dir = os.path.join(args.history_dir, member_id)
+    run_monitor(args, Shard(FileMembership(shard_dir, member_id), member_id))
+
+
+def run_local_shards(args):
+    """Run --shards worker processes on this node and wait for them"""
+    import multiprocessing
+    import signal
+    import tempfile
+    
+    shard_dir = args.shard_dir or tempfile.mkdtemp(prefix='monitor-shards-')
+    if min(args.restart_budget, args.max_concurrent_restarts) < args.shards:
+        print(f"⚠️  Restart limits smaller than --shards {args.shards}: "
+              f"some workers cannot restart pods")
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=run_shard_worker, name=f"shard-{index}",
+                        args=(args, index, shard_dir))
+        for index in range(args.shards)
+    ]
+    print(f"🧩 Starting {args.shards} shard workers (membership: {shard_dir})")
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl-C in a terminal reaches the workers too; otherwise pass it on
+        time.sleep(1)
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGINT)
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+
 
 if __name__ == '__main__':
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="ML-based self-healing monitor")
+    parser.add_argument('patient_url', nargs='?', default="http://localhost:5000")
+    parser.add_argument('container_name', nargs='?', default="patient-app")
+    parser.add_argument('--fleet', action='store_true',
+                        help="Poll all patient-app replicas concurrently (asyncio)")
+    parser.add_argument('--targets', default=os.environ.get('PATIENT_TARGETS'),
+                        help="Comma-separated base URLs for fleet mode (default: DNS discovery)")
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help="Max probes in flight at once in fleet mode")
+    parser.add_argument('--probe-timeout', type=float, default=5.0,
+                        help="Per-target probe deadline in seconds (fleet mode)")
+    parser.add_argument('--model', default='healing_brain_forest',
+                        help="Exported forest directory (falls back to healing_brain.pkl)")
+    parser.add_argument('--restart-budget', type=int, default=3,
+                        help="Max pod/container restarts per --restart-window across all targets")
+    parser.add_argument('--restart-window', type=float, default=300.0,
+                        help="Restart budget window in seconds")
+    parser.add_argument('--max-concurrent-restarts', type=int,
+                        default=int(os.environ.get('MONITOR_MAX_CONCURRENT_RESTARTS', 2)),
+                        help="Fleet mode: max restarts in progress at once (healing_planner.py)")
+    parser.add_argument('--min-healthy', type=float,
+                        default=float(os.environ.get('MONITOR_MIN_HEALTHY', 0.5)),
+                        help="Fleet mode: replicas that must stay up while restarting "
+                             "(a count, or a fraction of the fleet if below 1)")
+    parser.add_argument('--max-resets', type=int,
+                        help="Fleet mode: max soft heals per tick (default: no limit)")
+    parser.add_argument('--no-planner', action='store_true',
+                        help="Fleet mode: dispatch every decision on its own, without the planner")
+    parser.add_argument('--orchestrator', default='auto',
+                        choices=['auto', 'kubernetes', 'docker', 'fake'],
+                        help="Restart backend (auto: Kubernetes API in-cluster, else Docker API)")
+    parser.add_argument('--fixed-interval', action='store_true',
+                        help="Probe every target every 5s instead of adapting the interval")
+    parser.add_argument('--notify-port', type=int,
+                        default=int(os.environ.get('MONITOR_NOTIFY_PORT', 0)) or None,
+                        help="Accept push notifications from patient apps on this port (fleet mode)")
+    parser.add_argument('--metrics-port', type=int,
+                        default=int(os.environ.get('MONITOR_METRICS_PORT', 0)) or None,
+                        help="Serve per-stage latency metrics and the profiler toggle on this port "
+                             "(/metrics, /profile)")
+    parser.add_argument('--metrics-host', default=os.environ.get('MONITOR_METRICS_HOST', '127.0.0.1'),
+                        help="Address --metrics-port binds to (default: localhost only; the "
+                             "profiler routes are unauthenticated)")
+    parser.add_argument('--log-format', default=os.environ.get('MONITOR_LOG_FORMAT', 'text'),
+                        choices=['text', 'json'],
+                        help="Per-target records as text lines or JSON lines (event_log.py)")
+    parser.add_argument('--history-dir', default=os.environ.get('MONITOR_HISTORY_DIR'),
+                        help="Persist observations and decisions here (history_store.py)")
+    parser.add_argument('--retrain-interval', type=float,
+                        default=float(os.environ.get('MONITOR_RETRAIN_INTERVAL', 0)) or None,
+                        help="Retrain from --history-dir every N seconds and hot-swap the model")
+    parser.add_argument('--anomaly-filter', default='auto', choices=['auto', 'on', 'off'],
+                        help="Per-target baseline pre-filter ahead of the classifier "
+                             "(auto: on for models with history features)")
+    parser.add_argument('--model-dir', default='models',
+                        help="Where retrained models are kept (model_updater.py)")
+    parser.add_argument('--shards', type=int,
+                        help="Run N fleet-mode worker processes, each owning a share of the targets")
+    parser.add_argument('--shard-peers', default=os.environ.get('MONITOR_SHARD_PEERS'),
+                        help="Headless service of the monitor replicas; shard targets between them")
+    parser.add_argument('--shard-dir', default=os.environ.get('MONITOR_SHARD_DIR'),
+                        help="Shared directory for shard membership heartbeats")
+    parser.add_argument('--shard-id', default=os.environ.get('POD_IP'),
+                        help="This replica's member id (default: POD_IP, else the host name)")
+    args = parser.parse_args()
     
-    patient_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:5000"
-    container_name = sys.argv[2] if len(sys.argv) > 2 else "patient-app"
+    if args.retrain_interval and not args.history_dir:
+        parser.error("--retrain-interval needs --history-dir")
+    if args.metrics_port and args.metrics_port == args.notify_port:
+        parser.error("--metrics-port must differ from --notify-port")
+    if args.shards:
+        # Workers cannot share one notify port or retrain the same model dir
+        if args.notify_port or args.retrain_interval:
+            parser.error("--shards does not support --notify-port or --retrain-interval")
+        run_local_shards(args)
+        sys.exit(0)
+    
+    shard = None
+    if args.shard_peers or args.shard_dir:
+        import socket
+        from sharding import DnsMembership, FileMembership, Shard
+        if args.shard_peers:
+            shard_id = args.shard_id or socket.gethostbyname(socket.gethostname())
+            shard = Shard(DnsMembership(args.shard_peers), shard_id)
+        else:
+            shard_id = args.shard_id or socket.gethostname()
+            shard = Shard(FileMembership(args.shard_dir, shard_id), shard_id)
+    run_monitor(args, shard)
     
-    monitor = DoctorMonitorML(patient_url, container_name)
-    monitor.monitor()
@@ -0,0 +1,183 @@
+# Batched Structured Output for the Monitor
+#
+# The monitor used to print several lines per target per tick to a
+# line-buffered stdout and flush after most of them: one write syscall per
+# line, made on the monitoring loop. At fleet scale that dominated the tick,
+# and a slow log consumer (full pipe) stalled monitoring itself.
+#
+# EventLog replaces that with:
+#
+# - One record per target per tick: emit('health', target=..., ...). JSON
+#   lines (log pipelines) or the familiar text lines (kubectl logs, humans).
+# - Batching: records are queued by the loop and written by a background
+#   thread, one write per batch: every `flush_interval` seconds (default
+#   0.2s, so `kubectl logs -f` still looks live) or as soon as `max_batch`
+#   records are waiting.
+# - A bounded queue: if the consumer cannot keep up, new records beyond
+#   `max_pending` are dropped and counted instead of blocking the loop; a
+#   'log_dropped' record reports how many.
+# - Plain print() keeps working: the log is also a text stream, so it can
+#   replace sys.stdout. Lines written that way are queued like records (in
+#   order), and flush() does not force a write - the batching budget
+#   decides. In JSON mode they become {"event": "log", "msg": ...} records,
+#   so stdout stays valid JSON lines.
+# - A record that cannot be formatted (a failing text formatter, a value
+#   JSON cannot encode) is skipped and counted in stats['write_errors'];
+#   the writer thread keeps going.
+
+import json
+import threading
+import time
+
+FORMATS = ('text', 'json')
+
+
+class EventLog:
+    """
+    Queued, batched record and line output on a background writer
+
+    Usage:
+        events = EventLog(sys.stdout, fmt='json')
+        sys.stdout = events                        # prints go through it too
+        events.emit('health', target='10.0.0.7:5000', status='healthy')
+        events.close()                             # drain at shutdown
+
+    text_formats: event -> fn(when, fields) -> text, for fmt='text'
+    (events without one are written as 'event key=value ...').
+    """
+
+    def __init__(self, stream, fmt='text', text_formats=None, flush_interval=0.2,
+                 max_batch=1000, max_pending=100_000, clock=time.time):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown log format: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.text_formats = text_formats or {}
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.clock = clock
+
+        self._pending = []
+        self._partial = ''
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._reported_drops = 0
+        self._when = (None, '')
+        self._encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=str)
+        self.stats = {'records': 0, 'lines': 0, 'batches': 0, 'bytes': 0,
+                      'dropped': 0, 'write_errors': 0}
+
+        self._writer = threading.Thread(target=self._run, name='event-log', daemon=True)
+        self._writer.start()
+
+    def emit(self, event, **fields):
+        """Queue one structured record (never blocks on the output)"""
+        self._put((self.clock(), event, fields))
+
+    def _put(self, item):
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return
+            self._pending.append(item)
+            if len(self._pending) >= self.max_batch:
+                self._wake.set()
+
+    # Text stream interface (sys.stdout replacement)
+
+    def write(self, text):
+        with self._lock:
+            if '\n' not in text:
+                self._partial += text
+                return len(text)
+            *lines, self._partial = (self._partial + text).split('\n')
+        now = self.clock()
+        for line in lines:
+            self._put((now, None, line))
+        return len(text)
+
+    def flush(self):
+        """No-op: output is written on the batching budget (see close())"""
+
+    def isatty(self):
+        return False
+
+    # Writer
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            dropped = self.stats['dropped'] - self._reported_drops
+            self._reported_drops += dropped
+        if dropped:
+            batch.append((self.clock(), 'log_dropped', {'count': dropped}))
+        if not batch:
+            return
+
+        parts = []
+        for item in batch:
+            try:
+                parts.append(self._format(item))
+            except Exception:
+                self.stats['write_errors'] += 1
+        text = ''.join(parts)
+        if not text:
+            return
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+        except Exception:
+            # Closed or broken output: nothing left to report it to
+            self.stats['write_errors'] += 1
+            return
+        self.stats['batches'] += 1
+        self.stats['bytes'] += len(text)
+
+    def _format(self, item):
+        ts, event, fields = item
+        if event is None:
+            self.stats['lines'] += 1
+            if self.fmt == 'text':
+                return fields + '\n'
+            if not fields:
+                return ''
+            return self._json(ts, 'log', {'msg': fields})
+
+        self.stats['records'] += 1
+        if self.fmt == 'json':
+            return self._json(ts, event, fields)
+        formatter = self.text_formats.get(event)
+        if formatter is not None:
+            return formatter(self._local_time(ts), fields) + '\n'
+        return ' '.join([event] + [f"{k}={v}" for k, v in fields.items()]) + '\n'
+
+    def _json(self, ts, event, fields):
+        """{"ts": ..., "event": ..., **fields} without building the merged dict"""
+        head = f'{{"ts":{ts:.3f},"event":{self._encoder.encode(event)}'
+        if not fields:
+            return head + '}\n'
+        return head + ',' + self._encoder.encode(fields)[1:] + '\n'
+
+    def _local_time(self, ts):
+        """'%Y-%m-%d %H:%M:%S' of a timestamp (cached per second)"""
+        second = int(ts)
+        if self._when[0] != second:
+            self._when = (second, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second)))
+        return self._when[1]
+
+    def close(self):
+        """Stop the writer and write everything still queued"""
+        if self._partial:
+            self.write('\n')
+        self._stop.set()
+        self._wake.set()
+        self._writer.join()
+        self._drain()
@@ -0,0 +1,146 @@
+# Async Fleet Poller
+#
+# Polls the /health endpoint of many patient-app replicas concurrently.
+#
+# - One aiohttp session with a pooled keep-alive connector is shared by all
+#   probes, so steady-state polling does not pay a TCP handshake per probe
+# - Every probe has its own deadline, so one slow pod can only cost its own
+#   probe, never the whole tick
+# - A semaphore caps how many probes are in flight at once
+#
+# A tick therefore takes roughly as long as the slowest single probe (as long
+# as the fleet fits in the concurrency cap), instead of the sum of all probes.
+#
+# Probes are conditional (health_client.HealthCache): a target whose /health
+# has not changed answers 304 with no body, one that has answers with just
+# the changed fields.
+
+import asyncio
+import socket
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from health_client import HealthCache
+
+# name: stable identifier used in logs and for healing (host:port or pod name)
+# url:  base URL of the patient app, without the /health suffix
+Target = namedtuple('Target', ['name', 'url'])
+
+
+def target_from_url(url):
+    """Build a Target from a base URL"""
+    url = url.rstrip('/')
+    return Target(urlsplit(url).netloc, url)
+
+
+async def discover_targets(patient_url, static_targets=None):
+    """
+    Discover the set of patient-app replicas to poll
+
+    - If static_targets is given (list of base URLs), it is used as-is
+    - Otherwise the host of patient_url is resolved. A headless Kubernetes
+      service resolves to one A record per ready pod, so each address becomes
+      its own target. A regular service or a plain host gives one target.
+    """
+    if static_targets:
+        return [target_from_url(url) for url in static_targets]
+
+    parts = urlsplit(patient_url.rstrip('/'))
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+
+    try:
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(
+            parts.hostname, port, family=socket.AF_INET, type=socket.SOCK_STREAM
+        )
+    except OSError:
+        return [target_from_url(patient_url)]
+
+    addresses = sorted({info[4][0] for info in infos})
+    if len(addresses) <= 1:
+        return [target_from_url(patient_url)]
+
+    return [
+        target_from_url(f"{parts.scheme}://{address}:{port}")
+        for address in addresses
+    ]
+
+
+class FleetPoller:
+    """
+    Concurrent /health poller for a fleet of targets
+
+    Usage:
+        async with FleetPoller(max_concurrency=64, timeout=2) as poller:
+            results = await poller.poll_once(targets)
+    """
+
+    def __init__(self, max_concurrency=64, timeout=5.0, connect_timeout=2.0,
+                 keepalive_timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout, sock_connect=connect_timeout
+        )
+        self.keepalive_timeout = keepalive_timeout
+        self.health_cache = HealthCache()
+        # Time spent turning responses into health dicts (all probes so far)
+        self.parse_seconds = 0.0
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=60,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    @property
+    def session(self):
+        """Shared keep-alive session (also usable for healing calls)"""
+        return self._session
+
+    async def probe(self, target):
+        """
+        Fetch /health for a single target
+
+        Returns (health_data, error). Exactly one of them is None.
+        The deadline starts once the probe holds a concurrency slot, so time
+        spent queued behind the cap is not charged to the target.
+        """
+        cache = self.health_cache
+        async with self._semaphore:
+            try:
+                url = f"{target.url}/health"
+                async with self._session.get(url, headers=cache.headers(url)) as response:
+                    body = await response.read()
+                    start = time.perf_counter()
+                    try:
+                        return cache.update(url, response.status, response.headers, body), None
+                    finally:
+                        self.parse_seconds += time.perf_counter() - start
+            except asyncio.TimeoutError:
+                return None, "timeout"
+            except Exception as e:
+                return None, str(e) or e.__class__.__name__
+
+    async def poll_once(self, targets):
+        """
+        Probe all targets concurrently
+
+        Returns a dict mapping each target to (health_data, error).
+        """
+        results = await asyncio.gather(*(self.probe(t) for t in targets))
+        return dict(zip(targets, results))
@@ -0,0 +1,215 @@
+# Healing Action Executor
+#
+# Runs soft (POST /heal) and hard (pod/container restart) healing actions on a
+# small worker pool, so a slow heal request or orchestrator API call (a pod
+# delete over the Kubernetes REST API or a Docker SDK restart, see
+# orchestrator.py) never stalls health polling.
+#
+# Guard rails, all decided at submit time without blocking:
+# - Dedup: at most one action in flight per target; further decisions for
+#   that target are dropped until it finishes
+# - Cooldown: after a successful action the target is left alone for a while
+#   (restarted pods need time to come back; a reset needs a tick to show up)
+# - Backoff: after a failed action the next attempt for that target waits
+#   backoff_base * 2^(failures - 1), capped at backoff_max
+# - Restart budget: at most `restart_budget` hard restarts per
+#   `budget_window` seconds across the whole fleet, so a fleet-wide problem
+#   (bad deploy, broken dependency) cannot restart every replica at once
+#
+# check(), restarting() and restarts_left() expose the same state without
+# changing it, for planning a whole tick ahead of submit (healing_planner.py).
+# A restarted target counts as restarting from submit until its pod is back:
+# until recovered(target) reports a healthy probe after the restart call
+# returned, or at the latest until the restart cooldown ends.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+HARD_ACTIONS = ('restart_container',)
+
+DEFAULT_COOLDOWNS = {
+    'reset_errors': 15.0,
+    'restart_container': 60.0,
+}
+
+
+class _TargetState:
+    """Healing bookkeeping for one target"""
+
+    __slots__ = ('in_flight', 'next_allowed', 'failures')
+
+    def __init__(self):
+        self.in_flight = None
+        self.next_allowed = 0.0
+        self.failures = 0
+
+
+class HealingExecutor:
+    """
+    Non-blocking, rate-limited healing action runner
+
+    Usage:
+        executor = HealingExecutor(restart_budget=3, budget_window=300)
+        accepted, why = executor.submit('pod-a', 'reset_errors', heal_fn, url)
+
+    fn(*args) runs on a worker thread; a truthy return value counts as
+    success, a falsy one or an exception as failure. on_error(target,
+    action, error) reports an exception raised by fn (default: print).
+    """
+
+    def __init__(self, max_workers=4, cooldowns=None, backoff_base=10.0,
+                 backoff_max=300.0, restart_budget=3, budget_window=300.0,
+                 clock=time.monotonic, on_error=None):
+        self.cooldowns = {**DEFAULT_COOLDOWNS, **(cooldowns or {})}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.restart_budget = restart_budget
+        self.budget_window = budget_window
+        self.clock = clock
+        self.on_error = on_error
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='healing')
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._restarts = deque()
+        self._in_flight = 0
+        # target -> (restart call returned, stops counting as restarting);
+        # None while the call is in flight
+        self._restarting = {}
+        self.stats = {
+            'submitted': 0, 'succeeded': 0, 'failed': 0,
+            'deduplicated': 0, 'cooling_down': 0, 'budget_exhausted': 0,
+        }
+
+    def submit(self, target, action, fn, *args):
+        """
+        Schedule a healing action for a target
+
+        Returns (accepted, reason). Never blocks on the action itself.
+        """
+        with self._lock:
+            now = self.clock()
+            state = self._targets.get(target)
+            if state is None:
+                state = self._targets[target] = _TargetState()
+
+            refusal = self._refusal(state, action, now)
+            if refusal is not None:
+                stat, why = refusal
+                self.stats[stat] += 1
+                return False, why
+
+            if action in HARD_ACTIONS:
+                self._restarts.append(now)
+                self._restarting[target] = None
+
+            state.in_flight = action
+            self._in_flight += 1
+            self.stats['submitted'] += 1
+
+        self._pool.submit(self._run, target, state, action, fn, args)
+        return True, "scheduled"
+
+    def _refusal(self, state, action, now):
+        """(stats key, reason) if the action cannot start now, else None"""
+        if state.in_flight:
+            return 'deduplicated', f"{state.in_flight} already in progress"
+
+        if now < state.next_allowed:
+            return 'cooling_down', f"cooling down ({state.next_allowed - now:.0f}s left)"
+
+        if action in HARD_ACTIONS and self._restarts_left(now) <= 0:
+            return 'budget_exhausted', (f"restart budget exhausted ({self.restart_budget} "
+                                        f"per {self.budget_window:.0f}s)")
+        return None
+
+    def _restarts_left(self, now):
+        while self._restarts and now - self._restarts[0] >= self.budget_window:
+            self._restarts.popleft()
+        return self.restart_budget - len(self._restarts)
+
+    def check(self, target, action):
+        """Why submit() would refuse this action right now (None if it would not)"""
+        with self._lock:
+            state = self._targets.get(target) or _TargetState()
+            refusal = self._refusal(state, action, self.clock())
+            return refusal[1] if refusal else None
+
+    def _run(self, target, state, action, fn, args):
+        try:
+            succeeded = bool(fn(*args))
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(target, action, e)
+            else:
+                print(f"   ❌ {action} for {target} raised: {e}")
+            succeeded = False
+
+        with self._lock:
+            now = self.clock()
+            if succeeded:
+                state.failures = 0
+                state.next_allowed = now + self.cooldowns.get(action, 0.0)
+                self.stats['succeeded'] += 1
+            else:
+                state.failures += 1
+                delay = self.backoff_base * 2 ** (state.failures - 1)
+                state.next_allowed = now + min(delay, self.backoff_max)
+                self.stats['failed'] += 1
+            state.in_flight = None
+            self._in_flight -= 1
+            if action in HARD_ACTIONS:
+                if succeeded:
+                    # The replacement pod is still starting
+                    self._restarting[target] = (now, now + self.cooldowns.get(action, 0.0))
+                else:
+                    self._restarting.pop(target, None)
+
+    def in_flight(self, target):
+        """Action currently running for a target (None if idle)"""
+        state = self._targets.get(target)
+        return state.in_flight if state else None
+
+    def pending(self):
+        """Number of actions currently in flight"""
+        return self._in_flight
+
+    def restarting(self):
+        """Targets restarted and not back yet (a copy)"""
+        with self._lock:
+            now = self.clock()
+            expired = [target for target, window in self._restarting.items()
+                       if window is not None and now >= window[1]]
+            for target in expired:
+                del self._restarting[target]
+            return set(self._restarting)
+
+    def recovered(self, target, probed_at):
+        """
+        A target probed healthy (probe started at `probed_at`, executor
+        clock): a restart of it that had returned by then no longer counts
+        """
+        if target not in self._restarting:
+            return
+        with self._lock:
+            window = self._restarting.get(target)
+            if window is not None and probed_at >= window[0]:
+                del self._restarting[target]
+
+    def restarts_left(self):
+        """Restarts the budget still allows in the current window"""
+        with self._lock:
+            return self._restarts_left(self.clock())
+
+    def forget(self, target):
+        """Drop the state of a target that is no longer monitored (if idle)"""
+        with self._lock:
+            state = self._targets.get(target)
+            if state is not None and not state.in_flight:
+                del self._targets[target]
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
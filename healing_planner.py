@@ -0,0 +1,169 @@
+# Healing Planner
+#
+# Decides which of a tick's healing decisions to carry out, for the fleet as
+# a whole. Without it every decision is dispatched on its own: in a
+# correlated incident (bad deploy, failing dependency) every replica looks
+# restart-worthy in the same tick, and restarting them together turns a
+# degraded service into an outage.
+#
+# Each tick the planner gets every target the model wants to heal, with the
+# class probabilities behind the decision, and picks restart, reset or
+# nothing for each. It never does more than the model asked: a restart may
+# become a reset or wait for a later tick, a reset may wait, nothing is
+# upgraded. When the budgets allow everything, the plan is the decisions.
+#
+# Budgets, over the targets this monitor owns:
+# - max_concurrent_restarts: restarts from earlier ticks whose pods are not
+#   back yet (HealingExecutor.restarting) plus the ones planned now
+# - min_healthy: replicas that must stay up. Targets whose last probe failed
+#   and targets being restarted are down already; each planned restart takes
+#   one more. A value below 1 is a fraction of the fleet, rounded down, so a
+#   one-replica fleet can still be restarted.
+# - the executor's restart budget (restarts per window), so no slot goes to
+#   a restart that submit() would refuse; targets the executor would refuse
+#   anyway (action in flight, cooling down) get no slot either
+# - max_resets (optional): soft heals per tick
+#
+# Each action is scored as expected benefit minus cost, from the model's
+# probabilities:
+#   restart: restart_value * P(restart) - restart_cost
+#   reset:   reset_value * (P(reset) + reset_coverage * P(restart)) - reset_cost
+# (a reset also clears the error count of a target that needs a restart,
+# which buys it time until a slot frees up). With restart slots the shared
+# limit, the best plan gives the k slots to the k targets that gain most
+# from a restart over their best alternative, and the others take a reset
+# if it scores above zero: heapq.nlargest, O(n log k). If max_resets binds
+# as well, resets go to the highest reset scores (greedy).
+
+import heapq
+import math
+
+RESTART = 'restart_container'
+RESET = 'reset_errors'
+
+# Healing action -> the model's class for it (predict_batch probabilities)
+MODEL_ACTIONS = {
+    RESTART: 'restart_service',
+    RESET: 'reset_errors',
+}
+
+
+class HealingPlanner:
+    """
+    Fleet-wide healing plan under restart and availability budgets
+
+    Usage:
+        planner = HealingPlanner(max_concurrent_restarts=2, min_healthy=0.5)
+        plan = planner.plan([(name, action, probabilities), ...],
+                            fleet_size, down, executor)
+        plan     # {name: (action, note)} for the decisions it changed
+        planner.stats
+
+    probabilities: the prediction's 'probabilities' (model class -> p), or
+    None for rule-based decisions (the decided action counts as certain).
+    """
+
+    def __init__(self, max_concurrent_restarts=2, min_healthy=0.5, max_resets=None,
+                 restart_value=2.0, restart_cost=1.0, reset_value=1.0, reset_cost=0.1,
+                 reset_coverage=0.5):
+        self.max_concurrent_restarts = max_concurrent_restarts
+        self.min_healthy = min_healthy
+        self.max_resets = max_resets
+        self.restart_value = restart_value
+        self.restart_cost = restart_cost
+        self.reset_value = reset_value
+        self.reset_cost = reset_cost
+        self.reset_coverage = reset_coverage
+
+        self.stats = {
+            'ticks': 0, 'candidates': 0, 'restarts': 0, 'resets': 0,
+            'downgraded': 0, 'deferred': 0, 'blocked': 0,
+        }
+
+    def required_healthy(self, fleet_size):
+        """Replicas that must stay up in a fleet of this size"""
+        if self.min_healthy < 1:
+            return math.floor(self.min_healthy * fleet_size)
+        return int(self.min_healthy)
+
+    def restart_slots(self, fleet_size, down, executor=None):
+        """(restarts that may start this tick, the budget that limits it)"""
+        restarting = executor.restarting() if executor is not None else set()
+        slots = {
+            'max concurrent restarts': self.max_concurrent_restarts - len(restarting),
+            'min healthy replicas': (fleet_size - len(set(down) | restarting)
+                                     - self.required_healthy(fleet_size)),
+        }
+        if executor is not None:
+            slots['restart budget'] = executor.restarts_left()
+        limit = min(slots, key=slots.get)
+        return max(0, slots[limit]), limit
+
+    def utilities(self, action, probabilities):
+        """(restart score, reset score) for one candidate"""
+        if probabilities is None:
+            probabilities = {MODEL_ACTIONS[action]: 1.0}
+        p_restart = probabilities.get(MODEL_ACTIONS[RESTART], 0.0)
+        p_reset = probabilities.get(MODEL_ACTIONS[RESET], 0.0)
+        restart = self.restart_value * p_restart - self.restart_cost
+        reset = self.reset_value * (p_reset + self.reset_coverage * p_restart) - self.reset_cost
+        return restart, reset
+
+    def plan(self, candidates, fleet_size, down=(), executor=None):
+        """
+        Plan one tick
+
+        candidates: (name, action, probabilities) for every target with a
+        healing decision. down: names of targets known to be down (failed
+        probe). executor: the HealingExecutor the plan is submitted to.
+        Returns {name: (action, note)} for the decisions that change; the
+        action is RESET or None (wait for a later tick).
+        """
+        self.stats['ticks'] += 1
+        self.stats['candidates'] += len(candidates)
+
+        restarts = []
+        resets = []
+        for name, action, probabilities in candidates:
+            # Target-level refusals only (checked as a reset); the restart
+            # budget is one of the slot limits below
+            if executor is not None and executor.check(name, RESET) is not None:
+                # submit() refuses it anyway (and says why); no slot for it
+                self.stats['blocked'] += 1
+                continue
+            restart, reset = self.utilities(action, probabilities)
+            if action == RESTART:
+                restarts.append((restart - max(reset, 0.0), reset, name))
+            else:
+                resets.append((reset, name))
+
+        plan = {}
+        if restarts:
+            slots, limit = self.restart_slots(fleet_size, down, executor)
+            chosen = heapq.nlargest(slots, restarts) if slots < len(restarts) else restarts
+            self.stats['restarts'] += len(chosen)
+            if len(chosen) < len(restarts):
+                chosen = {name for _, _, name in chosen}
+                for _, reset, name in restarts:
+                    if name in chosen:
+                        continue
+                    if reset > 0:
+                        resets.append((reset, name))
+                        plan[name] = (RESET, f"restart deferred ({limit}), reset instead")
+                    else:
+                        plan[name] = (None, f"restart deferred ({limit})")
+
+        if self.max_resets is not None and len(resets) > self.max_resets:
+            kept = {name for _, name in heapq.nlargest(self.max_resets, resets)}
+            for _, name in resets:
+                if name not in kept:
+                    note = "reset deferred (max resets per tick)"
+                    if name in plan:
+                        note = plan[name][1].replace("reset instead", note)
+                    plan[name] = (None, note)
+            resets = [(reset, name) for reset, name in resets if name in kept]
+
+        self.stats['resets'] += len(resets)
+        for action, _ in plan.values():
+            self.stats['downgraded' if action else 'deferred'] += 1
+        return plan
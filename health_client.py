@@ -0,0 +1,103 @@
+# Conditional /health Client
+#
+# Client side of the patient's conditional /health (app/health_snapshot.py).
+# Remembers the last payload and ETag per target and asks only for what
+# changed:
+#
+# - If-None-Match: <last ETag>   -> 304, no body; the cached payload is
+#                                   reused with uptime advanced locally
+# - A-IM: delta                  -> 226, only the changed fields, merged
+#                                   into the cached payload
+# - Accept: application/msgpack  -> smaller, faster-to-parse body (only
+#                                   requested if msgpack is installed)
+#
+# Targets that ignore these headers (older patients, the replay stub) keep
+# answering 200 with full JSON, which is handled exactly as before.
+
+import json
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DELTA_IM = 'delta'
+MSGPACK_TYPE = 'application/msgpack'
+
+
+class HealthCache:
+    """
+    Last /health payload per target, for conditional and delta probes
+
+    Usage:
+        cache = HealthCache()
+        response = session.get(url, headers=cache.headers(url))
+        health_data = cache.update(url, response.status, response.headers, body)
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._entries = {}
+        # JSON is the server's default, so Accept is only sent for msgpack
+        self._accept = {'Accept': MSGPACK_TYPE} if msgpack else {}
+        self.stats = {'full': 0, 'not_modified': 0, 'delta': 0, 'bytes': 0}
+
+    def headers(self, key):
+        """Request headers for the next probe of this target"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return dict(self._accept)
+        return {**self._accept, 'If-None-Match': entry[0], 'A-IM': DELTA_IM}
+
+    def update(self, key, status, headers, body):
+        """
+        Health payload for a response; raises ValueError if it cannot be
+        reconstructed (304/226 against a payload this cache no longer has)
+        """
+        self.stats['bytes'] += len(body)
+        entry = self._entries.get(key)
+        now = self.clock()
+
+        if status == 304:
+            if entry is None:
+                raise ValueError("304 Not Modified without a cached /health payload")
+            etag, payload, received = entry
+            self.stats['not_modified'] += 1
+            return self._advanced(payload, now - received)
+
+        data = self._decode(headers.get('Content-Type', ''), body)
+        if status == 226:
+            # The base is the ETag this cache sent in If-None-Match. Uptime
+            # is not part of deltas: the merged payload keeps the uptime of
+            # the last full response and the time it was received, so
+            # rounding never accumulates over a chain of deltas
+            if entry is None:
+                raise ValueError("/health delta against an unknown base")
+            etag, payload, received = entry
+            data = {**payload, **data, 'uptime': payload.get('uptime', 0)}
+            self.stats['delta'] += 1
+        else:
+            received = now
+            self.stats['full'] += 1
+
+        etag = headers.get('ETag')
+        if etag:
+            self._entries[key] = (etag, data, received)
+        else:
+            self._entries.pop(key, None)
+        return self._advanced(data, now - received)
+
+    def _advanced(self, payload, elapsed):
+        if not elapsed:
+            return payload
+        return dict(payload, uptime=payload.get('uptime', 0) + int(elapsed))
+
+    def _decode(self, content_type, body):
+        if content_type.startswith(MSGPACK_TYPE):
+            return msgpack.unpackb(body)
+        return json.loads(body)
+
+    def forget(self, key):
+        """Drop a target's cached payload (removed, or its responses went bad)"""
+        self._entries.pop(key, None)
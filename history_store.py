@@ -0,0 +1,301 @@
+# Persistent Health History Store
+#
+# Append-only, columnar-friendly on-disk log of what the monitor observed and
+# decided, so models can be retrained on real fleet history instead of only
+# synthetic data.
+#
+# Layout: a directory of fixed-size segment files plus a target dictionary.
+#
+#   targets.json              {"target name": id, ...}
+#   segment-000001.bin        header + up to `segment_records` records
+#   segment-000002.bin        ...
+#
+# Segment header (64 bytes):
+#
+#   offset  type     field
+#   0       4s       magic (b'PHH1')
+#   4       uint32   record size (checked against RECORD_DTYPE on open)
+#   8       uint64   record count (written after the records themselves)
+#   16      float64  first timestamp
+#   24      float64  last timestamp
+#
+# Records are RECORD_DTYPE, fixed width (40 bytes), in append order. Files are
+# preallocated and memory-mapped; an append is a copy into the mapping plus a
+# header update, no syscall. Rotation happens when a segment is full or older
+# than `segment_seconds`; `retention_seconds` drops whole segments.
+#
+# Time index: timestamps never decrease within the store (a clock stepping
+# back is clamped to the last timestamp), so per-segment [first, last] bounds
+# pick the segments of a range and a binary search on the timestamp column
+# finds the rows. Range scans return NumPy views on the mapping (zero-copy).
+#
+# Codes:
+#   action   -1 no decision (probe failed), 0 no action, 1 reset_errors,
+#            2 restart (same numbering as the training labels)
+#   status   -1 probe failed, 0 healthy, 1 degraded
+
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b'PHH1'
+HEADER_SIZE = 64
+
+_HEADER = struct.Struct('<4sIQdd')
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('target', '<u4'),
+    ('cpu_usage', '<f4'),
+    ('memory_usage', '<f4'),
+    ('error_count', '<u4'),
+    ('uptime', '<f4'),
+    ('confidence', '<f4'),
+    ('status', 'i1'),
+    ('action', 'i1'),
+    ('dispatched', 'u1'),
+    ('_pad', 'V5'),
+])
+
+ACTION_CODES = {None: 0, 'no_action': 0, 'reset_errors': 1,
+                'restart_container': 2, 'restart_service': 2}
+STATUS_CODES = {'healthy': 0, 'degraded': 1}
+
+
+class _Segment:
+    """One mapped segment file"""
+
+    def __init__(self, path, capacity=None, writable=False):
+        self.path = path
+        if capacity is not None:
+            # New segment: preallocate and write an empty header
+            with open(path, 'wb') as f:
+                f.truncate(HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+                f.write(_HEADER.pack(MAGIC, RECORD_DTYPE.itemsize, 0, 0.0, 0.0))
+
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0,
+                                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+        magic, record_size, self.count, self.first, self.last = _HEADER.unpack_from(self.mm)
+        if magic != MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a history segment (or has another record layout)")
+        self.capacity = (len(self.mm) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        self.records = np.frombuffer(self.mm, dtype=RECORD_DTYPE,
+                                     count=self.capacity, offset=HEADER_SIZE)
+
+    def write(self, rows):
+        start = self.count
+        self.records[start:start + len(rows)] = rows
+        if not start:
+            self.first = float(rows['timestamp'][0])
+        self.last = float(rows['timestamp'][-1])
+        self.count = start + len(rows)
+        _HEADER.pack_into(self.mm, 0, MAGIC, RECORD_DTYPE.itemsize,
+                          self.count, self.first, self.last)
+
+    def rows(self, start=None, end=None):
+        """Records with start <= timestamp < end (view)"""
+        view = self.records[:self.count]
+        timestamps = view['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, 'left'))
+        hi = self.count if end is None else int(np.searchsorted(timestamps, end, 'left'))
+        view = view[lo:hi]
+        view.flags.writeable = False
+        return view
+
+
+class HistoryStore:
+    """
+    Append-only store of monitor observations and decisions
+
+    Usage:
+        store = HistoryStore('/var/lib/monitor/history')
+        store.append(time.time(), 'pod-a', health_data, 'reset_errors', 0.93, True)
+
+        reader = HistoryStore('/var/lib/monitor/history', readonly=True)
+        for chunk in reader.scan(start=time.time() - 7 * 86400):
+            chunk['cpu_usage']   # NumPy view on the mapped segment
+    """
+
+    def __init__(self, path, segment_records=1 << 20, segment_seconds=86400.0,
+                 retention_seconds=None, readonly=False):
+        self.path = path
+        self.segment_records = segment_records
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.readonly = readonly
+
+        self._lock = threading.Lock()
+        self._targets_path = os.path.join(path, 'targets.json')
+        self._active = None
+        self._segments = []
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self._load_targets()
+        self._load_segments()
+
+    # ------------------------------------------------------------------
+    # Targets
+
+    def _load_targets(self):
+        try:
+            with open(self._targets_path) as f:
+                self._target_ids = json.load(f)
+        except FileNotFoundError:
+            self._target_ids = {}
+        self._names = {i: name for name, i in self._target_ids.items()}
+
+    def _target_ids_for(self, names):
+        ids = self._target_ids
+        new = [name for name in names if name not in ids]
+        if new:
+            for name in dict.fromkeys(new):
+                ids[name] = len(ids)
+                self._names[ids[name]] = name
+            tmp = self._targets_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(ids, f)
+            os.replace(tmp, self._targets_path)
+        return [ids[name] for name in names]
+
+    def target_names(self):
+        """id -> target name (re-read, for stores written by another process)"""
+        if self.readonly:
+            self._load_targets()
+        return dict(self._names)
+
+    # ------------------------------------------------------------------
+    # Segments
+
+    def _load_segments(self):
+        paths = sorted(glob.glob(os.path.join(self.path, 'segment-*.bin')))
+        self._segments = [_Segment(path) for path in paths]
+        if not self.readonly and self._segments:
+            last = self._segments[-1]
+            if last.count < last.capacity:
+                self._segments[-1] = self._active = _Segment(last.path, writable=True)
+
+    def _rotate(self, timestamp):
+        if self._active is not None:
+            self._active.mm.flush()
+        seq = int(os.path.basename(self._segments[-1].path)[8:-4]) + 1 if self._segments else 1
+        path = os.path.join(self.path, f'segment-{seq:06d}.bin')
+        self._active = _Segment(path, capacity=self.segment_records, writable=True)
+        self._segments.append(self._active)
+
+        if self.retention_seconds is not None:
+            while len(self._segments) > 1 and \
+                    self._segments[0].last < timestamp - self.retention_seconds:
+                os.remove(self._segments.pop(0).path)
+
+    # ------------------------------------------------------------------
+    # Writing
+
+    def append(self, timestamp, target, health_data, action=None, confidence=float('nan'),
+               dispatched=False):
+        """Record one observation; health_data None = failed probe"""
+        self.append_batch(timestamp, [(target, health_data, action, confidence, dispatched)])
+
+    def append_batch(self, timestamp, rows):
+        """
+        Record one tick: rows of (target, health_data, action, confidence, dispatched)
+
+        action: the decided healing action (None = no action); dispatched:
+        whether that action was carried out as decided (False when a
+        healing planner deferred or downgraded it, or the executor refused
+        it).
+        """
+        if self.readonly:
+            raise ValueError("History store opened read-only")
+
+        with self._lock:
+            last = self._segments[-1].last if self._segments and self._segments[-1].count else None
+            if last is not None and timestamp < last:
+                timestamp = last
+
+            # Column by column; per-field assignment on single records is
+            # several times slower for a fleet-sized tick
+            records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+            records['timestamp'] = timestamp
+            records['target'] = self._target_ids_for([row[0] for row in rows])
+            records['confidence'] = [np.nan if row[3] is None else row[3] for row in rows]
+            records['dispatched'] = [bool(row[4]) for row in rows]
+
+            probed = [i for i, row in enumerate(rows) if row[1]]
+            healths = [rows[i][1] for i in probed]
+            for name in ('cpu_usage', 'memory_usage', 'error_count', 'uptime'):
+                records[name][probed] = [health.get(name, 0) for health in healths]
+            records['status'] = -1
+            records['action'] = -1
+            records['status'][probed] = [STATUS_CODES.get(health.get('status'), 1)
+                                         for health in healths]
+            records['action'][probed] = [ACTION_CODES.get(rows[i][2], 0) for i in probed]
+
+            written = 0
+            while written < len(records):
+                active = self._active
+                if (active is None or active.count == active.capacity or
+                        (active.count and timestamp - active.first >= self.segment_seconds)):
+                    self._rotate(timestamp)
+                    active = self._active
+                n = min(len(records) - written, active.capacity - active.count)
+                active.write(records[written:written + n])
+                written += n
+
+    def flush(self):
+        """Flush the active segment to disk (the OS does so eventually anyway)"""
+        with self._lock:
+            if self._active is not None:
+                self._active.mm.flush()
+
+    def close(self):
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Reading
+
+    def refresh(self):
+        """Pick up segments and appends made by another process (readers)"""
+        with self._lock:
+            self._load_targets()
+            self._load_segments()
+
+    def scan(self, start=None, end=None):
+        """
+        Records with start <= timestamp < end, one read-only view per segment
+
+        Views stay valid while the store (or the view) is alive.
+        """
+        for segment in list(self._segments):
+            if self.readonly:
+                # Header may have moved on since the segment was opened
+                segment.count, segment.first, segment.last = \
+                    _HEADER.unpack_from(segment.mm)[2:]
+            if not segment.count:
+                continue
+            if start is not None and segment.last < start:
+                continue
+            if end is not None and segment.first >= end:
+                continue
+            rows = segment.rows(start, end)
+            if len(rows):
+                yield rows
+
+    def read(self, start=None, end=None, targets=None):
+        """Records of a time range (and optional target names) in one array (copy)"""
+        chunks = list(self.scan(start, end))
+        records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE)
+        if targets is not None:
+            ids = [self._target_ids[name] for name in targets if name in self._target_ids]
+            records = records[np.isin(records['target'], ids)]
+        return records
+
+    def __len__(self):
+        return sum(segment.count for segment in self._segments)
@@ -0,0 +1,128 @@
+# Inference-Only Healing Brain
+#
+# Loads the forest exported by train_brain.py (HealingBrain.export_compiled)
+# and predicts healing actions with NumPy only - no pandas, no sklearn.
+#
+# The arrays are memory-mapped read-only, so loading is near-instant and
+# several monitor processes on the same node share the model pages through
+# the page cache instead of each holding a private unpickled copy.
+#
+# HealingBrain (train_brain.py) extends this class with training and the
+# sklearn model; the monitor only needs this module at runtime.
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from compiled_forest import CompiledForest
+from metrics_history import feature_names as history_feature_names, windows_for
+
+
+class InferenceBrain:
+    """
+    Predicts healing actions from an exported (compiled) forest
+    """
+
+    action_names = ['no_action', 'reset_errors', 'restart_service']
+
+    def __init__(self, history_windows=()):
+        """
+        history_windows: optional rolling windows (in seconds) from
+        metrics_history.MetricsHistory. When set, the model also uses the
+        rolling mean/max/slope/EWMA features of each health metric.
+        """
+        self.compiled = None
+        # Optional StageMetrics (monitor_metrics.py): times building the
+        # feature matrix ('matrix') and the forest pass ('forest')
+        self.stages = None
+        self.history_windows = tuple(sorted(history_windows))
+        self.feature_names = [
+            'cpu_usage',
+            'memory_usage',
+            'error_count',
+            'uptime',
+            'hour_of_day'
+        ] + history_feature_names(self.history_windows)
+
+    def load_model(self, path='healing_brain_forest'):
+        """Memory-map an exported forest directory"""
+        self.compiled = CompiledForest.load(path, mmap_mode='r')
+        if self.compiled.feature_names:
+            self.feature_names = list(self.compiled.feature_names)
+            self.history_windows = windows_for(self.feature_names)
+        print(f"\n📂 Compiled model loaded from: {path}")
+
+    def predict_action(self, metrics):
+        """Predict healing action based on metrics"""
+        return self.predict_batch([metrics])[0]
+
+    def feature_matrix(self, metrics):
+        """
+        Build an (N, n_features) float array for inference
+
+        metrics: list of metric dicts, or a NumPy array with one row per
+        target. Arrays may omit the hour_of_day column, in which case the
+        current hour is filled in (same as for dicts).
+        """
+        hour = datetime.now().hour
+
+        if isinstance(metrics, np.ndarray):
+            X = np.asarray(metrics, dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            if X.shape[1] == len(self.feature_names) - 1:
+                X = np.insert(X, self.feature_names.index('hour_of_day'), hour, axis=1)
+            return X
+
+        defaults = {'hour_of_day': hour}
+        return np.array([
+            [m.get(name, defaults.get(name, 0)) for name in self.feature_names]
+            for m in metrics
+        ], dtype=np.float64)
+
+    def predict_proba_batch(self, metrics):
+        """Class probabilities for N targets in a single forest pass"""
+        if self.compiled is None:
+            raise ValueError("Model not trained yet!")
+
+        if self.stages is None:
+            X = self.feature_matrix(metrics)
+            return self._forest_proba(X)
+
+        start = time.perf_counter()
+        X = self.feature_matrix(metrics)
+        built = time.perf_counter()
+        probabilities = self._forest_proba(X)
+        self.stages.observe('matrix', built - start)
+        self.stages.observe('forest', time.perf_counter() - built)
+        return probabilities
+
+    def _forest_proba(self, X):
+        if len(X) == 1:
+            return self.compiled.predict_proba_one(X[0]).reshape(1, -1)
+        return self.compiled.predict_proba(X)
+
+    def predict_batch(self, metrics):
+        """
+        Predict healing actions for N targets at once
+
+        Runs one predict_proba pass and derives the actions from it (argmax),
+        instead of separate predict + predict_proba passes per target.
+        Returns one dict per row, in the same format as predict_action.
+        """
+        probabilities = self.predict_proba_batch(metrics)
+        classes = self.compiled.classes.tolist()
+        best = probabilities.argmax(axis=1)
+
+        predictions = []
+        for row, index in zip(probabilities.tolist(), best.tolist()):
+            predictions.append({
+                'recommended_action': self.action_names[classes[index]],
+                'confidence': row[index],
+                'probabilities': {
+                    self.action_names[cls]: prob
+                    for cls, prob in zip(classes, row)
+                }
+            })
+        return predictions
@@ -0,0 +1,511 @@
+# Load and Fault-Injection Suite for the Patient App
+#
+# Measures the whole system, not one component: the real patient app
+# (app/app.py under the Flask dev server or gunicorn, app/asgi_app.py under
+# uvicorn), driven at a fixed request rate while faults are injected, with
+# the real monitor (DoctorMonitorML, single-target mode) watching and
+# healing it.
+#
+# - PatientServer: starts app/app.py as a subprocess on a free port, with a
+#   fresh error counter (SHARED_STATE_PATH) per start, and restarts it on
+#   demand (stop, start, wait for /healthz) like a pod being replaced.
+# - Load: open loop at `rate` requests/s over a traffic mix of endpoints.
+#   Latency is measured from the time a request was scheduled, so a stalled
+#   server shows up as latency instead of silently lowering the rate.
+# - Faults: bursts of GET /simulate-error at the fault mix's interval (after
+#   a warmup): 'soft' calls for an error reset, 'hard' for a restart; the
+#   'data' mix relies on /data's own 20% failure rate instead.
+# - Monitor: a child process running DoctorMonitorML.monitor() against the
+#   app, logging JSON records (event_log.py) to a file. Restarts go through
+#   ReplayOrchestrator to the suite's control endpoint, which restarts the
+#   app process for real.
+# - A sampler reads the app's /health every `sample_interval` seconds: the
+#   error count the monitor is supposed to bring down.
+#
+# Per incident (one burst): time-to-detect is injection -> first monitor
+# check with a healing action; time-to-heal is injection -> first sample
+# with the error count back under the soft threshold (5). Healing overhead:
+# latency inside incidents vs outside, requests failed while the app was
+# restarting, restart downtime, and the monitor's CPU time.
+#
+# Usage: see benchmarks/bench_system_load.py
+
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(ROOT, 'app')
+
+SERVERS = ('flask', 'gunicorn', 'uvicorn')
+
+# Error counts the monitor acts on (see the rule-based thresholds in
+# doctor_monitor_ml.py): above SOFT a reset is due, at CRITICAL a restart
+SOFT_THRESHOLD = 5
+CRITICAL_THRESHOLD = 10
+
+# traffic: path -> share of the load; burst: errors injected per incident,
+# every `interval` seconds (past the monitor's healing cooldown for the
+# action the burst calls for, see healing_executor.DEFAULT_COOLDOWNS)
+FAULT_MIXES = {
+    'none': {'traffic': {'/': 0.8, '/healthz': 0.2}, 'burst': 0, 'interval': None},
+    'soft': {'traffic': {'/': 0.8, '/healthz': 0.2}, 'burst': 7, 'interval': 20.0},
+    'hard': {'traffic': {'/': 0.8, '/healthz': 0.2}, 'burst': 15, 'interval': 75.0},
+    'data': {'traffic': {'/data': 0.7, '/': 0.2, '/healthz': 0.1}, 'burst': 0, 'interval': None},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _distribution(values, scale=1.0):
+    """p50/p90/p99/max of values (times scale), None when empty"""
+    if not values:
+        return None
+    return {'p50': _percentile(values, 0.50) * scale,
+            'p90': _percentile(values, 0.90) * scale,
+            'p99': _percentile(values, 0.99) * scale,
+            'max': max(values) * scale}
+
+
+def _cpu_seconds(pid):
+    """utime + stime of a live process (0.0 when unavailable)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# ----------------------------------------------------------------------
+# Patient app
+# ----------------------------------------------------------------------
+
+class PatientServer:
+    """
+    The patient app in a subprocess: app.py under the Flask dev server or
+    gunicorn, or asgi_app.py under uvicorn
+
+    Usage:
+        server = PatientServer('gunicorn', workers=2)
+        server.start()
+        server.url                   # http://127.0.0.1:<port>
+        server.restart()             # fresh process, error count 0
+        server.stop()
+
+    threads: gunicorn threads per worker (>1 selects the gthread worker)
+    env: extra environment for the app (e.g. {'DATA_DELAY': '0.02'})
+    """
+
+    def __init__(self, kind='gunicorn', workers=2, port=None, state_dir=None, threads=1,
+                 env=None):
+        if kind not in SERVERS:
+            raise ValueError(f"Unknown server: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.threads = threads
+        self.env = env or {}
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.state_dir = state_dir or tempfile.mkdtemp(prefix='patient-app-')
+        self.process = None
+        self.generation = 0
+        self.downtime = []
+
+    def _command(self):
+        if self.kind == 'flask':
+            return [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+                    '--host', '127.0.0.1', '--port', str(self.port), '--no-reload']
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{self.port}',
+                   '--workers', str(self.workers), '--timeout', '60']
+        if self.kind == 'uvicorn':
+            # uvicorn workers under gunicorn, as asgi_app.py recommends
+            return command + ['--worker-class', 'uvicorn.workers.UvicornWorker', 'asgi_app:app']
+        return command + ['--threads', str(self.threads), 'app:app']
+
+    def start(self, timeout=30.0):
+        self.generation += 1
+        env = dict(os.environ, **self.env,
+                   SHARED_STATE_PATH=os.path.join(self.state_dir, f'state-{self.generation}.bin'),
+                   METRICS_DIR=os.path.join(self.state_dir, f'metrics-{self.generation}'))
+        # Own session: stop() signals the server and all of its workers
+        self.process = subprocess.Popen(self._command(), cwd=APP_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        start_new_session=True)
+        self.wait_ready(timeout)
+
+    def wait_ready(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.kind} exited with {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"{self.url}/healthz", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError(f"{self.kind} not ready after {timeout}s")
+
+    def stop(self, timeout=10.0):
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        except ProcessLookupError:
+            pass
+        self.process = None
+
+    def restart(self):
+        """Replace the process (the monitor's hard healing); returns downtime in seconds"""
+        start = time.monotonic()
+        self.stop()
+        self.start()
+        self.downtime.append(time.monotonic() - start)
+        return self.downtime[-1]
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+# Monitor side
+# ----------------------------------------------------------------------
+
+def run_monitor_child(patient_url, control_url, log_path, check_interval, adaptive):
+    """Monitor process entry point: DoctorMonitorML.monitor() until SIGINT"""
+    from doctor_monitor_ml import DoctorMonitorML
+    from event_log import EventLog
+    from replay import ReplayOrchestrator
+
+    events = EventLog(open(log_path, 'w'), fmt='json')
+    sys.stdout = events
+    try:
+        monitor = DoctorMonitorML(patient_url,
+                                  model_path=os.path.join(APP_DIR, 'healing_brain_forest'),
+                                  fallback_model_path=os.path.join(APP_DIR, 'healing_brain.pkl'),
+                                  orchestrator=ReplayOrchestrator(control_url),
+                                  adaptive=adaptive, events=events)
+        if check_interval:
+            monitor.check_interval = check_interval
+            monitor.min_probe_interval = min(monitor.min_probe_interval, check_interval)
+            monitor.max_probe_interval = check_interval
+        monitor.monitor()
+    finally:
+        events.close()
+
+
+def read_monitor_log(path):
+    """The monitor's JSON records (partial last line ignored)"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+# ----------------------------------------------------------------------
+# Load, faults and sampling
+# ----------------------------------------------------------------------
+
+class LoadRun:
+    """What one run observed, filled in by the coroutines below"""
+
+    def __init__(self):
+        self.requests = []      # (sent_wall, path, status or None, latency_s)
+        self.injections = []    # wall time each burst completed
+        self.samples = []       # (wall, error_count or None while down)
+        self.restarts = []      # (wall, error_count at the time, downtime_s)
+
+
+async def _request(session, url, path, scheduled, loop, run):
+    sent = time.time()
+    status = None
+    try:
+        async with session.get(url + path) as response:
+            await response.read()
+            status = response.status
+    except Exception:
+        # Refused while restarting, reset, timed out: counted as failed
+        pass
+    run.requests.append((sent, path, status, loop.time() - scheduled))
+
+
+async def generate_load(session, url, rate, duration, traffic, seed, run):
+    """Open loop: request i is sent at start + i/rate, whatever came back"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    paths, weights = list(traffic), list(traffic.values())
+    pending = set()
+    start = loop.time()
+    total = int(rate * duration)
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(_request(session, url, rng.choices(paths, weights)[0],
+                                            scheduled, loop, run))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def inject_faults(session, url, burst, interval, warmup, duration, run):
+    """`burst` GET /simulate-error every `interval` seconds after `warmup`"""
+    if not burst:
+        return
+    start = time.monotonic()
+    at = warmup
+    while at < duration:
+        await asyncio.sleep(max(0.0, start + at - time.monotonic()))
+        for _ in range(burst):
+            try:
+                async with session.get(f"{url}/simulate-error") as response:
+                    await response.read()
+            except Exception:
+                pass
+        run.injections.append(time.time())
+        at += interval
+
+
+async def sample_health(session, url, interval, stop, run):
+    while not stop.is_set():
+        count = None
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    count = (await response.json()).get('error_count')
+        except Exception:
+            pass
+        run.samples.append((time.time(), count))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _serve_control(server, run):
+    """POST /_restart for ReplayOrchestrator: restarts the app process"""
+    from aiohttp import web
+
+    lock = asyncio.Lock()
+
+    async def restart(request):
+        async with lock:
+            loop = asyncio.get_running_loop()
+            count = None
+            try:
+                with urllib.request.urlopen(f"{server.url}/health", timeout=2) as response:
+                    count = json.load(response).get('error_count')
+            except OSError:
+                pass
+            downtime = await loop.run_in_executor(None, server.restart)
+            run.restarts.append((time.time(), count, downtime))
+        return web.json_response({'warranted': (count or 0) >= CRITICAL_THRESHOLD})
+
+    app = web.Application()
+    app.router.add_post('/_restart', restart)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _drive(server, rate, duration, mix, warmup, settle,
+                 sample_interval, seed, with_monitor, check_interval, adaptive, log_path, run):
+    import aiohttp
+
+    runner, control_url = await _serve_control(server, run)
+    monitor = None
+    if with_monitor:
+        context = multiprocessing.get_context('spawn')
+        monitor = context.Process(target=run_monitor_child, daemon=True,
+                                  args=(server.url, control_url, log_path, check_interval,
+                                        adaptive))
+        monitor.start()
+        # Model load and first check before the load starts
+        await asyncio.sleep(warmup / 2)
+
+    timeout = aiohttp.ClientTimeout(total=10)
+    stop = asyncio.Event()
+    monitor_cpu = 0.0
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=512),
+                                     timeout=timeout) as session, \
+            aiohttp.ClientSession(timeout=timeout) as probe_session:
+        sampler = asyncio.create_task(sample_health(probe_session, server.url,
+                                                    sample_interval, stop, run))
+        cpu_start = _cpu_seconds(monitor.pid) if monitor else 0.0
+        started = time.monotonic()
+        await asyncio.gather(
+            generate_load(session, server.url, rate, duration, mix['traffic'], seed, run),
+            inject_faults(probe_session, server.url, mix['burst'], mix['interval'], warmup,
+                          duration, run))
+        elapsed = time.monotonic() - started
+        # An incident still open when the load ends gets `settle` more
+        # seconds to be healed (the load stops, monitor and sampler keep going)
+        deadline = time.monotonic() + settle
+        while (run.injections and time.monotonic() < deadline
+               and not any(ts > run.injections[-1] and count is not None and count < SOFT_THRESHOLD
+                           for ts, count in run.samples[-3:])):
+            await asyncio.sleep(sample_interval)
+        if monitor:
+            monitor_cpu = _cpu_seconds(monitor.pid) - cpu_start
+        stop.set()
+        await sampler
+
+    if monitor:
+        os.kill(monitor.pid, signal.SIGINT)
+        await asyncio.get_running_loop().run_in_executor(None, monitor.join, 15)
+        if monitor.is_alive():
+            monitor.terminate()
+    await runner.cleanup()
+    return elapsed, monitor_cpu
+
+
+def _incidents(run, records, end):
+    """Per injection: time-to-detect, time-to-heal, and the window it lasted"""
+    checks = [r for r in records if r.get('event') == 'check']
+    incidents = []
+    for i, injected in enumerate(run.injections):
+        until = run.injections[i + 1] if i + 1 < len(run.injections) else end
+        detected = next((r['ts'] for r in checks
+                         if injected <= r['ts'] < until and r.get('action')), None)
+        healed = next((ts for ts, count in run.samples
+                       if injected < ts < until and count is not None
+                       and count < SOFT_THRESHOLD), None)
+        incidents.append({
+            'injected': injected,
+            'detect_s': detected - injected if detected else None,
+            'heal_s': healed - injected if healed else None,
+            'end': healed or until,
+        })
+    return incidents
+
+
+def _summarize(run, records, elapsed, monitor_cpu, rate):
+    # Includes the settle period: the sampler runs until the very end
+    end = max([run.injections[-1] if run.injections else 0.0]
+              + [r[0] for r in run.requests] + [ts for ts, _ in run.samples[-1:]]) + 1
+    incidents = _incidents(run, records, end)
+    answered = [r for r in run.requests if r[2] is not None]
+    ok = [r for r in answered if r[2] < 500]
+
+    def in_incident(sent):
+        return any(i['injected'] <= sent < i['end'] for i in incidents)
+
+    steady = [r[3] for r in answered if not in_incident(r[0])]
+    during = [r[3] for r in answered if in_incident(r[0])]
+    restart_windows = [(ts - downtime, ts) for ts, _, downtime in run.restarts]
+    failed = [r for r in run.requests if r[2] is None]
+    failed_in_restart = sum(1 for r in failed
+                            if any(a - 1 <= r[0] <= b for a, b in restart_windows))
+
+    checks = [r for r in records if r.get('event') == 'check']
+    soft_heals = sum(1 for r in checks if r.get('action') == 'reset_errors' and r.get('dispatched'))
+    detect = [i['detect_s'] for i in incidents if i['detect_s'] is not None]
+    heal = [i['heal_s'] for i in incidents if i['heal_s'] is not None]
+    return {
+        'duration_s': elapsed,
+        'requests': len(run.requests),
+        'offered_rps': rate,
+        'throughput_rps': len(ok) / elapsed,
+        'latency_ms': _distribution([r[3] for r in answered], 1000),
+        'http_errors': len(answered) - len(ok),
+        'failed': len(failed),
+        'faults': {
+            'injected': len(incidents),
+            'detected': len(detect),
+            'healed': len(heal),
+            'time_to_detect_s': _distribution(detect),
+            'time_to_heal_s': _distribution(heal),
+        },
+        'healing': {
+            'checks': len(checks),
+            'soft_heals': soft_heals,
+            # Decisions the executor did not dispatch (cooldown, in flight, budget)
+            'skipped_heals': sum(1 for r in checks if r.get('action') and not r.get('dispatched')),
+            'restarts': len(run.restarts),
+            'false_restarts': sum(1 for _, count, _ in run.restarts
+                                  if (count or 0) < CRITICAL_THRESHOLD),
+            'restart_downtime_s': sum(downtime for _, _, downtime in run.restarts),
+            'failed_during_restarts': failed_in_restart,
+            'steady_latency_ms': _distribution(steady, 1000),
+            'incident_latency_ms': _distribution(during, 1000),
+            'monitor_cpu_s': monitor_cpu,
+            'monitor_cpu_share': monitor_cpu / elapsed if elapsed else 0.0,
+        },
+    }
+
+
+def run_load(server='gunicorn', rate=50, duration=60.0, fault_mix='soft', workers=2,
+             burst=None, burst_interval=None, warmup=5.0, settle=30.0, sample_interval=0.25,
+             seed=0, with_monitor=True, check_interval=None, adaptive=True, monitor_log=None):
+    """
+    One run: start the app, drive it with the monitor attached; returns a results dict
+
+    fault_mix: a FAULT_MIXES name; burst / burst_interval override its burst
+    settle: seconds an incident still open at the end of the load may take to heal
+    check_interval: monitor base probe interval (default: the monitor's 5s)
+    adaptive: monitor's adaptive probe scheduling (as shipped) or a fixed interval
+    monitor_log: keep the monitor's JSON log at this path (default: discarded)
+    """
+    mix = dict(FAULT_MIXES[fault_mix])
+    if burst is not None:
+        mix['burst'] = burst
+    if burst_interval is not None:
+        mix['interval'] = burst_interval
+    patient = PatientServer(server, workers=workers)
+    log_path = monitor_log or os.path.join(patient.state_dir, 'monitor.jsonl')
+    run = LoadRun()
+    try:
+        patient.start()
+        elapsed, monitor_cpu = asyncio.run(_drive(
+            patient, rate, duration, mix, warmup, settle, sample_interval, seed,
+            with_monitor, check_interval, adaptive, log_path, run))
+        records = read_monitor_log(log_path) if with_monitor else []
+    finally:
+        patient.close()
+
+    result = {
+        'server': server,
+        'workers': workers if server != 'flask' else None,
+        'fault_mix': fault_mix,
+        'burst': mix['burst'],
+        'burst_interval_s': mix['interval'],
+        'monitor': with_monitor,
+        'adaptive': adaptive,
+        'check_interval_s': check_interval,
+    }
+    result.update(_summarize(run, records, elapsed, monitor_cpu, rate))
+    return result
@@ -0,0 +1,382 @@
+# Streaming Metrics History
+#
+# Fixed-memory, per-target ring buffer of /health samples with rolling-window
+# features, so the ML model can tell a short spike from sustained
+# degradation.
+#
+# Windows are durations in seconds, not sample counts: the probe scheduler
+# probes a degrading target every 2s and a stable one every 5-300s, so a
+# window of N samples would cover anything from seconds to hours. A window
+# of W seconds holds the samples taken in the W seconds up to (and
+# including) the target's newest sample, at most `capacity` of them.
+#
+# Per target and window:
+#   - mean   of each channel over the window
+#   - max    of each channel over the window
+#   - slope  least-squares slope vs. time (units per second)
+# plus an EWMA per channel, updated on every sample.
+#
+# Channels: cpu_usage, memory_usage, error_count and error_rate, the
+# increase of error_count per second between consecutive samples. The slope
+# of error_rate is the error-rate derivative.
+#
+# Updates are O(1) amortized per sample, with no re-scan of the history:
+# - Each window keeps running sums (n, Σt, Σt², Σy, Σty). A new sample is
+#   added to them; samples that fall out of the window (older than W seconds
+#   or beyond `capacity`) are subtracted once, when they leave.
+# - Max comes from a monotonic stack per target and channel (sample ids with
+#   decreasing values). A window's max is the first stack entry inside the
+#   window; each window keeps a pointer to it, moved forward on eviction.
+# - Times in the sums are relative to a per-target origin, moved (the sums
+#   shifted algebraically) once it is more than an hour behind, so Σt²
+#   stays small.
+# Features are then read straight from the sums: O(1) per target and window.
+#
+# All targets share one set of arrays (a row per target), and a tick's
+# samples are added with vectorized operations across targets (add_batch).
+# Training data goes through the same code (batch_features), so features
+# are computed the same way offline and in the monitor.
+
+import numpy as np
+
+CHANNELS = ('cpu_usage', 'memory_usage', 'error_count', 'error_rate')
+STATS = ('mean', 'max', 'slope')
+
+# Seconds the time origin of a target may lag behind its newest sample
+RECENTER_AFTER = 3600.0
+
+
+def feature_names(windows):
+    """Names of the features produced for the given windows (none if no windows)"""
+    names = []
+    if not windows:
+        return names
+    for channel in CHANNELS:
+        for window in windows:
+            names.extend(f"{channel}_{stat}_w{window}s" for stat in STATS)
+        names.append(f"{channel}_ewma")
+    return names
+
+
+def windows_for(names):
+    """Windows (seconds) referenced by a list of feature names (e.g. a model's inputs)"""
+    windows = set()
+    for name in names:
+        head, sep, tail = name.rpartition('_w')
+        if sep and tail.endswith('s') and tail[:-1].isdigit() and head.rpartition('_')[2] in STATS:
+            windows.add(int(tail[:-1]))
+    return tuple(sorted(windows))
+
+
+class MetricsHistory:
+    """
+    Per-target streaming health history
+
+    Usage:
+        history = MetricsHistory(windows=(60, 600))
+        history.add('pod-a', time.time(), health_data)
+        history.add_batch(['pod-a', 'pod-b'], time.time(), [health_a, health_b])
+        features = history.features('pod-a')   # e.g. cpu_usage_mean_w600s
+        rows = history.features_batch(['pod-a', 'pod-b'])
+    """
+
+    # Per-row state arrays (first axis: row), grown together
+    _STATE = ('_t', '_values', '_count', '_origin', '_ewma',
+              '_start', '_n', '_sum_t', '_sum_tt', '_sum_y', '_sum_ty',
+              '_stack', '_bottom', '_top', '_head')
+
+    def __init__(self, windows=(60, 600), capacity=64, ewma_alpha=0.3):
+        self.windows = tuple(sorted(windows))
+        self.capacity = capacity
+        self.ewma_alpha = ewma_alpha
+        self._names = feature_names(self.windows)
+        self._window_lengths = np.asarray(self.windows, dtype=np.float64)
+
+        # target -> row in the arrays below; rows of forgotten targets are reused
+        self.targets = {}
+        self._free = []
+        self._allocate(16)
+
+    def _allocate(self, rows):
+        n_windows, n_channels, capacity = len(self.windows), len(CHANNELS), self.capacity
+        # Ring buffer of samples; sample number s sits at s % capacity
+        self._t = np.zeros((rows, capacity))
+        self._values = np.zeros((rows, n_channels, capacity))
+        self._count = np.zeros(rows, dtype=np.int64)
+        self._origin = np.zeros(rows)
+        self._ewma = np.zeros((rows, n_channels))
+        # Per window: first sample number inside it, and the running sums
+        self._start = np.zeros((rows, n_windows), dtype=np.int64)
+        self._n = np.zeros((rows, n_windows))
+        self._sum_t = np.zeros((rows, n_windows))
+        self._sum_tt = np.zeros((rows, n_windows))
+        self._sum_y = np.zeros((rows, n_windows, n_channels))
+        self._sum_ty = np.zeros((rows, n_windows, n_channels))
+        # Monotonic stack per channel: sample numbers at positions
+        # [bottom, top) (position p at p % capacity); head: per window, the
+        # position of its max
+        self._stack = np.zeros((rows, n_channels, capacity), dtype=np.int64)
+        self._bottom = np.zeros((rows, n_channels), dtype=np.int64)
+        self._top = np.zeros((rows, n_channels), dtype=np.int64)
+        self._head = np.zeros((rows, n_windows, n_channels), dtype=np.int64)
+
+    def _grow(self):
+        rows = 2 * len(self._count)
+        for name in self._STATE:
+            old = getattr(self, name)
+            new = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _reset(self, row):
+        for name in self._STATE:
+            getattr(self, name)[row] = 0
+
+    def _row(self, target):
+        row = self.targets.get(target)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self.targets)
+                if row == len(self._count):
+                    self._grow()
+            self._reset(row)
+            self.targets[target] = row
+        return row
+
+    def add(self, target, timestamp, health_data):
+        """Record a /health sample for a target"""
+        self.add_batch([target], timestamp, [health_data])
+
+    def add_batch(self, targets, timestamp, samples):
+        """Record one /health sample for each of several distinct targets"""
+        if not targets:
+            return
+        rows = np.fromiter((self._row(target) for target in targets), dtype=np.intp,
+                           count=len(targets))
+        y = np.array([(sample.get('cpu_usage', 0), sample.get('memory_usage', 0),
+                       sample.get('error_count', 0)) for sample in samples], dtype=np.float64)
+        self._add_rows(rows, np.full(len(rows), float(timestamp)), y)
+
+    def _add_rows(self, rows, t, y):
+        """
+        Add one sample to each of `rows` (distinct)
+
+        t: (B,) timestamps; y: (B, 3) cpu_usage, memory_usage, error_count
+        """
+        cap = self.capacity
+        count = self._count[rows]
+        seen = count > 0
+        previous = (count - 1) % cap
+        dt = np.maximum(t - self._t[rows, previous], 1e-9)
+        increase = np.maximum(y[:, 2] - self._values[rows, 2, previous], 0.0)
+        sample = np.column_stack([y, np.where(seen, increase / dt, 0.0)])
+
+        n = self._n[rows]
+        sum_t = self._sum_t[rows]
+        sum_tt = self._sum_tt[rows]
+        sum_y = self._sum_y[rows]
+        sum_ty = self._sum_ty[rows]
+        start = self._start[rows]
+
+        # Move the time origin of rows that drifted too far (shift the sums)
+        origin = np.where(seen, self._origin[rows], t)
+        far = np.flatnonzero(t - origin > RECENTER_AFTER)
+        if len(far):
+            d = (t[far] - origin[far])[:, None]
+            sum_tt[far] += n[far] * d * d - 2 * d * sum_t[far]
+            sum_t[far] -= n[far] * d
+            sum_ty[far] -= d[:, :, None] * sum_y[far]
+            origin[far] = t[far]
+        self._origin[rows] = origin
+
+        # Evict samples that leave each window: older than the window (seen
+        # from the new sample) or overwritten in the ring by it
+        lowest = count + 1 - cap
+        for w, length in enumerate(self.windows):
+            index = np.arange(len(rows))
+            while len(index):
+                s = start[index, w]
+                r = rows[index]
+                slot = s % cap
+                leaving = (s < count[index]) & (
+                    (s < lowest[index]) | (self._t[r, slot] <= t[index] - length))
+                index, r, slot = index[leaving], r[leaving], slot[leaving]
+                if not len(index):
+                    break
+                rel = self._t[r, slot] - origin[index]
+                values = self._values[r, :, slot]
+                n[index, w] -= 1
+                sum_t[index, w] -= rel
+                sum_tt[index, w] -= rel * rel
+                sum_y[index, w] -= values
+                sum_ty[index, w] -= rel[:, None] * values
+                start[index, w] += 1
+
+        # An empty window starts from exact zeros (no accumulated rounding)
+        empty = n == 0
+        sum_t[empty] = 0.0
+        sum_tt[empty] = 0.0
+        sum_y[empty] = 0.0
+        sum_ty[empty] = 0.0
+
+        rel = t - origin
+        n += 1
+        sum_t += rel[:, None]
+        sum_tt += (rel * rel)[:, None]
+        sum_y += sample[:, None, :]
+        sum_ty += (rel[:, None] * sample)[:, None, :]
+
+        self._n[rows] = n
+        self._sum_t[rows] = sum_t
+        self._sum_tt[rows] = sum_tt
+        self._sum_y[rows] = sum_y
+        self._sum_ty[rows] = sum_ty
+        self._start[rows] = start
+
+        slot = count % cap
+        self._t[rows, slot] = t
+        self._values[rows, :, slot] = sample
+        self._push_max(rows, count, lowest, start, sample)
+
+        ewma = self._ewma[rows]
+        self._ewma[rows] = np.where(seen[:, None], ewma + self.ewma_alpha * (sample - ewma), sample)
+        self._count[rows] = count + 1
+
+    def _push_max(self, rows, count, lowest, start, sample):
+        """Push the new sample (number `count`) on each channel's monotonic stack"""
+        cap = self.capacity
+        n_channels = len(CHANNELS)
+        stack = self._stack[rows]
+        bottom = self._bottom[rows]
+        top = self._top[rows]
+
+        # Drop entries whose sample left the ring (stack order = sample order)
+        index = np.flatnonzero(bottom < top)
+        while len(index):
+            b, c = np.divmod(index, n_channels)
+            old = stack[b, c, bottom[b, c] % cap] < lowest[b]
+            index = index[old]
+            bottom.flat[index] += 1
+            index = index[(bottom.flat[index] < top.flat[index])]
+
+        # Pop entries not above the new value; they can never be a max again
+        index = np.flatnonzero(bottom < top)
+        while len(index):
+            b, c = np.divmod(index, n_channels)
+            below = self._values[rows[b], c, stack[b, c, (top[b, c] - 1) % cap] % cap] <= sample[b, c]
+            index = index[below]
+            top.flat[index] -= 1
+            index = index[(bottom.flat[index] < top.flat[index])]
+
+        b = np.arange(len(rows))[:, None]
+        c = np.arange(n_channels)[None, :]
+        stack[b, c, top % cap] = count[:, None]
+        top += 1
+
+        # A window whose max was popped now has the new sample as its max;
+        # then move each head past samples that left its window
+        head = np.clip(self._head[rows], bottom[:, None, :], (top - 1)[:, None, :])
+        n_windows = len(self.windows)
+        index = np.arange(head.size)
+        while len(index):
+            b, rest = np.divmod(index, n_windows * n_channels)
+            w, c = np.divmod(rest, n_channels)
+            outside = stack[b, c, head.flat[index] % cap] < start[b, w]
+            index = index[outside]
+            head.flat[index] += 1
+
+        self._stack[rows] = stack
+        self._bottom[rows] = bottom
+        self._top[rows] = top
+        self._head[rows] = head
+
+    def _stats(self, rows):
+        """{feature name: (len(rows),) array} for rows with at least one sample"""
+        cap = self.capacity
+        n = self._n[rows]
+        sum_t = self._sum_t[rows]
+        sum_tt = self._sum_tt[rows]
+        sum_y = self._sum_y[rows]
+        sum_ty = self._sum_ty[rows]
+
+        mean = sum_y / np.maximum(n, 1.0)[:, :, None]
+        denominator = (n * sum_tt - sum_t * sum_t)[:, :, None]
+        numerator = n[:, :, None] * sum_ty - sum_t[:, :, None] * sum_y
+        slope = np.divide(numerator, denominator, out=np.zeros_like(numerator),
+                          where=(denominator > 1e-9) & (n[:, :, None] >= 2))
+
+        b = np.arange(len(rows))[:, None, None]
+        c = np.arange(len(CHANNELS))[None, None, :]
+        head = self._head[rows]
+        top_sample = self._stack[rows[b], c, head % cap]
+        maxima = self._values[rows[b], c, top_sample % cap]
+
+        result = {}
+        for channel, name in enumerate(CHANNELS):
+            for w, window in enumerate(self.windows):
+                result[f"{name}_mean_w{window}s"] = mean[:, w, channel]
+                result[f"{name}_max_w{window}s"] = maxima[:, w, channel]
+                result[f"{name}_slope_w{window}s"] = slope[:, w, channel]
+            result[f"{name}_ewma"] = self._ewma[rows, channel]
+        return result
+
+    def features_batch(self, targets):
+        """Rolling features for several targets ({} for targets with no samples yet)"""
+        rows = np.fromiter((self.targets.get(target, -1) for target in targets), dtype=np.intp,
+                           count=len(targets))
+        known = rows >= 0
+        result = [{} for _ in targets]
+        if not known.any():
+            return result
+
+        # Rows exist only for targets with at least one sample
+        stats = self._stats(rows[known])
+        matrix = np.column_stack([stats[name] for name in self._names]).tolist()
+        names = self._names
+        for index, values in zip(np.flatnonzero(known), matrix):
+            result[index] = dict(zip(names, values))
+        return result
+
+    def features(self, target):
+        """Rolling features for a target ({} if it has no samples yet)"""
+        return self.features_batch([target])[0]
+
+    def forget(self, target):
+        """Drop a target that is no longer monitored"""
+        row = self.targets.pop(target, None)
+        if row is not None:
+            self._free.append(row)
+
+    def feature_names(self):
+        return list(self._names)
+
+
+def batch_features(timestamps, cpu_usage, memory_usage, error_count,
+                   windows=(60, 600), ewma_alpha=0.3, block_rows=16384):
+    """
+    Same features as MetricsHistory.features, computed in bulk
+
+    Inputs are (n_series, length) arrays holding complete sample series,
+    oldest first (timestamps in seconds). Used to build training data: each
+    block of series is streamed through a MetricsHistory (capacity =
+    length), one column at a time, so the features are exactly those the
+    monitor computes; keep length <= the monitor's capacity to match it.
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    y = np.stack([np.asarray(cpu_usage, dtype=np.float64),
+                  np.asarray(memory_usage, dtype=np.float64),
+                  np.asarray(error_count, dtype=np.float64)], axis=1)
+    n_series, length = t.shape
+
+    blocks = []
+    for first in range(0, n_series, block_rows):
+        last = min(first + block_rows, n_series)
+        history = MetricsHistory(windows, capacity=length, ewma_alpha=ewma_alpha)
+        history._allocate(last - first)
+        rows = np.arange(last - first)
+        for column in range(length):
+            history._add_rows(rows, t[first:last, column], y[first:last, :, column])
+        blocks.append(history._stats(rows))
+    return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
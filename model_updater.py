@@ -0,0 +1,207 @@
+# Background Model Updates
+#
+# Retrains the healing model from the monitor's recorded history
+# (history_store.py) and swaps it into the running monitor, without
+# restarting it and without adding latency to the polling loop:
+#
+# - Fit in a separate process (spawned, niced, single core): the forest fit,
+#   pandas and sklearn never run in the monitor process, so they cannot hold
+#   the GIL or compete for the probe loop's core.
+# - Validate in that process too. Held-out data:
+#     reference  synthetic rows labelled by the rules the models learn
+#                (same labels as train_brain.py); the candidate must score
+#                at least as well as the current model, within `tolerance`
+#     recent     the newest share of the recorded history (not trained on);
+#                the candidate must agree with the current model on at
+#                least `min_agreement` of it, so a swap never flips the
+#                fleet's behaviour wholesale
+# - Swap: the accepted forest is exported to its own directory, loaded
+#   memory-mapped (milliseconds) and installed with
+#   DoctorMonitorML.swap_brain, a reference assignment the next tick picks
+#   up; in-flight predictions finish on the old model. `model_dir/current`
+#   is re-pointed atomically so a restarted monitor loads it
+#   (--model model_dir/current).
+#
+# Candidates must keep the current model's features (same history windows),
+# since the monitor's rolling history is sized for them.
+
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from inference_brain import InferenceBrain
+
+
+def train_candidate(history_dir, output_dir, current_model, synthetic_samples=50_000,
+                    validation_samples=20_000, history_days=None, holdout=0.2,
+                    min_history=1000):
+    """
+    Fit and validate a candidate forest (runs in the training process)
+
+    Returns a dict with the exported candidate path (None if there was not
+    enough history) and validation metrics for it and the current model.
+    """
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+    import pandas as pd
+    from train_brain import HealingBrain
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Exported forest directory, or the pickle the monitor fell back to
+        current = InferenceBrain() if os.path.isdir(current_model) else HealingBrain()
+        current.load_model(current_model)
+        brain = HealingBrain(history_windows=current.history_windows)
+
+        start = time.time() - history_days * 86400 if history_days else None
+        history = brain.history_training_data(history_dir, start=start)
+        if len(history) < min_history:
+            return {'path': None, 'history_rows': len(history),
+                    'reason': f"not enough history ({len(history)} < {min_history} rows)"}
+
+        # History is in time order: train on the older part, keep the newest
+        cut = int(len(history) * (1 - holdout))
+        df = pd.concat([brain.generate_training_data(synthetic_samples), history.iloc[:cut]],
+                       ignore_index=True)
+        brain.train(df=df, n_jobs=1)
+        reference = brain.generate_training_data(validation_samples)
+
+    if brain.feature_names != current.feature_names:
+        return {'path': None, 'history_rows': len(history),
+                'reason': "candidate features differ from the current model"}
+
+    candidate = brain.compiled
+    X_reference, y_reference = brain._as_xy(reference)
+    X_reference = X_reference.to_numpy(np.float64)
+    X_recent = brain._as_xy(history.iloc[cut:])[0].to_numpy(np.float64)
+
+    path = os.path.join(output_dir, f"forest-{time.strftime('%Y%m%d-%H%M%S')}")
+    candidate.save(path)
+    return {
+        'path': path,
+        'history_rows': len(history),
+        'candidate_accuracy': float(np.mean(candidate.predict(X_reference) == y_reference)),
+        'current_accuracy': float(np.mean(current.compiled.predict(X_reference) == y_reference)),
+        'recent_agreement': float(np.mean(candidate.predict(X_recent) ==
+                                          current.compiled.predict(X_recent))),
+    }
+
+
+class ModelUpdater:
+    """
+    Periodic background retraining with validated hot swaps
+
+    Usage:
+        updater = ModelUpdater(monitor, '/var/lib/monitor/history',
+                               model_dir='models', interval=6 * 3600)
+        updater.start()
+        updater.stats   # attempts, accepted, rejected, failed
+    """
+
+    def __init__(self, monitor, history_dir, model_dir='models', interval=6 * 3600.0,
+                 synthetic_samples=50_000, validation_samples=20_000, history_days=14,
+                 min_history=1000, tolerance=0.005, min_agreement=0.9, keep=3):
+        self.monitor = monitor
+        self.history_dir = history_dir
+        self.model_dir = model_dir
+        self.interval = interval
+        self.synthetic_samples = synthetic_samples
+        self.validation_samples = validation_samples
+        self.history_days = history_days
+        self.min_history = min_history
+        self.tolerance = tolerance
+        self.min_agreement = min_agreement
+        self.keep = keep
+
+        self.current_path = monitor.model_path
+        self.stats = {'attempts': 0, 'accepted': 0, 'rejected': 0, 'failed': 0}
+        self.last_result = None
+
+        self._pool = ProcessPoolExecutor(max_workers=1,
+                                         mp_context=multiprocessing.get_context('spawn'))
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(model_dir, exist_ok=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='model-updater', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        """Train, validate and (if accepted) swap in one candidate; returns whether it swapped"""
+        self.stats['attempts'] += 1
+        try:
+            result = self._pool.submit(
+                train_candidate, self.history_dir, self.model_dir, self.current_path,
+                self.synthetic_samples, self.validation_samples, self.history_days,
+                0.2, self.min_history).result()
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"   ❌ Model update failed: {e}")
+            return False
+
+        self.last_result = result
+        accepted, reason = self._accept(result)
+        if not accepted:
+            self.stats['rejected'] += 1
+            print(f"🧠 Model update rejected: {reason}")
+            if result.get('path'):
+                shutil.rmtree(result['path'], ignore_errors=True)
+            return False
+
+        brain = InferenceBrain()
+        brain.load_model(result['path'])
+        self.monitor.swap_brain(brain)
+        self.current_path = result['path']
+        self._point_current(result['path'])
+        self.stats['accepted'] += 1
+        print(f"🧠 Model updated: {reason}")
+        self._prune()
+        return True
+
+    def _accept(self, result):
+        if result.get('path') is None:
+            return False, result['reason']
+        candidate, current = result['candidate_accuracy'], result['current_accuracy']
+        agreement = result['recent_agreement']
+        summary = (f"reference accuracy {candidate:.2%} (current {current:.2%}), "
+                   f"agreement on recent history {agreement:.2%}")
+        if candidate < current - self.tolerance:
+            return False, summary
+        if agreement < self.min_agreement:
+            return False, summary
+        return True, summary
+
+    def _point_current(self, path):
+        """Atomically re-point model_dir/current at the accepted forest"""
+        link = os.path.join(self.model_dir, 'current')
+        tmp = link + '.tmp'
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        os.symlink(os.path.basename(path), tmp)
+        os.replace(tmp, link)
+
+    def _prune(self):
+        """Delete old candidates, keeping the newest `keep` (and the live one)"""
+        forests = sorted(name for name in os.listdir(self.model_dir) if name.startswith('forest-'))
+        live = os.path.basename(os.path.realpath(self.current_path))
+        for name in forests[:-self.keep]:
+            if name != live:
+                shutil.rmtree(os.path.join(self.model_dir, name), ignore_errors=True)
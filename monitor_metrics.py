@@ -0,0 +1,272 @@
+# Monitor Stage Metrics and Profiling
+#
+# Where a monitor tick spends its time, measured in production:
+#
+# - StageMetrics: one fixed-bucket latency histogram per stage (probe,
+#   parse, features, filter, classify, matrix, forest, dispatch, output,
+#   ...). Recording is a bisect and three increments, so it stays on for
+#   every tick. Quantiles are estimated from the buckets (spaced by a factor
+#   of sqrt(2) from 10µs, interpolated within the bucket).
+#   summary() gives count/mean/p50/p99 per stage, since start or since the
+#   last window; prometheus() gives the histograms in the text format.
+# - SamplingProfiler: a background thread samples the monitor thread's stack
+#   every `interval` seconds and counts folded stacks (flamegraph.pl /
+#   speedscope input). Off by default; started and stopped at runtime
+#   through the monitor's HTTP endpoint (monitor_server.py) and stopped
+#   automatically after `seconds`. Sampling only reads the stack, the
+#   monitored code runs unchanged.
+#
+# Stages nest: 'decide' includes 'features', 'filter' and 'classify', which
+# includes 'matrix' and 'forest' (the model pass for cache misses); 'tick'
+# includes everything in the tick. Stdout is not wrapped to time every
+# print (a Python-level write() per line costs about as much as the line
+# itself); 'output' times the per-target report lines instead.
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# 10µs .. ~2min, factor sqrt(2)
+STAGE_BUCKETS = tuple(1e-5 * 2 ** (k / 2) for k in range(48))
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms
+
+    Usage:
+        stages = StageMetrics()
+        with stages.time('probe'):
+            results = await poller.poll_once(due)
+        stages.observe('parse', seconds)
+        stages.summary()          # {'probe': {'count', 'mean_ms', 'p50_ms', 'p99_ms', ...}}
+        text = stages.prometheus()
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS, enabled=True):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.start_time = time.time()
+        # stage -> [count, sum_seconds, bucket_0, ..., bucket_inf]; observed
+        # from the monitor loop and the healing worker threads
+        self._series = {}
+        self._lock = threading.Lock()
+        self._window = {}
+
+    def observe(self, stage, seconds):
+        """Record one duration of a stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._series.get(stage)
+            if series is None:
+                series = self._series[stage] = [0, 0.0] + [0] * (len(self.buckets) + 1)
+            series[0] += 1
+            series[1] += seconds
+            series[2 + bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def time(self, stage):
+        """Context manager recording the duration of its block as `stage`"""
+        return _Timer(self, stage)
+
+    def timed(self, stage, fn):
+        """fn wrapped so that every call is recorded as `stage`"""
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(stage, time.perf_counter() - start)
+        return call
+
+    def snapshot(self):
+        """stage -> copy of its [count, sum, buckets...] series"""
+        with self._lock:
+            return {stage: list(series) for stage, series in self._series.items()}
+
+    def _quantile(self, counts, q):
+        """Estimate a quantile from bucket counts (linear within the bucket)"""
+        total = sum(counts)
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1] * 2
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def _describe(self, series):
+        count, total, counts = series[0], series[1], series[2:]
+        return {
+            'count': count,
+            'total_s': total,
+            'mean_ms': total / count * 1000,
+            'p50_ms': self._quantile(counts, 0.50) * 1000,
+            'p99_ms': self._quantile(counts, 0.99) * 1000,
+        }
+
+    def summary(self, window=False):
+        """
+        count/total/mean/p50/p99 per stage
+
+        window=True: only what was recorded since the previous
+        summary(window=True) call (the periodic summary log).
+        """
+        current = self.snapshot()
+        if not window:
+            return {stage: self._describe(series)
+                    for stage, series in current.items() if series[0]}
+
+        previous, self._window = self._window, current
+        result = {}
+        for stage, series in current.items():
+            before = previous.get(stage)
+            if before is not None:
+                series = [now - then for now, then in zip(series, before)]
+            if series[0]:
+                result[stage] = self._describe(series)
+        return result
+
+    def prometheus(self, prefix='monitor_stage'):
+        """Histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_seconds Time spent per monitor stage",
+            f"# TYPE {prefix}_seconds histogram",
+        ]
+        for stage, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[2:]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:.6g}"
+                lines.append(f'{prefix}_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{stage}"}} {series[1]:.6f}')
+            lines.append(f'{prefix}_seconds_count{{stage="{stage}"}} {series[0]}')
+        lines.append(f"# TYPE {prefix}_start_time_seconds gauge")
+        lines.append(f"{prefix}_start_time_seconds {self.start_time:.3f}")
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    """StageMetrics.time() block (a class: cheaper than a generator context manager)"""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+def format_summary(summary, order=None):
+    """One log line: 'tick p50 41.0ms p99 88.2ms | probe ...'"""
+    stages = [s for s in order or () if s in summary]
+    stages += sorted(s for s in summary if s not in stages)
+    return ' | '.join(
+        f"{stage} p50 {summary[stage]['p50_ms']:.1f}ms p99 {summary[stage]['p99_ms']:.1f}ms"
+        for stage in stages
+    )
+
+
+class SamplingProfiler:
+    """
+    Stack-sampling profiler for one thread, toggled at runtime
+
+    Usage:
+        profiler = SamplingProfiler()            # samples the calling thread
+        profiler.start(seconds=30)               # e.g. from POST /profile/start
+        ...
+        profiler.stop()
+        print(profiler.folded())                 # 'mod:func;mod:func 42' lines
+    """
+
+    def __init__(self, thread_id=None, interval=0.01, max_depth=64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=30.0, interval=None, reset=True):
+        """Start sampling (returns False if already running)"""
+        with self._lock:
+            if self.running:
+                return False
+            if interval:
+                self.interval = interval
+            if reset:
+                self.stacks = Counter()
+                self.samples = 0
+            self._stop.clear()
+            self.started_at, self.stopped_at = time.time(), None
+            self._thread = threading.Thread(target=self._run, args=(seconds,),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling (returns whether it was running)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def _run(self, seconds):
+        deadline = time.monotonic() + seconds if seconds else None
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+                self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def folded(self):
+        """Folded stacks, most sampled first (flamegraph.pl / speedscope)"""
+        stacks = dict(self.stacks)
+        return ''.join(f"{stack} {count}\n"
+                       for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+    def top(self, n=20):
+        """Functions by share of samples on top of the stack (self time)"""
+        leaves = Counter()
+        for stack, count in dict(self.stacks).items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{'function': function, 'samples': count, 'share': count / total}
+                for function, count in leaves.most_common(n)]
+
+    def status(self):
+        return {'running': self.running, 'samples': self.samples,
+                'interval': self.interval, 'started_at': self.started_at,
+                'stopped_at': self.stopped_at}
@@ -0,0 +1,103 @@
+# Monitor HTTP Endpoint
+#
+# Small aiohttp server that runs inside the fleet monitor's event loop.
+#
+#   POST /notify   push notification from a patient app ("probe me now").
+#                  Body (optional JSON): {"target": "<host:port or base URL>"}
+#                  Without a target the sender's address identifies the pod.
+#
+# The handler only marks the target due in the probe scheduler, so a burst of
+# notifications costs one probe, not one per notification.
+#
+# With stage metrics (monitor_metrics.py) it serves, on its own port:
+#
+#   GET  /metrics               per-stage latency histograms (Prometheus text);
+#                               ?format=json for count/mean/p50/p99 per stage
+#   POST /profile/start         start the sampling profiler
+#                               (?seconds=30&interval=0.01)
+#   POST /profile/stop          stop it
+#   GET  /profile               folded stacks of the last profile (text);
+#                               ?format=json for the top functions
+#
+# The profiler routes let any client start a profile, and metrics show the
+# monitor's internals, so the monitor binds them to localhost unless told
+# otherwise (--metrics-host). /notify must be reachable from the pods.
+#
+# In single-target mode there is no event loop; serve_in_thread() runs the
+# same server on its own loop in a daemon thread.
+
+import asyncio
+import threading
+
+from aiohttp import web
+
+
+async def start_monitor_server(on_notify=None, host='127.0.0.1', port=8081,
+                               metrics=None, profiler=None):
+    """
+    Start the endpoint on the running event loop
+
+    on_notify(target, remote_addr) -> bool: called for every /notify; returns
+    whether the sender matched a monitored target.
+    metrics / profiler: StageMetrics and SamplingProfiler to expose (optional).
+    Returns the aiohttp AppRunner (call runner.cleanup() to stop).
+    """
+    async def notify(request):
+        try:
+            payload = await request.json() if request.can_read_body else {}
+        except ValueError:
+            payload = {}
+        target = payload.get('target') if isinstance(payload, dict) else None
+
+        if on_notify(target, request.remote):
+            return web.json_response({'status': 'scheduled'}, status=202)
+        return web.json_response({'status': 'unknown target'}, status=404)
+
+    async def stage_metrics(request):
+        if request.query.get('format') == 'json':
+            return web.json_response({'since_start': metrics.summary()})
+        return web.Response(text=metrics.prometheus(), content_type='text/plain')
+
+    async def profile_start(request):
+        try:
+            seconds = float(request.query.get('seconds', 30))
+            interval = float(request.query.get('interval', 0)) or None
+        except ValueError:
+            return web.json_response({'status': 'bad parameters'}, status=400)
+        started = profiler.start(seconds=seconds, interval=interval)
+        return web.json_response(dict(profiler.status(), started=started),
+                                 status=202 if started else 409)
+
+    async def profile_stop(request):
+        stopped = profiler.stop()
+        return web.json_response(dict(profiler.status(), stopped=stopped))
+
+    async def profile(request):
+        if request.query.get('format') == 'json':
+            return web.json_response(dict(profiler.status(), top=profiler.top()))
+        return web.Response(text=profiler.folded(), content_type='text/plain')
+
+    app = web.Application()
+    if on_notify is not None:
+        app.router.add_post('/notify', notify)
+    if metrics is not None:
+        app.router.add_get('/metrics', stage_metrics)
+    if profiler is not None:
+        app.router.add_post('/profile/start', profile_start)
+        app.router.add_post('/profile/stop', profile_stop)
+        app.router.add_get('/profile', profile)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def serve_in_thread(host='127.0.0.1', port=8081, metrics=None, profiler=None):
+    """Run the endpoint (metrics/profiler only) on its own loop in a daemon thread"""
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start_monitor_server(host=host, port=port,
+                                                 metrics=metrics, profiler=profiler))
+    thread = threading.Thread(target=loop.run_forever, name='monitor-server', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,248 @@
+# Orchestrator Backends
+#
+# Hard healing (restart one patient-app instance) through the orchestrator's
+# API instead of forking kubectl/docker for every action.
+#
+# - KubernetesBackend: in-cluster REST API over one persistent requests
+#   session (keep-alive TLS connection, service-account token read once and
+#   re-read on 401). Deletes a single pod, selected by the target's IP.
+# - DockerBackend: docker SDK client (persistent connection to the daemon
+#   socket), restarts the configured container.
+# - FakeBackend: in-memory "deployment" for offline tests and benchmarks
+#   (benchmarks/bench_orchestrator.py); a deleted pod is replaced by a new
+#   one with a new name, like a ReplicaSet would.
+#
+# All backends share one interface:
+#   restart(target_host=None) -> name of the restarted pod/container
+#   (raises OrchestratorError on failure)
+
+import ipaddress
+import itertools
+import os
+import threading
+import time
+
+SERVICE_ACCOUNT_DIR = '/var/run/secrets/kubernetes.io/serviceaccount'
+
+
+class OrchestratorError(Exception):
+    """A restart could not be carried out"""
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class KubernetesBackend:
+    """
+    Restart pods through the Kubernetes API
+
+    Usage (in-cluster):
+        backend = KubernetesBackend()
+        backend.restart('10.1.2.3')     # deletes the pod with that IP
+    """
+
+    name = 'kubernetes'
+
+    def __init__(self, namespace=None, label_selector='app=patient-app', api_url=None,
+                 token=None, verify=None, timeout=10.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        host = os.environ.get('KUBERNETES_SERVICE_HOST')
+        port = os.environ.get('KUBERNETES_SERVICE_PORT', '443')
+        self.api_url = (api_url or f"https://{host}:{port}").rstrip('/')
+        self.namespace = namespace or os.environ.get('NAMESPACE') or self._read_sa('namespace') or 'default'
+        self.label_selector = label_selector
+        self.timeout = timeout
+
+        self._token = token
+        self._token_from_file = token is None
+
+        # One pooled keep-alive session for all API calls (thread-safe for
+        # the handful of concurrent heals the executor runs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if verify is None:
+            ca_path = os.path.join(SERVICE_ACCOUNT_DIR, 'ca.crt')
+            verify = ca_path if os.path.exists(ca_path) else True
+        self.session.verify = verify
+        self._set_token(self._token if token is not None else self._read_sa('token'))
+
+    @staticmethod
+    def available():
+        """True when running inside a Kubernetes pod with a service account"""
+        return (bool(os.environ.get('KUBERNETES_SERVICE_HOST'))
+                and os.path.exists(os.path.join(SERVICE_ACCOUNT_DIR, 'token')))
+
+    @staticmethod
+    def _read_sa(name):
+        try:
+            with open(os.path.join(SERVICE_ACCOUNT_DIR, name)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _set_token(self, token):
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    def _request(self, method, path, **kwargs):
+        import requests
+
+        url = f"{self.api_url}{path}"
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            # Projected service-account tokens are rotated; reload once
+            if response.status_code == 401 and self._token_from_file:
+                self._set_token(self._read_sa('token'))
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise OrchestratorError(f"Kubernetes API request failed: {e}") from e
+        return response
+
+    def find_pod(self, target_host=None):
+        """Name of the pod serving target_host (an IP), else of one running pod"""
+        if _is_ip(target_host):
+            field_selector = f"status.podIP={target_host}"
+        else:
+            field_selector = 'status.phase=Running'
+
+        response = self._request(
+            'GET', f"/api/v1/namespaces/{self.namespace}/pods",
+            params={'labelSelector': self.label_selector,
+                    'fieldSelector': field_selector, 'limit': 1},
+        )
+        if response.status_code != 200:
+            raise OrchestratorError(f"Listing pods failed ({response.status_code}): {response.text[:200]}")
+
+        items = response.json().get('items', [])
+        return items[0]['metadata']['name'] if items else None
+
+    def delete_pod(self, name):
+        response = self._request('DELETE', f"/api/v1/namespaces/{self.namespace}/pods/{name}")
+        if response.status_code not in (200, 202):
+            raise OrchestratorError(f"Deleting pod {name} failed ({response.status_code}): {response.text[:200]}")
+
+    def restart(self, target_host=None):
+        """Delete one pod (the Deployment recreates it); returns its name"""
+        pod = self.find_pod(target_host)
+        if pod is None:
+            raise OrchestratorError(f"No patient app pod found for {target_host or self.label_selector}")
+        self.delete_pod(pod)
+        return pod
+
+    def close(self):
+        self.session.close()
+
+
+class DockerBackend:
+    """
+    Restart a container through the Docker Engine API (docker SDK)
+
+    The client keeps one connection to the daemon socket for all restarts.
+    """
+
+    name = 'docker'
+
+    def __init__(self, container_name, stop_timeout=10, client=None):
+        if client is None:
+            import docker
+            client = docker.from_env()
+        self.client = client
+        self.container_name = container_name
+        self.stop_timeout = stop_timeout
+
+    def restart(self, target_host=None):
+        """Restart the configured container; returns its name"""
+        import docker
+
+        try:
+            self.client.containers.get(self.container_name).restart(timeout=self.stop_timeout)
+        except docker.errors.DockerException as e:
+            raise OrchestratorError(f"Docker restart failed: {e}") from e
+        return self.container_name
+
+    def close(self):
+        self.client.close()
+
+
+class FakeBackend:
+    """
+    In-memory deployment for offline testing
+
+    Usage:
+        backend = FakeBackend(replicas=3, restart_latency=0.01)
+        backend.restart(backend.pods['patient-app-0'])
+        backend.restarts     # [(timestamp, pod name, ip)]
+    """
+
+    name = 'fake'
+
+    def __init__(self, replicas=3, restart_latency=0.0, subnet='10.0.0.0/16'):
+        self.restart_latency = restart_latency
+        self._hosts = ipaddress.ip_network(subnet).hosts()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.pods = {}
+        self.restarts = []
+        for _ in range(replicas):
+            self._spawn()
+
+    def _spawn(self):
+        name = f"patient-app-{next(self._ids)}"
+        self.pods[name] = str(next(self._hosts))
+        return name
+
+    def find_pod(self, target_host=None):
+        with self._lock:
+            for name, ip in self.pods.items():
+                if target_host is None or not _is_ip(target_host) or ip == target_host:
+                    return name
+        return None
+
+    def delete_pod(self, name):
+        if self.restart_latency:
+            time.sleep(self.restart_latency)
+        with self._lock:
+            ip = self.pods.pop(name, None)
+            if ip is None:
+                raise OrchestratorError(f"Pod {name} not found")
+            self.restarts.append((time.time(), name, ip))
+            self._spawn()
+
+    def restart(self, target_host=None):
+        pod = self.find_pod(target_host)
+        if pod is None:
+            raise OrchestratorError(f"No patient app pod found for {target_host}")
+        self.delete_pod(pod)
+        return pod
+
+    def close(self):
+        pass
+
+
+def create_backend(kind='auto', container_name='patient-app', namespace=None):
+    """
+    Build an orchestrator backend
+
+    kind: 'auto' (Kubernetes when running in-cluster, else Docker),
+    'kubernetes', 'docker' or 'fake'
+    """
+    if kind == 'auto':
+        kind = 'kubernetes' if KubernetesBackend.available() else 'docker'
+    if kind == 'kubernetes':
+        return KubernetesBackend(namespace=namespace)
+    if kind == 'docker':
+        return DockerBackend(container_name)
+    if kind == 'fake':
+        return FakeBackend()
+    raise ValueError(f"Unknown orchestrator backend: {kind}")
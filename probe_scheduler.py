@@ -0,0 +1,175 @@
+# Adaptive Probe Scheduler
+#
+# Decides when each target is probed next, instead of probing every target
+# every check_interval seconds.
+#
+# - Targets live in a min-heap keyed by their next due time; popping the due
+#   targets and finding the next deadline are O(log n)
+# - After each probe the target's interval adapts to what the probe showed:
+#     failed probe, degraded status, a healing action, rising error count
+#       -> min_interval (watch closely)
+#     healthy but the model is unsure (confidence < stable_confidence)
+#       -> base_interval
+#     healthy and confidently "no action"
+#       -> interval * backoff, up to max_interval
+# - notify(target) makes a target due immediately; the patient app pushes
+#   these when its error count rises (see monitor_server.py), so a backed-off
+#   pod is still probed within milliseconds of an incident. A notification
+#   that arrives while the target's probe is in flight is kept and the
+#   target is probed again as soon as that probe is reported, since the
+#   probe may have read /health before the error count rose
+#
+# Stale heap entries (a target rescheduled or removed before its entry came
+# up) are skipped lazily via a per-target sequence number.
+
+import heapq
+import itertools
+import time
+
+
+class _Schedule:
+    """Probe state of one target"""
+
+    __slots__ = ('interval', 'due', 'seq', 'last_errors', 'notified')
+
+    def __init__(self, interval, due, seq):
+        self.interval = interval
+        self.due = due
+        self.seq = seq
+        self.last_errors = None
+        # notify() while the probe was in flight (seq == -1)
+        self.notified = False
+
+
+class ProbeScheduler:
+    """
+    Priority-queue probe scheduler with per-target adaptive intervals
+
+    Usage:
+        scheduler = ProbeScheduler()
+        scheduler.add(target)
+        for target in scheduler.pop_due():
+            health = probe(target)
+            scheduler.report(target, health, healing_action, confidence)
+        time.sleep(scheduler.delay())
+    """
+
+    def __init__(self, base_interval=5.0, min_interval=2.0, max_interval=60.0,
+                 backoff=2.0, stable_confidence=0.75, clock=time.monotonic):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.stable_confidence = stable_confidence
+        self.clock = clock
+
+        self._heap = []
+        self._targets = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._targets)
+
+    def __contains__(self, target):
+        return target in self._targets
+
+    def _push(self, target, schedule, due):
+        schedule.due = due
+        schedule.seq = next(self._seq)
+        heapq.heappush(self._heap, (due, schedule.seq, target))
+
+    def add(self, target, delay=0.0):
+        """Start probing a target (first probe after `delay` seconds)"""
+        if target in self._targets:
+            return
+        schedule = _Schedule(self.base_interval, 0.0, 0)
+        self._targets[target] = schedule
+        self._push(target, schedule, self.clock() + delay)
+
+    def remove(self, target):
+        self._targets.pop(target, None)
+
+    def sync(self, targets):
+        """Make the scheduled set equal to `targets`; returns removed targets"""
+        wanted = set(targets)
+        removed = [target for target in self._targets if target not in wanted]
+        for target in removed:
+            self.remove(target)
+        for target in targets:
+            self.add(target)
+        return removed
+
+    def notify(self, target):
+        """Probe a target as soon as possible (push notification)"""
+        schedule = self._targets.get(target)
+        if schedule is None:
+            return False
+        schedule.interval = self.min_interval
+        if schedule.seq == -1:
+            schedule.notified = True
+        elif schedule.due > self.clock():
+            self._push(target, schedule, self.clock())
+        return True
+
+    def pop_due(self, now=None):
+        """Remove and return all targets whose probe is due"""
+        now = self.clock() if now is None else now
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, target = heapq.heappop(heap)
+            schedule = self._targets.get(target)
+            if schedule is not None and schedule.seq == seq:
+                schedule.seq = -1
+                due.append(target)
+        return due
+
+    def delay(self, now=None):
+        """Seconds until the next probe is due (None if nothing is scheduled)"""
+        now = self.clock() if now is None else now
+        heap = self._heap
+        while heap:
+            due, seq, target = heap[0]
+            schedule = self._targets.get(target)
+            if schedule is not None and schedule.seq == seq:
+                return max(0.0, due - now)
+            heapq.heappop(heap)
+        return None
+
+    def report(self, target, health_data, healing_action=None, confidence=None):
+        """
+        Reschedule a target after its probe; returns the new interval
+
+        health_data: /health payload (None if the probe failed)
+        confidence:  ML confidence of the decision, if the model was used
+        """
+        schedule = self._targets.get(target)
+        if schedule is None:
+            return None
+
+        errors = health_data.get('error_count', 0) if health_data else None
+        rising = (errors is not None and schedule.last_errors is not None
+                  and errors > schedule.last_errors)
+        schedule.last_errors = errors
+
+        if (health_data is None or healing_action or rising
+                or health_data.get('status', 'healthy') != 'healthy'):
+            interval = self.min_interval
+        elif confidence is not None and confidence < self.stable_confidence:
+            interval = self.base_interval
+        else:
+            interval = min(self.max_interval,
+                           max(schedule.interval, self.base_interval) * self.backoff)
+
+        schedule.interval = interval
+        if schedule.notified:
+            schedule.notified = False
+            schedule.interval = self.min_interval
+            self._push(target, schedule, self.clock())
+        elif schedule.seq == -1 or schedule.due > self.clock() + interval:
+            self._push(target, schedule, self.clock() + interval)
+        return schedule.interval
+
+    def interval(self, target):
+        schedule = self._targets.get(target)
+        return schedule.interval if schedule else None
@@ -0,0 +1,446 @@
+# Offline Replay Harness for the Monitor
+#
+# Runs the monitor's real fleet pipeline (probe -> record -> analyze ->
+# dispatch healing) against thousands of virtual patient apps, without a
+# cluster:
+#
+# - Stub patient server (separate process, aiohttp): every virtual target is
+#   its own loopback address (127.1.x.y, one port), so targets have distinct
+#   names and connections exactly like pods behind a headless service. It
+#   serves /health from a synthetic scenario mix or a recorded stream and
+#   applies POST /heal like the real app.
+# - ReplayOrchestrator: restarts go to the stub, which knows whether the
+#   target actually had a persistent fault (restart warranted) or not (false
+#   restart).
+# - Virtual clock: one tick = check_interval (5s) of virtual time for the
+#   probe scheduler, healing cooldowns and the metrics history; ticks run
+#   back to back in real time.
+#
+# Synthetic scenarios (per target, seeded):
+#   steady   nominal CPU/memory, a rare error
+#   flaky    frequent errors; soft healing (reset) is the right fix
+#   spike    nominal, with one-tick CPU+memory spikes (a restart is false)
+#   failing  nominal until a persistent fault starts: CPU and memory pinned
+#            above 90%, errors climbing every tick; only a restart clears it
+#
+# Recorded streams are JSON lines {"target": id, "tick": n, "health": {...},
+# "fault": bool}; run with record_path to write one from a synthetic run.
+# Replay is open loop: the stream plays back as recorded, only heals and
+# restarts by the monitor under test offset the error counts it serves.
+#
+# Usage: see benchmarks/bench_monitor_replay.py
+
+import asyncio
+import contextlib
+import io
+import ipaddress
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import time
+
+SCENARIOS = ('steady', 'flaky', 'spike', 'failing')
+DEFAULT_MIX = {'steady': 0.80, 'flaky': 0.10, 'spike': 0.05, 'failing': 0.05}
+
+TARGET_NETWORK = '127.1.0.0/16'
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def target_hosts(n_targets):
+    """Loopback address of each virtual target"""
+    hosts = ipaddress.ip_network(TARGET_NETWORK).hosts()
+    return [str(next(hosts)) for _ in range(n_targets)]
+
+
+# ----------------------------------------------------------------------
+# Stub patient fleet (runs in its own process)
+# ----------------------------------------------------------------------
+
+class _VirtualTarget:
+    __slots__ = ('kind', 'rng', 'cpu', 'memory', 'errors', 'started', 'fault',
+                 'fault_at', 'fault_start', 'current')
+
+    def __init__(self, kind, rng, ticks):
+        self.kind = kind
+        self.rng = rng
+        self.cpu = rng.randint(15, 60)
+        self.memory = rng.randint(25, 60)
+        self.errors = 0
+        self.started = 0
+        self.fault = False
+        self.fault_start = None
+        self.fault_at = rng.randint(ticks // 10, max(ticks // 10, 3 * ticks // 4)) \
+            if kind == 'failing' else None
+        self.current = (self.cpu, self.memory)
+
+
+class StubFleet:
+    """Virtual patient apps, advanced one tick at a time"""
+
+    def __init__(self, hosts, ticks, mix=None, seed=0, records=None):
+        self.hosts = hosts
+        self.tick = 0
+        self.stats = {'probes': 0, 'heals': 0, 'restarts': 0, 'false_restarts': 0,
+                      'faults': 0, 'time_to_restart': []}
+
+        rng = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        self.targets = {
+            host: _VirtualTarget(rng.choices(kinds, weights)[0], random.Random(rng.random()), ticks)
+            for host in hosts
+        }
+        self.kinds = {kind: sum(t.kind == kind for t in self.targets.values()) for kind in SCENARIOS}
+
+        # Recorded health per (host, tick); in replay mode target.errors is
+        # the recorded error count at the last heal/restart (subtracted)
+        self.recorded = None
+        if records is not None:
+            self.recorded = {(hosts[r['target']], r['tick']): r for r in records}
+            self.kinds = {'recorded': len(hosts)}
+            self.stats['faults'] = sum(
+                1 for r in records if r.get('fault')
+                and not self.recorded.get((hosts[r['target']], r['tick'] - 1), {}).get('fault'))
+
+    def advance(self):
+        """Move every target to the next tick"""
+        self.tick += 1
+        if self.recorded is not None:
+            return
+        for target in self.targets.values():
+            rng = target.rng
+            if target.kind == 'steady' and rng.random() < 0.02:
+                target.errors += 1
+            elif target.kind == 'flaky' and rng.random() < 0.3:
+                target.errors += 1
+            elif target.kind == 'failing':
+                if not target.fault and self.tick == target.fault_at:
+                    target.fault = True
+                    target.fault_start = self.tick
+                    self.stats['faults'] += 1
+                if target.fault:
+                    target.errors += 6
+
+            if target.fault or (target.kind == 'spike' and rng.random() < 0.05):
+                target.current = (rng.randint(92, 99), rng.randint(92, 99))
+            else:
+                target.current = (
+                    min(100, max(0, target.cpu + rng.randint(-3, 3))),
+                    min(100, max(0, target.memory + rng.randint(-3, 3))),
+                )
+
+    def _record(self, host):
+        return self.recorded.get((host, self.tick)) or {}
+
+    def _errors(self, host):
+        target = self.targets[host]
+        if self.recorded is not None:
+            recorded = (self._record(host).get('health') or {}).get('error_count', 0)
+            return max(0, recorded - target.errors)
+        return target.errors
+
+    def _reset_errors(self, host):
+        target = self.targets[host]
+        if self.recorded is not None:
+            target.errors = (self._record(host).get('health') or {}).get('error_count', 0)
+        else:
+            target.errors = 0
+
+    def health(self, host):
+        """/health payload of a target at the current tick"""
+        target = self.targets[host]
+        errors = self._errors(host)
+        if self.recorded is not None:
+            health = dict(self._record(host).get('health') or {})
+            health['error_count'] = errors
+            return health
+
+        cpu, memory = target.current
+        return {
+            'status': 'degraded' if errors > 5 else 'healthy',
+            'cpu_usage': cpu,
+            'memory_usage': memory,
+            'error_count': errors,
+            'uptime': (self.tick - target.started) * 5,
+        }
+
+    def heal(self, host):
+        """Soft heal (POST /heal); returns the previous error count"""
+        self.stats['heals'] += 1
+        previous = self._errors(host)
+        self._reset_errors(host)
+        return previous
+
+    def restart(self, host):
+        """Restart a target; returns whether the restart was warranted"""
+        target = self.targets[host]
+        self.stats['restarts'] += 1
+        if self.recorded is not None:
+            warranted = bool(self._record(host).get('fault'))
+            start = self.tick
+            while warranted and self.recorded.get((host, start - 1), {}).get('fault'):
+                start -= 1
+            target.fault_start = start
+        else:
+            warranted = target.fault
+        if warranted and target.fault_start is not None:
+            self.stats['time_to_restart'].append(self.tick - target.fault_start)
+        if not warranted:
+            self.stats['false_restarts'] += 1
+
+        self._reset_errors(host)
+        target.fault = False
+        target.fault_start = None
+        target.started = self.tick
+        return warranted
+
+    def snapshot(self):
+        """Current health of every target, as recorded-stream lines"""
+        return [
+            {'target': index, 'tick': self.tick, 'health': self.health(host),
+             'fault': self.targets[host].fault}
+            for index, host in enumerate(self.hosts)
+        ]
+
+
+def serve_stub(port_queue, n_targets, ticks, mix, seed, records_path, record_path):
+    """Stub server process entry point"""
+    from aiohttp import web
+
+    hosts = target_hosts(n_targets)
+    records = None
+    if records_path:
+        with open(records_path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    fleet = StubFleet(hosts, ticks, mix, seed, records)
+    record_file = open(record_path, 'w') if record_path else None
+
+    def host_of(request):
+        return request.host.rpartition(':')[0]
+
+    async def health(request):
+        fleet.stats['probes'] += 1
+        return web.json_response(fleet.health(host_of(request)))
+
+    async def heal(request):
+        previous = fleet.heal(host_of(request))
+        return web.json_response({
+            'message': 'Self-healing completed', 'action': 'Errors reset',
+            'previous_error_count': previous, 'current_status': 'healthy',
+        })
+
+    async def restart(request):
+        payload = await request.json()
+        if payload['target'] not in fleet.targets:
+            return web.json_response({'error': 'unknown target'}, status=404)
+        return web.json_response({'warranted': fleet.restart(payload['target'])})
+
+    async def tick(request):
+        fleet.advance()
+        if record_file:
+            for line in fleet.snapshot():
+                record_file.write(json.dumps(line) + '\n')
+        return web.json_response({'tick': fleet.tick})
+
+    async def stats(request):
+        if record_file:
+            record_file.flush()
+        return web.json_response({**fleet.stats, 'kinds': fleet.kinds})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/health', health)
+        app.router.add_post('/heal', heal)
+        app.router.add_post('/_restart', restart)
+        app.router.add_post('/_tick', tick)
+        app.router.add_get('/_stats', stats)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+
+        # Any address (targets are 127.1.x.y), ephemeral port
+        sock = socket.socket()
+        sock.bind(('0.0.0.0', 0))
+        await web.SockSite(runner, sock, backlog=4096).start()
+        port_queue.put(sock.getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+# ----------------------------------------------------------------------
+# Monitor side
+# ----------------------------------------------------------------------
+
+class VirtualClock:
+    """Settable clock shared by scheduler, executor and history"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayOrchestrator:
+    """Orchestrator backend that restarts virtual targets on the stub"""
+
+    name = 'replay'
+
+    def __init__(self, control_url):
+        import requests
+        self.control_url = control_url
+        self.session = requests.Session()
+        self.warranted = 0
+
+    def restart(self, target_host=None):
+        from orchestrator import OrchestratorError
+
+        response = self.session.post(f"{self.control_url}/_restart",
+                                     json={'target': target_host}, timeout=5)
+        if response.status_code != 200:
+            raise OrchestratorError(f"Stub restart failed ({response.status_code})")
+        self.warranted += response.json()['warranted']
+        return target_host
+
+    def close(self):
+        self.session.close()
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+async def _run(monitor, n_targets, ticks, port, adaptive, max_concurrency):
+    import aiohttp
+
+    from fleet_poller import FleetPoller, target_from_url
+    from healing_executor import HealingExecutor
+    from probe_scheduler import ProbeScheduler
+
+    clock = VirtualClock()
+    interval = monitor.check_interval
+    monitor.clock = lambda: 1.7e9 + clock.now
+    monitor.executor = HealingExecutor(clock=clock, restart_budget=monitor.executor.restart_budget,
+                                       budget_window=monitor.executor.budget_window,
+                                       on_error=monitor.executor.on_error)
+    if adaptive:
+        scheduler = ProbeScheduler(base_interval=interval, min_interval=monitor.min_probe_interval,
+                                   max_interval=monitor.max_probe_interval, clock=clock)
+    else:
+        scheduler = ProbeScheduler(base_interval=interval, min_interval=interval,
+                                   max_interval=interval, backoff=1.0, clock=clock)
+
+    targets = [target_from_url(f"http://{host}:{port}") for host in target_hosts(n_targets)]
+    control = f"http://127.0.0.1:{port}"
+    for target in targets:
+        scheduler.add(target)
+
+    tick_latencies = []
+    decisions = 0
+    rss_before = _rss_bytes()
+
+    async with aiohttp.ClientSession() as control_session, \
+            FleetPoller(max_concurrency, timeout=5.0) as poller:
+        for tick in range(ticks):
+            await control_session.post(f"{control}/_tick")
+            clock.now = (tick + 1) * interval
+
+            due = scheduler.pop_due()
+            start = time.perf_counter()
+            if due:
+                await monitor._probe_fleet(poller, scheduler, due, len(targets), start)
+            tick_latencies.append(time.perf_counter() - start)
+            decisions += len(due)
+
+            # Heals are asynchronous by design; let them land before the next
+            # virtual tick so the replay is repeatable
+            while monitor.executor.pending():
+                await asyncio.sleep(0.001)
+
+        async with control_session.get(f"{control}/_stats") as response:
+            stub_stats = await response.json()
+
+    return tick_latencies, decisions, _rss_bytes() - rss_before, stub_stats
+
+
+def run_replay(n_targets=1000, ticks=60, mix=None, seed=0, adaptive=False,
+               max_concurrency=256, records_path=None, record_path=None,
+               model_path=None, history_dir=None, quiet=True):
+    """
+    Replay a fleet through DoctorMonitorML's pipeline; returns a results dict
+
+    adaptive: use the adaptive probe scheduler (default: every target every tick)
+    model_path: model to load (default: the shipped app/healing_brain_forest)
+    records_path: replay a recorded stream instead of synthetic scenarios
+    record_path: write the synthetic stream that was served
+    history_dir: persist the monitor's observations (history_store.py)
+    """
+    context = multiprocessing.get_context('spawn')
+    port_queue = context.Queue()
+    stub = context.Process(
+        target=serve_stub, daemon=True,
+        args=(port_queue, n_targets, ticks, mix, seed, records_path, record_path))
+    stub.start()
+    try:
+        port = port_queue.get(timeout=30)
+        # Imported before redirecting: the module rebinds sys.stdout
+        from doctor_monitor_ml import DoctorMonitorML
+
+        output = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            model_path = model_path or os.path.join(ROOT, 'app', 'healing_brain_forest')
+            kwargs = {'model_path': model_path,
+                      'fallback_model_path': os.path.join(ROOT, 'app', 'healing_brain.pkl'),
+                      'history_dir': history_dir}
+            orchestrator = ReplayOrchestrator(f"http://127.0.0.1:{port}")
+            monitor = DoctorMonitorML(f"http://127.0.0.1:{port}", orchestrator=orchestrator,
+                                      restart_budget=max(3, n_targets // 20), **kwargs)
+            latencies, decisions, rss_delta, stub_stats = asyncio.run(
+                _run(monitor, n_targets, ticks, port, adaptive, max_concurrency))
+            monitor.executor.shutdown()
+            monitor.events.close()
+            if monitor.history_store is not None:
+                monitor.history_store.close()
+    finally:
+        stub.terminate()
+        stub.join()
+
+    latencies.sort()
+    busy = sum(latencies)
+    sources = dict(monitor.decisions.stats) if monitor.use_ml else {}
+    if monitor.anomalies is not None:
+        sources['filter'] = monitor.anomalies.stats['normal']
+    restarts = stub_stats['restarts']
+    time_to_restart = stub_stats['time_to_restart']
+    return {
+        'targets': n_targets,
+        'ticks': ticks,
+        'scenarios': stub_stats['kinds'],
+        'decisions': decisions,
+        'decisions_per_second': decisions / busy if busy else 0.0,
+        'tick_p50_ms': statistics.median(latencies) * 1000,
+        'tick_p99_ms': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        # RSS growth over the run; approximate, and near zero when an earlier
+        # run in the same process already grew the heap
+        'memory_per_target_bytes': rss_delta / n_targets,
+        'probes': stub_stats['probes'],
+        'soft_heals': stub_stats['heals'],
+        'restarts': restarts,
+        'false_restarts': stub_stats['false_restarts'],
+        'false_restart_rate': stub_stats['false_restarts'] / restarts if restarts else 0.0,
+        'faults': stub_stats['faults'],
+        'faults_restarted': len(time_to_restart),
+        'time_to_restart_ticks': statistics.median(time_to_restart) if time_to_restart else None,
+        'decision_sources': sources,
+        # Per-stage latency inside the monitor (monitor_metrics.py)
+        'stages': monitor.stages.summary(),
+    }
@@ -0,0 +1,222 @@
+# Sharded Monitoring
+#
+# Splits the fleet across N monitor workers (processes on one node, or
+# monitor replicas) so monitoring capacity grows with cores, without two
+# workers ever healing the same pod.
+#
+# - Consistent hashing: each worker is placed on a 64-bit hash ring at
+#   `vnodes` points; a target belongs to the first worker point clockwise of
+#   the target name's hash. Adding or removing a worker only moves the
+#   targets in its arcs (~1/N of the fleet), and every worker computes the
+#   same owner from the same membership, so there is no leader and no
+#   assignment protocol.
+# - Membership: who the workers are, from
+#     FileMembership  heartbeat files in a shared directory (local workers,
+#                     or replicas sharing a volume); a member whose file is
+#                     older than `ttl` has left
+#     DnsMembership   addresses of a headless service (monitor replicas);
+#                     Kubernetes drops a pod from it once it is not ready
+#                     (the pod's own IP is its member id)
+#     StaticMembership  a fixed list
+# - Handoff: views of the membership can briefly differ while a worker joins
+#   or leaves. A worker stops healing a target as soon as its own view says
+#   it lost it, and only starts healing a target it gained after owning it
+#   for `settle` seconds (longer than it takes every worker to refresh its
+#   view), so the old and the new owner never heal the same pod. Probing and
+#   history start right away; only healing waits.
+
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+import time
+
+
+def ring_hash(key):
+    """Stable 64-bit position of a key on the ring (same in every process)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring of member ids
+
+    Usage:
+        ring = HashRing(['shard-0', 'shard-1', 'shard-2'])
+        ring.owner('10.0.3.17:5000')   # -> 'shard-1'
+    """
+
+    def __init__(self, members, vnodes=256):
+        self.members = sorted(set(members))
+        self.vnodes = vnodes
+        points = sorted(
+            (ring_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key):
+        """Member owning a key (None on an empty ring)"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, ring_hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class StaticMembership:
+    """Fixed member list"""
+
+    def __init__(self, members):
+        self._members = sorted(members)
+
+    async def members(self):
+        return self._members
+
+    def leave(self):
+        pass
+
+
+class FileMembership:
+    """
+    Heartbeat files in a shared directory
+
+    Every refresh touches <directory>/<member_id>; members are the files
+    touched within the last `ttl` seconds. leave() removes the file so the
+    others rebalance at their next refresh instead of after `ttl`.
+    """
+
+    def __init__(self, directory, member_id, ttl=15.0, clock=time.time):
+        self.directory = directory
+        self.member_id = member_id
+        self.ttl = ttl
+        self.clock = clock
+        self._path = os.path.join(directory, member_id)
+        os.makedirs(directory, exist_ok=True)
+
+    async def members(self):
+        now = self.clock()
+        with open(self._path, 'w') as f:
+            f.write(str(os.getpid()))
+        os.utime(self._path, (now, now))
+
+        members = []
+        for name in os.listdir(self.directory):
+            try:
+                if now - os.stat(os.path.join(self.directory, name)).st_mtime <= self.ttl:
+                    members.append(name)
+            except FileNotFoundError:
+                continue
+        return sorted(members)
+
+    def leave(self):
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class DnsMembership:
+    """
+    Addresses behind a (headless) service name; member ids are the addresses
+
+    ttl: how long a stale answer can be served (cluster DNS cache), so a
+    worker's view may lag a join or leave by up to this long.
+    """
+
+    def __init__(self, hostname, ttl=30.0):
+        self.hostname = hostname
+        self.ttl = ttl
+
+    async def members(self):
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(self.hostname, None, type=socket.SOCK_STREAM)
+        return sorted({info[4][0] for info in infos})
+
+    def leave(self):
+        pass
+
+
+class Shard:
+    """
+    This worker's share of the fleet
+
+    Usage:
+        shard = Shard(FileMembership('/run/monitor-shards', 'shard-0'), 'shard-0')
+        await shard.refresh()              # every refresh_interval
+        owned = shard.assign(all_targets)  # probe only these
+        if shard.may_heal(target.name): ...
+    """
+
+    def __init__(self, membership, member_id, vnodes=256, refresh_interval=5.0,
+                 settle=None, clock=time.monotonic):
+        self.membership = membership
+        self.member_id = member_id
+        self.vnodes = vnodes
+        self.refresh_interval = refresh_interval
+        # Every other worker sees a membership change within its view's
+        # staleness (ttl) plus a refresh interval
+        ttl = getattr(membership, 'ttl', 0.0)
+        self.settle = settle if settle is not None else ttl + 2 * refresh_interval
+        self.clock = clock
+
+        self.ring = HashRing([member_id], vnodes)
+        self.last_refresh = None
+        self._owned_since = {}
+        self.stats = {'members': 1, 'owned': 0, 'rebalances': 0, 'gained': 0, 'lost': 0}
+
+    async def refresh(self):
+        """Re-read the membership; returns whether the ring changed"""
+        self.last_refresh = self.clock()
+        try:
+            members = await self.membership.members()
+        except OSError as e:
+            print(f"   ⚠️ Shard membership refresh failed, keeping the current ring: {e}")
+            return False
+
+        # Our own view always includes us (a DNS record may lag our readiness)
+        members = sorted(set(members) | {self.member_id})
+        if members == self.ring.members:
+            return False
+        self.ring = HashRing(members, self.vnodes)
+        self.stats['members'] = len(members)
+        self.stats['rebalances'] += 1
+        return True
+
+    def refresh_due(self):
+        return self.last_refresh is None or self.clock() - self.last_refresh >= self.refresh_interval
+
+    def owns(self, name):
+        return self.ring.owner(name) == self.member_id
+
+    def assign(self, targets):
+        """The targets this worker owns under its current view"""
+        now = self.clock()
+        owned = [target for target in targets if self.owns(target.name)]
+        owned_names = {target.name for target in owned}
+
+        lost = [name for name in self._owned_since if name not in owned_names]
+        for name in lost:
+            del self._owned_since[name]
+        # Including at startup: a worker cannot tell whether another one was
+        # healing the target a moment ago
+        gained = 0
+        for name in owned_names:
+            if name not in self._owned_since:
+                self._owned_since[name] = now
+                gained += 1
+
+        self.stats['owned'] = len(owned)
+        self.stats['gained'] += gained
+        self.stats['lost'] += len(lost)
+        return owned
+
+    def may_heal(self, name):
+        """Owned, and long enough that any previous owner has let go"""
+        since = self._owned_since.get(name)
+        return since is not None and self.clock() - since >= self.settle
+
+    def leave(self):
+        self.membership.leave()
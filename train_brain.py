@@ -1,50 +1,135 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import json
+import time
+import argparse
+import os
+import shutil
+import tempfile
 from datetime import datetime
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+from compiled_forest import CompiledForest
+from inference_brain import InferenceBrain
+from metrics_history import MetricsHistory, batch_features, windows_for
 
-class HealingBrain:
+try:
+    import resource  # Unix only; used for peak RSS
+except ImportError:
+    resource = None
+
+# The monitor's shortest and longest probe interval in seconds (probe
+# scheduler: degrading targets every 2s, stable ones backed off up to 300s
+# with push notifications); synthetic history is sampled across this range
+PROBE_INTERVALS = (2.0, 300.0)
+
+class StageReport:
+    """
+    Wall time and peak memory per training stage
+    
+    max_rss_mb:     process peak resident set size so far
+    peak_traced_mb: peak memory allocated during the stage (tracemalloc,
+                    covers NumPy/pandas buffers); only with
+                    trace_memory=True, since tracing every allocation slows
+                    the timed stages down
+    A stage entered several times (incremental training) is accumulated.
+    """
+    
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+    
+    @contextmanager
+    def stage(self, name):
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+            
+            entry = self.stages.setdefault(
+                name, {'seconds': 0.0, 'calls': 0, 'peak_traced_mb': None, 'max_rss_mb': None}
+            )
+            entry['seconds'] += elapsed
+            entry['calls'] += 1
+            if peak is not None:
+                entry['peak_traced_mb'] = max(entry['peak_traced_mb'] or 0.0, peak / 2**20)
+            if resource is not None:
+                # ru_maxrss is in KiB on Linux
+                entry['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    
+    def print(self):
+        print("\n⏱️  Stage Report:")
+        print(f"  {'stage':<10}{'calls':>7}{'time':>11}{'peak alloc':>13}{'max RSS':>11}")
+        for name, entry in self.stages.items():
+            rss = f"{entry['max_rss_mb']:.0f}MB" if entry['max_rss_mb'] is not None else "n/a"
+            peak = f"{entry['peak_traced_mb']:.0f}MB" if entry['peak_traced_mb'] is not None else "n/a"
+            print(f"  {name:<10}{entry['calls']:>7}{entry['seconds']:>10.2f}s"
+                  f"{peak:>13}{rss:>11}")
+
+class HealingBrain(InferenceBrain):
     """
     ML-based brain that learns patterns and recommends healing actions
+    
+    Inference (predict_action / predict_batch) comes from InferenceBrain;
+    this class adds training, the sklearn model and model export.
     """
     
-    def __init__(self):
+    # Up to this many rows, inference uses the compiled NumPy evaluator;
+    # larger batches go through sklearn's predict_proba
+    compiled_max_batch = 1024
+    
+    def __init__(self, history_windows=()):
+        """
+        history_windows: optional rolling windows (in seconds) from
+        metrics_history.MetricsHistory. When set, the model also uses the
+        rolling mean/max/slope/EWMA features of each health metric.
+        """
+        super().__init__(history_windows)
         self.model = None
-        self.feature_names = [
-            'cpu_usage',
-            'memory_usage',
-            'error_count',
-            'uptime',
-            'hour_of_day'
-        ]
-        
-    def generate_training_data(self, n_samples=1000):
-        """Generate synthetic training data"""
-        print(f"📊 Generating {n_samples} training samples...")
         
-        data = []
+    def generate_training_chunks(self, n_samples, chunk_size=250_000, seed=None):
+        """
+        Generate synthetic training data in vectorized chunks
         
-        for _ in range(n_samples):
-            cpu = np.random.randint(0, 100)
-            memory = np.random.randint(0, 100)
-            errors = np.random.randint(0, 20)
-            uptime = np.random.randint(0, 86400)  # seconds in a day
-            hour = np.random.randint(0, 24)
+        Yields DataFrames of at most chunk_size rows. Every column is drawn
+        and labeled with array operations, so memory is bounded by the chunk
+        size and 10M+ rows are practical.
+        """
+        rng = np.random.default_rng(seed)
+        remaining = n_samples
+        
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            remaining -= n
+            
+            cpu = rng.integers(0, 100, n, dtype=np.int32)
+            memory = rng.integers(0, 100, n, dtype=np.int32)
+            errors = rng.integers(0, 20, n, dtype=np.int32)
+            uptime = rng.integers(0, 86400, n, dtype=np.int32)  # seconds in a day
+            hour = rng.integers(0, 24, n, dtype=np.int32)
             
             # Determine healing action based on rules
             # 0 = no action, 1 = reset_errors, 2 = restart_service
-            if errors > 10 or (cpu > 90 and memory > 90):
-                action = 2  # restart_service
-            elif errors > 5 or cpu > 80 or memory > 80:
-                action = 1  # reset_errors
-            else:
-                action = 0  # no action
+            restart = (errors > 10) | ((cpu > 90) & (memory > 90))
+            reset = (errors > 5) | (cpu > 80) | (memory > 80)
+            action = np.where(restart, 2, np.where(reset, 1, 0)).astype(np.int8)
             
-            data.append({
+            df = pd.DataFrame({
                 'cpu_usage': cpu,
                 'memory_usage': memory,
                 'error_count': errors,
@@ -52,41 +137,201 @@ class HealingBrain:
                 'hour_of_day': hour,
                 'healing_action': action
             })
+            if self.history_windows:
+                df = self._add_history_features(df, rng)
+            yield df
+    
+    def generate_training_data(self, n_samples=1000, chunk_size=250_000, seed=None):
+        """Generate synthetic training data"""
+        print(f"📊 Generating {n_samples} training samples...")
         
-        return pd.DataFrame(data)
+        chunks = list(self.generate_training_chunks(n_samples, chunk_size, seed))
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
     
-    def train(self, df=None):
-        """Train the healing brain model"""
-        print("\n🧠 Training Healing Brain...")
+    def history_training_data(self, path, start=None, end=None):
+        """
+        Training rows from a monitor history store (history_store.py)
         
-        # Generate data if not provided
-        if df is None:
-            df = self.generate_training_data()
+        One row per successful probe in [start, end), labeled with the action
+        the monitor decided. Those labels reproduce the current policy, so
+        real history is best mixed with synthetic data (see main()). Rolling
+        history features are rebuilt per target with MetricsHistory, exactly
+        as the monitor computes them.
+        """
+        from history_store import HistoryStore
         
-        # Prepare features and target
-        X = df[self.feature_names]
-        y = df['healing_action']
+        records = HistoryStore(path, readonly=True).read(start, end)
+        records = records[records['action'] >= 0]
+        print(f"📚 Loaded {len(records)} observed samples from: {path}")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        hours = pd.to_datetime(records['timestamp'], unit='s', utc=True) \
+            .tz_convert(datetime.now().astimezone().tzinfo).hour
+        df = pd.DataFrame({
+            'cpu_usage': records['cpu_usage'].astype(np.int32),
+            'memory_usage': records['memory_usage'].astype(np.int32),
+            'error_count': records['error_count'].astype(np.int32),
+            'uptime': records['uptime'].astype(np.int32),
+            'hour_of_day': np.asarray(hours, dtype=np.int32),
+            'healing_action': records['action'].astype(np.int8),
+        })
         
-        print(f"  Training samples: {len(X_train)}")
-        print(f"  Test samples: {len(X_test)}")
+        if self.history_windows:
+            # Replayed a tick at a time: the monitor writes each tick's
+            # records with one timestamp, one record per target
+            history = MetricsHistory(windows=self.history_windows)
+            timestamps = records['timestamp']
+            ticks = np.flatnonzero(np.diff(timestamps)) + 1
+            rows = []
+            for first, last in zip(np.r_[0, ticks], np.r_[ticks, len(records)]):
+                tick = records[first:last]
+                targets = tick['target'].tolist()
+                samples = [{'cpu_usage': cpu, 'memory_usage': memory, 'error_count': errors}
+                           for cpu, memory, errors in zip(tick['cpu_usage'].tolist(),
+                                                          tick['memory_usage'].tolist(),
+                                                          tick['error_count'].tolist())]
+                if len(set(targets)) == len(targets):
+                    history.add_batch(targets, float(timestamps[first]), samples)
+                    rows.extend(history.features_batch(targets))
+                    continue
+                # Ticks merged by a clamped clock step: one record at a time
+                for target, sample in zip(targets, samples):
+                    history.add(target, float(timestamps[first]), sample)
+                    rows.append(history.features(target))
+            df = df.assign(**pd.DataFrame(rows, index=df.index))
+        return df
+    
+    def _add_history_features(self, df, rng, intervals=PROBE_INTERVALS, length=64):
+        """
+        Synthesize the sample history leading up to each row
+        
+        The monitor probes a degrading target every few seconds and backs a
+        stable one off to minutes, so each row's series is sampled at its own
+        interval, drawn log-uniformly from `intervals` (seconds) with +-20%
+        jitter per sample; `length` is the monitor's history capacity. The
+        series is steady around the final values, a short spike (low
+        baseline, jump on the last sample) or a ramp towards them over the
+        largest window. The rolling features are computed from that series
+        and the label is tightened so that only sustained problems lead to
+        restart_service; spikes get at most reset_errors.
+        """
+        n = len(df)
+        window = max(self.history_windows)
+        kind = rng.integers(0, 3, size=(n, 1))  # 0 steady, 1 spike, 2 ramp
+        
+        low, high = np.log(intervals[0]), np.log(intervals[1])
+        interval = np.exp(rng.uniform(low, high, size=(n, 1)))
+        steps = interval * rng.uniform(0.8, 1.2, size=(n, length - 1))
+        timestamps = np.concatenate([np.zeros((n, 1)), np.cumsum(steps, axis=1)], axis=1)
+        progress = np.clip(1 - (timestamps[:, -1:] - timestamps) / window, 0, 1)
+        
+        def series(final, start, steady):
+            final = final.reshape(-1, 1)
+            start = start.reshape(-1, 1)
+            ramp = start + (final - start) * progress
+            spike = np.repeat(start, length, axis=1)
+            values = np.where(kind == 0, steady, np.where(kind == 1, spike, ramp))
+            values[:, -1] = final[:, 0]
+            return values
+        
+        cpu = df['cpu_usage'].to_numpy(dtype=np.float64)
+        memory = df['memory_usage'].to_numpy(dtype=np.float64)
+        errors = df['error_count'].to_numpy(dtype=np.float64)
+        
+        def noisy(final):
+            noise = rng.normal(0, 5, size=(n, length))
+            return np.clip(final.reshape(-1, 1) + noise, 0, 100)
         
-        # Train model
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
+        cpu_series = series(cpu, cpu * rng.uniform(0.2, 0.7, n), noisy(cpu))
+        memory_series = series(memory, memory * rng.uniform(0.2, 0.7, n), noisy(memory))
+        error_series = np.floor(series(errors, np.zeros(n), np.repeat(errors.reshape(-1, 1), length, axis=1)))
+        
+        features = batch_features(timestamps, cpu_series, memory_series, error_series,
+                                  self.history_windows)
+        df = df.assign(**features)
+        
+        # Relabel: restart only for sustained problems
+        error_mean = features[f"error_count_mean_w{window}s"]
+        cpu_mean = features[f"cpu_usage_mean_w{window}s"]
+        memory_mean = features[f"memory_usage_mean_w{window}s"]
+        restart = (
+            ((errors > 10) & (error_mean > 5)) |
+            ((cpu > 90) & (memory > 90) & (cpu_mean > 80) & (memory_mean > 80))
         )
+        reset = (errors > 5) | (cpu > 80) | (memory > 80)
+        df['healing_action'] = np.where(restart, 2, np.where(reset, 1, 0)).astype(np.int8)
+        return df
+    
+    def _new_model(self, n_estimators, max_depth, n_jobs, subsample, warm_start=False,
+                   ccp_alpha=0.0):
+        return RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            random_state=42,
+            n_jobs=n_jobs,
+            max_samples=subsample,
+            warm_start=warm_start,
+            ccp_alpha=ccp_alpha
+        )
+    
+    def _as_xy(self, df):
+        """Feature frame (float32, sklearn's internal dtype) and labels"""
+        return df[self.feature_names].astype(np.float32), df['healing_action'].to_numpy()
+    
+    def train(self, df=None, n_samples=1000, n_jobs=None, subsample=None,
+              incremental=False, chunk_size=250_000, seed=None,
+              n_estimators=100, max_depth=10, trace_memory=False):
+        """
+        Train the healing brain model
+        
+        n_jobs:      cores used to fit/evaluate the forest (-1 = all)
+        subsample:   fraction (0-1] or row count each tree is fitted on
+                     (RandomForest max_samples)
+        incremental: generate and fit chunk by chunk (warm_start), adding a
+                     share of the trees per chunk, so the full dataset never
+                     has to be in memory at once
         
-        self.model.fit(X_train, y_train)
+        Wall time and peak memory of each stage are kept in
+        self.training_report and printed at the end (trace_memory: also
+        the per-stage allocation peak, at some cost in speed).
+        """
+        print("\n🧠 Training Healing Brain...")
+        self.training_report = report = StageReport(trace_memory)
+        
+        if incremental and df is None:
+            X_test, y_test = self._fit_incremental(
+                report, n_samples, chunk_size, seed,
+                n_estimators, max_depth, n_jobs, subsample
+            )
+        else:
+            # Generate data if not provided
+            if df is None:
+                with report.stage('generate'):
+                    df = self.generate_training_data(n_samples, chunk_size, seed)
+            
+            # Prepare features and target, split data
+            with report.stage('prepare'):
+                X, y = self._as_xy(df)
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y, test_size=0.2, random_state=42
+                )
+            
+            print(f"  Training samples: {len(X_train)}")
+            print(f"  Test samples: {len(X_test)}")
+            
+            # Train model
+            with report.stage('fit'):
+                self.model = self._new_model(n_estimators, max_depth, n_jobs, subsample)
+                self.model.fit(X_train, y_train)
+        
+        with report.stage('compile'):
+            self.compiled = CompiledForest.from_sklearn(self.model)
         
         # Evaluate
-        y_pred = self.model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
+        with report.stage('evaluate'):
+            y_pred = self.model.predict(X_test)
+            accuracy = accuracy_score(y_test, y_pred)
         
         print(f"\n✅ Training complete!")
         print(f"  Accuracy: {accuracy:.2%}")
@@ -94,6 +339,7 @@ class HealingBrain:
         print("\n📋 Classification Report:")
         print(classification_report(
             y_test, y_pred,
+            labels=[0, 1, 2],
             target_names=['No Action', 'Reset Errors', 'Restart Service']
         ))
         
@@ -102,36 +348,73 @@ class HealingBrain:
         for name, importance in zip(self.feature_names, self.model.feature_importances_):
             print(f"  {name}: {importance:.3f}")
         
+        report.print()
         return accuracy
     
-    def predict_action(self, metrics):
-        """Predict healing action based on metrics"""
-        if self.model is None:
-            raise ValueError("Model not trained yet!")
+    def _fit_incremental(self, report, n_samples, chunk_size, seed,
+                         n_estimators, max_depth, n_jobs, subsample,
+                         max_test_rows=200_000):
+        """Fit chunk by chunk with warm_start; returns the held-out test set"""
+        n_chunks = -(-n_samples // chunk_size)
+        trees_per_chunk = max(1, -(-n_estimators // n_chunks))
+        # With fewer trees than chunks the last chunks would add none
+        fitted_chunks = min(n_chunks, -(-n_estimators // trees_per_chunk))
+        print(f"  Incremental: {n_chunks} chunks of up to {chunk_size} rows, "
+              f"{trees_per_chunk} trees per chunk")
+        if fitted_chunks < n_chunks:
+            print(f"  {n_estimators} trees are reached after {fitted_chunks} chunks; "
+                  f"the rest is not generated")
         
-        # Prepare features
-        features = pd.DataFrame([{
-            'cpu_usage': metrics.get('cpu_usage', 0),
-            'memory_usage': metrics.get('memory_usage', 0),
-            'error_count': metrics.get('error_count', 0),
-            'uptime': metrics.get('uptime', 0),
-            'hour_of_day': datetime.now().hour
-        }])
+        self.model = self._new_model(0, max_depth, n_jobs, subsample, warm_start=True)
+        chunks = self.generate_training_chunks(n_samples, chunk_size, seed)
+        test_X, test_y = [], []
+        n_train = n_test = 0
         
-        # Predict
-        action = self.model.predict(features)[0]
-        probabilities = self.model.predict_proba(features)[0]
+        for i in range(fitted_chunks):
+            with report.stage('generate'):
+                chunk = next(chunks)
+            
+            with report.stage('prepare'):
+                X, y = self._as_xy(chunk)
+                X_train, X_part, y_train, y_part = train_test_split(
+                    X, y, test_size=0.2, random_state=42 + i
+                )
+                keep = max(0, min(len(X_part), max_test_rows - n_test))
+                if keep:
+                    test_X.append(X_part.iloc[:keep])
+                    test_y.append(y_part[:keep])
+                    n_test += keep
+                n_train += len(X_train)
+            
+            with report.stage('fit'):
+                self.model.n_estimators += min(trees_per_chunk,
+                                               n_estimators - self.model.n_estimators)
+                self.model.fit(X_train, y_train)
         
-        action_names = ['no_action', 'reset_errors', 'restart_service']
+        print(f"  Training samples: {n_train}")
+        print(f"  Test samples: {n_test}")
+        return pd.concat(test_X), np.concatenate(test_y)
+    
+    def predict_proba_batch(self, metrics):
+        """Class probabilities for N targets in a single forest pass"""
+        if self.model is None:
+            raise ValueError("Model not trained yet!")
         
-        return {
-            'recommended_action': action_names[action],
-            'confidence': float(probabilities[action]),
-            'probabilities': {
-                name: float(prob)
-                for name, prob in zip(action_names, probabilities)
-            }
-        }
+        if len(metrics) <= self.compiled_max_batch:
+            return super().predict_proba_batch(metrics)
+        
+        # The model was fitted on a DataFrame; plain arrays are fine (same
+        # column order) but sklearn warns about the missing feature names
+        start = time.perf_counter()
+        X = self.feature_matrix(metrics)
+        built = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            probabilities = self.model.predict_proba(X)
+        if self.stages is not None:
+            self.stages.observe('matrix', built - start)
+            self.stages.observe('forest', time.perf_counter() - built)
+        return probabilities
     
     def save_model(self, filepath='healing_brain.pkl'):
         """Save trained model"""
@@ -144,21 +427,249 @@ class HealingBrain:
     def load_model(self, filepath='healing_brain.pkl'):
         """Load trained model"""
         self.model = joblib.load(filepath)
+        self.compiled = CompiledForest.from_sklearn(self.model)
+        
+        # Models trained with history features carry their input names
+        if hasattr(self.model, 'feature_names_in_'):
+            self.feature_names = list(self.model.feature_names_in_)
+            self.history_windows = windows_for(self.feature_names)
         print(f"\n📂 Model loaded from: {filepath}")
+    
+    def export_compiled(self, path='healing_brain_forest'):
+        """
+        Export the fitted forest as flat NumPy arrays
+        
+        The exported directory can be loaded with CompiledForest.load and
+        evaluated without sklearn.
+        """
+        if self.model is None:
+            raise ValueError("No model to export!")
+        
+        CompiledForest.from_sklearn(self.model).save(path)
+        print(f"\n📦 Compiled forest exported to: {path}")
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def _best_of(fn, repeats):
+    """Fastest of `repeats` calls, in seconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure_model(model, X_test, y_test, repeats=5, batch_size=1000, single_rows=200):
+    """
+    Size, load time, inference latency and accuracy of a fitted model
+    
+    Sizes are of the files the monitor loads (pickle and exported forest);
+    latencies are for the compiled NumPy evaluator the monitor uses.
+    """
+    forest = CompiledForest.from_sklearn(model)
+    X = np.asarray(X_test, dtype=np.float64)
+    workdir = tempfile.mkdtemp(prefix='brain-search-')
+    try:
+        pkl_path = os.path.join(workdir, 'model.pkl')
+        forest_path = os.path.join(workdir, 'forest')
+        joblib.dump(model, pkl_path)
+        forest.save(forest_path)
+        
+        batch = X[:batch_size]
+        rows = X[:single_rows]
+        single = _best_of(lambda: [forest.predict_proba_one(x) for x in rows], repeats)
+        return {
+            'trees': forest.n_trees,
+            'nodes': forest.n_nodes,
+            'depth': forest.depth,
+            'pkl_kb': os.path.getsize(pkl_path) / 1024,
+            'forest_kb': _dir_size(forest_path) / 1024,
+            'pkl_load_ms': _best_of(lambda: joblib.load(pkl_path), repeats) * 1000,
+            'forest_load_ms': _best_of(lambda: CompiledForest.load(forest_path, mmap_mode='r'),
+                                       repeats) * 1000,
+            'single_us': single / len(rows) * 1e6,
+            'batch_us_per_row': _best_of(lambda: forest.predict_proba(batch), repeats)
+                                / len(batch) * 1e6,
+            'accuracy': float(np.mean(forest.predict(X) == y_test)),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# Pareto objectives: accuracy up, everything else down
+PARETO_OBJECTIVES = {'accuracy': 1, 'forest_kb': -1, 'single_us': -1, 'batch_us_per_row': -1}
+
+def pareto_front(results, objectives=PARETO_OBJECTIVES):
+    """Names of the candidates no other candidate beats on every objective"""
+    def dominates(a, b):
+        at_least = all(a[key] * sign >= b[key] * sign for key, sign in objectives.items())
+        better = any(a[key] * sign > b[key] * sign for key, sign in objectives.items())
+        return at_least and better
+    
+    return [name for name, result in results.items()
+            if not any(dominates(other, result) for other in results.values() if other is not result)]
+
+def pick_model(results, front, tolerance=0.001):
+    """Smallest Pareto-optimal model within `tolerance` of the best accuracy"""
+    best = max(results[name]['accuracy'] for name in front)
+    eligible = [name for name in front if results[name]['accuracy'] >= best - tolerance]
+    return min(eligible, key=lambda name: (results[name]['forest_kb'], results[name]['single_us']))
+
+def search_models(brain, df, trees=(10, 25, 50, 100), depths=(4, 6, 8, 10),
+                  ccp_alphas=(0.0,), distill_depths=(), n_jobs=None, baseline=None):
+    """
+    Fit and measure a grid of forests, plus optional distilled single trees
+    
+    Forests: every (trees, depth, ccp_alpha) combination (ccp_alpha is
+    minimal cost-complexity pruning). Distilled trees: one decision tree per
+    depth, fitted to the predictions of the largest forest in the grid
+    instead of the raw labels. baseline: an existing model file to measure
+    alongside (e.g. the shipped healing_brain.pkl).
+    
+    Returns (models, results): fitted models and measure_model() results,
+    both keyed by candidate name.
+    """
+    X, y = brain._as_xy(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    models, results = {}, {}
+    
+    def add(name, model):
+        models[name] = model
+        results[name] = measure_model(model, X_test, y_test)
+        r = results[name]
+        print(f"  {name:<24}{r['accuracy']:>9.2%}{r['nodes']:>8}{r['forest_kb']:>9.0f}KB"
+              f"{r['single_us']:>9.1f}µs{r['batch_us_per_row']:>9.2f}µs")
+    
+    print(f"\n🔎 Model search: {len(X_train)} training rows, {len(X_test)} test rows")
+    print(f"  {'candidate':<24}{'accuracy':>9}{'nodes':>8}{'forest':>11}{'single':>11}{'batch/row':>11}")
+    if baseline:
+        add('baseline', joblib.load(baseline))
+    
+    # Largest forest of the grid (most trees, deepest, least pruned): the
+    # teacher of the distilled trees
+    teacher, teacher_size = None, None
+    for n_trees in trees:
+        for depth in depths:
+            for alpha in ccp_alphas:
+                model = brain._new_model(n_trees, depth, n_jobs, None, ccp_alpha=alpha)
+                model.fit(X_train, y_train)
+                add(f"rf-{n_trees}x{depth}" + (f"-ccp{alpha:g}" if alpha else ''), model)
+                if teacher_size is None or (n_trees, depth, -alpha) > teacher_size:
+                    teacher, teacher_size = model, (n_trees, depth, -alpha)
+    
+    if distill_depths and teacher is not None:
+        # Soft labels would need a regressor; the teacher's hard labels keep
+        # the student a plain classifier the monitor can load as usual
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            y_teacher = teacher.predict(X_train)
+        for depth in distill_depths:
+            student = DecisionTreeClassifier(max_depth=depth, random_state=42)
+            student.fit(X_train, y_teacher)
+            add(f"distilled-{depth}", student)
+    
+    return models, results
 
 def main():
     """Main training script"""
+    parser = argparse.ArgumentParser(description="Train the healing brain")
+    parser.add_argument('--samples', type=int, default=1000,
+                        help="Synthetic training rows to generate")
+    parser.add_argument('--chunk-size', type=int, default=250_000,
+                        help="Rows generated (and fitted, with --incremental) per chunk")
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help="Cores for fitting/evaluation (-1 = all)")
+    parser.add_argument('--subsample', type=float, default=None,
+                        help="Rows per tree: fraction (0-1] or absolute count")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Fit chunk by chunk instead of on the full dataset")
+    parser.add_argument('--history-windows', default='',
+                        help="Comma-separated rolling windows in seconds, e.g. 60,600")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Report each stage's allocation peak (tracemalloc; slows training)")
+    parser.add_argument('--history', help="Also train on a monitor history store directory")
+    parser.add_argument('--history-days', type=float, default=None,
+                        help="Only use the last N days of --history")
+    parser.add_argument('--search', action='store_true',
+                        help="Search tree count/depth/pruning (and distilled trees) and ship "
+                             "a Pareto-optimal model instead of the default forest")
+    parser.add_argument('--search-trees', default='10,25,50,100')
+    parser.add_argument('--search-depths', default='4,6,8,10')
+    parser.add_argument('--search-ccp', default='0',
+                        help="Cost-complexity pruning alphas, e.g. 0,0.0001")
+    parser.add_argument('--distill-depths', default='',
+                        help="Also distill the largest forest into single trees of these depths")
+    parser.add_argument('--baseline', help="Existing model file to measure alongside the search")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.001,
+                        help="Ship the smallest Pareto model within this much of the best accuracy")
+    parser.add_argument('--ship', default='auto',
+                        help="Candidate name to ship (default: picked from the Pareto front)")
+    parser.add_argument('--search-report', help="Write the search results to this JSON file")
+    args = parser.parse_args()
+    
+    subsample = args.subsample
+    if subsample is not None and subsample > 1:
+        subsample = int(subsample)
+    windows = tuple(int(w) for w in args.history_windows.split(',') if w)
+    
     print("="*60)
     print("🧠 HEALING BRAIN TRAINING SYSTEM")
     print("="*60)
     
-    brain = HealingBrain()
+    brain = HealingBrain(history_windows=windows)
+    
+    # Real history goes next to the synthetic rows (--samples 0: history only)
+    df = None
+    if args.history:
+        start = time.time() - args.history_days * 86400 if args.history_days else None
+        df = brain.history_training_data(args.history, start=start)
+        if args.samples:
+            df = pd.concat([brain.generate_training_data(args.samples, args.chunk_size, args.seed), df],
+                           ignore_index=True)
     
-    # Train the model
-    accuracy = brain.train()
+    if args.search:
+        if df is None:
+            df = brain.generate_training_data(args.samples, args.chunk_size, args.seed)
+        models, results = search_models(
+            brain, df,
+            trees=[int(n) for n in args.search_trees.split(',')],
+            depths=[int(d) for d in args.search_depths.split(',')],
+            ccp_alphas=[float(a) for a in args.search_ccp.split(',')],
+            distill_depths=[int(d) for d in args.distill_depths.split(',') if d],
+            n_jobs=args.n_jobs,
+            baseline=args.baseline
+        )
+        front = pareto_front(results)
+        name = pick_model(results, front, args.accuracy_tolerance) if args.ship == 'auto' else args.ship
+        if name not in models:
+            parser.error(f"--ship {name}: no such candidate ({', '.join(models)})")
+        print(f"\n📐 Pareto front: {', '.join(front)}")
+        print(f"🚢 Shipping: {name}")
+        
+        if args.search_report:
+            with open(args.search_report, 'w') as f:
+                json.dump({'results': results, 'pareto_front': front, 'shipped': name}, f, indent=2)
+            print(f"💾 Search results written to: {args.search_report}")
+        
+        brain.model = models[name]
+        brain.compiled = CompiledForest.from_sklearn(brain.model)
+    else:
+        # Train the model
+        accuracy = brain.train(
+            df=df,
+            n_samples=args.samples,
+            n_jobs=args.n_jobs,
+            subsample=subsample,
+            incremental=args.incremental,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+            trace_memory=args.trace_memory
+        )
     
     # Save the model
     brain.save_model('healing_brain.pkl')
+    brain.export_compiled('healing_brain_forest')
     
     # Test prediction
     print("\n🧪 Testing prediction with sample metrics:")